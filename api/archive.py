@@ -0,0 +1,306 @@
+# api/archive.py
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+from django.db.models import Count, Max, Q
+
+from .embedding_store import EmbeddingStore
+from .models import AnalysisResult, NewsArticle, stable_id
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed to export the archive
+    pa = pq = None
+
+
+# ==============================================================================
+#  PARQUET ARCHIVE
+#  Articles, analyses and embeddings are written as three hive-partitioned
+#  Parquet datasets under one directory:
+#      articles/article_month=2025-09/article_company=kbs/part-0.parquet
+#      analyses/...   embeddings/...
+#  The partition keys live in the directory names only, so readers such as
+#  `pyarrow.dataset` and pandas recover them as columns and can prune whole
+#  months or broadcasters without opening their files; `article_date` is a
+#  column inside them. Dates are partitioned by month, like the embedding
+#  store's shards: a day holds only a dozen segments per broadcaster, and
+#  files that small cost more to open than to read. Embeddings are
+#  fixed-size float32 list columns, which load as one (n, dim) buffer.
+#
+#  A month is exported in one pass: its rows are streamed from the database
+#  in chunks, written to a staging directory, and swapped in when complete.
+#  `_export_state.json` records a signature of every exported day, so an
+#  incremental run only rewrites the months holding new or changed days.
+# ==============================================================================
+TABLES = ('articles', 'analyses', 'embeddings')
+STATE_FILE = '_export_state.json'
+
+ARTICLE_SCHEMA = None
+ANALYSIS_SCHEMA = None
+if pa is not None:
+    ARTICLE_SCHEMA = pa.schema([
+        ('id', pa.int64()),
+        ('article_date', pa.date32()),
+        ('article_order', pa.int32()),
+        ('article_title', pa.string()),
+        ('article_url', pa.string()),
+        ('article_script', pa.string()),
+        ('script_hash', pa.string()),
+        ('content_hash', pa.string()),
+        ('duplicate_of_id', pa.int64()),
+        ('scraped_at', pa.timestamp('us', tz='UTC')),
+    ])
+    # The JSON fields are kept as JSON text: their shape is LLM output and
+    # varies too much between rows for a fixed struct type
+    ANALYSIS_SCHEMA = pa.schema([
+        ('article_id', pa.int64()),
+        ('article_date', pa.date32()),
+        ('article_order', pa.int32()),
+        ('status', pa.string()),
+        ('headline_analysis', pa.string()),
+        ('key_agenda_items', pa.string()),
+        ('editorial_critique', pa.string()),
+        ('notable_elements', pa.string()),
+        ('content_hash', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('updated_at', pa.timestamp('us', tz='UTC')),
+    ])
+
+
+def embedding_schema(dim: int):
+    return pa.schema([
+        ('article_id', pa.int64()),
+        ('article_date', pa.date32()),
+        ('embedding_id', pa.string()),
+        ('embedding', pa.list_(pa.float32(), dim)),
+    ])
+
+
+def day_signatures(days=None) -> dict:
+    """
+    {iso date: signature} of what an export of each day would contain. A day
+    whose signature differs from the one recorded at its last export has
+    new, removed, edited (script, title, order), newly embedded or
+    re-analyzed segments.
+    """
+    articles = NewsArticle.objects.values('article_date').annotate(
+        n=Count('id'), last=Max('id'), embedded=Count('id', filter=~Q(embedded_hash='')),
+    )
+    # In-place re-scrape edits change none of the counts, so each day also
+    # gets a digest of its rows' content fingerprints and display fields
+    contents = NewsArticle.objects.order_by('article_date', 'id').values_list(
+        'article_date', 'id', 'article_company', 'article_url', 'article_title', 'article_order', 'content_hash',
+    )
+    analyses = AnalysisResult.objects.values('article__article_date').annotate(
+        n=Count('id'), updated=Max('updated_at'),
+    )
+    if days is not None:
+        articles = articles.filter(article_date__in=days)
+        contents = contents.filter(article_date__in=days)
+        analyses = analyses.filter(article__article_date__in=days)
+
+    digests = {}
+    for day, *fields in contents.iterator(chunk_size=2000):
+        digests.setdefault(day, hashlib.sha1()).update(json.dumps(fields, ensure_ascii=False).encode("utf-8"))
+
+    signatures = {
+        row['article_date'].isoformat(): [
+            row['n'], row['last'], row['embedded'], digests[row['article_date']].hexdigest(), 0, None,
+        ]
+        for row in articles
+    }
+    for row in analyses:
+        signature = signatures.get(row['article__article_date'].isoformat())
+        if signature is not None:
+            signature[4:] = [row['n'], row['updated'] and row['updated'].isoformat()]
+    return signatures
+
+
+def month_bounds(day: datetime.date) -> tuple[datetime.date, datetime.date]:
+    first = day.replace(day=1)
+    following = (first + datetime.timedelta(days=32)).replace(day=1)
+    return first, following - datetime.timedelta(days=1)
+
+
+class ArchiveWriter:
+    def __init__(self, root, store: EmbeddingStore = None, chunk_size: int = 1000, embeddings: bool = True):
+        if pa is None:
+            raise RuntimeError("Exporting the archive needs the 'pyarrow' package.")
+        self.root = Path(root)
+        self.store = store if store is not None else EmbeddingStore()
+        self.chunk_size = chunk_size
+        self.embeddings = embeddings
+
+    # --------------------------------------------------------------------------
+    #  Export state
+    # --------------------------------------------------------------------------
+    def load_state(self) -> dict:
+        path = self.root / STATE_FILE
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def save_state(self, state: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (STATE_FILE + '.tmp')
+        tmp.write_text(json.dumps(state, indent=1, sort_keys=True))
+        os.replace(tmp, self.root / STATE_FILE)
+
+    # --------------------------------------------------------------------------
+    #  Writing
+    # --------------------------------------------------------------------------
+    def _partition(self, table: str, month: datetime.date, staging: bool = False) -> Path:
+        # Readers skip paths starting with '.', so a half-written month is invisible
+        name = f"article_month={month:%Y-%m}"
+        return self.root / table / (f".staging-{name}" if staging else name)
+
+    def _write(self, table: str, month, rows_by_company: dict, to_table) -> int:
+        """
+        Write one month of `table`: one file per company, one row group per
+        `chunk_size` rows, each converted to an Arrow table by `to_table`.
+        """
+        staging = self._partition(table, month, staging=True)
+        shutil.rmtree(staging, ignore_errors=True)
+        written = 0
+        for company, rows in rows_by_company.items():
+            directory = staging / f"article_company={company}"
+            directory.mkdir(parents=True)
+            writer = None
+            for start in range(0, len(rows), self.chunk_size):
+                batch = to_table(rows[start:start + self.chunk_size])
+                if writer is None:
+                    writer = pq.ParquetWriter(directory / "part-0.parquet", batch.schema, compression='zstd')
+                writer.write_table(batch)
+                written += batch.num_rows
+            if writer is not None:
+                writer.close()
+
+        final = self._partition(table, month)
+        shutil.rmtree(final, ignore_errors=True)
+        if written:
+            staging.rename(final)
+        else:
+            shutil.rmtree(staging, ignore_errors=True)
+        return written
+
+    def export_month(self, month: datetime.date) -> dict:
+        """Export (or re-export) every table for the month of `month`. Returns the row count per table."""
+        first, last = month_bounds(month)
+        articles, analyses, embedding_ids = {}, {}, {}
+
+        queryset = (
+            NewsArticle.objects.filter(article_date__range=(first, last)).with_script().select_related('analysis')
+            .order_by('article_company', 'article_date', 'article_order')
+        )
+        for a in queryset.iterator(chunk_size=self.chunk_size):
+            articles.setdefault(a.article_company, []).append({
+                'id': a.pk,
+                'article_date': a.article_date,
+                'article_order': a.article_order,
+                'article_title': a.article_title,
+                'article_url': a.article_url,
+                'article_script': a.article_script,
+                'script_hash': a.script_blob_id,
+                'content_hash': a.content_hash,
+                'duplicate_of_id': a.duplicate_of_id,
+                'scraped_at': a.scraped_at,
+            })
+            analysis = getattr(a, 'analysis', None)
+            if analysis is not None:
+                analyses.setdefault(a.article_company, []).append({
+                    'article_id': a.pk,
+                    'article_date': a.article_date,
+                    'article_order': a.article_order,
+                    'status': analysis.status,
+                    'headline_analysis': json.dumps(analysis.headline_analysis, ensure_ascii=False),
+                    'key_agenda_items': json.dumps(analysis.key_agenda_items, ensure_ascii=False),
+                    'editorial_critique': analysis.editorial_critique,
+                    'notable_elements': json.dumps(analysis.notable_elements, ensure_ascii=False),
+                    'content_hash': analysis.content_hash,
+                    'created_at': analysis.created_at,
+                    'updated_at': analysis.updated_at,
+                })
+            embedding_ids[stable_id(a, a.article_date.isoformat())] = a
+
+        counts = {
+            'articles': self._write('articles', month, articles,
+                                    lambda rows: pa.Table.from_pylist(rows, schema=ARTICLE_SCHEMA)),
+            'analyses': self._write('analyses', month, analyses,
+                                    lambda rows: pa.Table.from_pylist(rows, schema=ANALYSIS_SCHEMA)),
+            'embeddings': 0,
+        }
+        if self.embeddings:
+            counts['embeddings'] = self._write_embeddings(month, embedding_ids)
+        return counts
+
+    def _write_embeddings(self, month: datetime.date, embedding_ids: dict) -> int:
+        first, last = (day.year * 10000 + day.month * 100 + day.day for day in month_bounds(month))
+        ids, _, vectors = self.store.vectors(first, last)
+        by_company = {}
+        for row, item_id in enumerate(ids):
+            article = embedding_ids.get(item_id)
+            if article is not None:
+                by_company.setdefault(article.article_company, []).append((row, article, item_id))
+        for rows in by_company.values():
+            rows.sort(key=lambda item: (item[1].article_date, item[1].article_order))
+        if not by_company:
+            return self._write('embeddings', month, {}, None)
+
+        dim = vectors.shape[1]
+        schema = embedding_schema(dim)
+
+        def to_table(rows):
+            # Built straight from the flat float32 buffer, without Python floats
+            flat = np.ascontiguousarray(vectors[[row for row, _, _ in rows]], dtype=np.float32).reshape(-1)
+            return pa.Table.from_arrays([
+                pa.array([a.pk for _, a, _ in rows], pa.int64()),
+                pa.array([a.article_date for _, a, _ in rows], pa.date32()),
+                pa.array([item_id for _, _, item_id in rows], pa.string()),
+                pa.FixedSizeListArray.from_arrays(pa.array(flat), dim),
+            ], schema=schema)
+
+        return self._write('embeddings', month, by_company, to_table)
+
+    def export(self, date_from: datetime.date = None, date_to: datetime.date = None, full: bool = False,
+               progress=None) -> dict:
+        """
+        Export the months holding new or changed days between `date_from` and
+        `date_to` (inclusive, open when None), or all of them with `full`.
+        Exported days whose articles have since been deleted drop out with
+        their month's rewrite. The state is saved after each month, so an
+        interrupted run resumes where it stopped. Returns the number of
+        changed days and rewritten months, and the row count per table.
+        """
+        state = self.load_state()
+        days = {day.isoformat() for day in NewsArticle.objects.values_list('article_date', flat=True).distinct()}
+        days = sorted(
+            datetime.date.fromisoformat(day) for day in days | set(state)
+            if (not date_from or day >= date_from.isoformat()) and (not date_to or day <= date_to.isoformat())
+        )
+        signatures = day_signatures(days)
+        pending = [day for day in days if full or state.get(day.isoformat()) != signatures.get(day.isoformat())]
+
+        totals = {table: 0 for table in TABLES}
+        months = sorted({day.replace(day=1) for day in pending})
+        for month in months:
+            counts = self.export_month(month)
+            for table, n in counts.items():
+                totals[table] += n
+            # The whole month was rewritten, so its state is its current signatures
+            first, last = month_bounds(month)
+            for day in list(state):
+                if first.isoformat() <= day <= last.isoformat():
+                    del state[day]
+            state.update(day_signatures([
+                first + datetime.timedelta(days=i) for i in range((last - first).days + 1)
+            ]))
+            self.save_state(state)
+            if progress:
+                progress(month, counts)
+        totals.update(days=len(pending), months=len(months))
+        return totals
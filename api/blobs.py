@@ -0,0 +1,48 @@
+# api/blobs.py
+
+import hashlib
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib is always available
+    zstandard = None
+
+
+# ==============================================================================
+#  SCRIPT BLOB CODECS
+#  Scripts are stored once per distinct text, keyed by the sha256 of their
+#  exact UTF-8 bytes, and compressed with zstd when the `zstandard` package is
+#  installed or zlib otherwise. Each blob records its codec, so a store can
+#  hold both and switching codecs never requires rewriting old rows.
+# ==============================================================================
+CODEC_ZSTD = 'zstd'
+CODEC_ZLIB = 'zlib'
+DEFAULT_CODEC = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 9
+
+
+def blob_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def compress(text: str, codec: str = DEFAULT_CODEC) -> bytes:
+    raw = (text or "").encode("utf-8")
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(raw, ZLIB_LEVEL)
+    raise ValueError(f"Unknown script codec: {codec}")
+
+
+def decompress(data: bytes, codec: str) -> str:
+    data = bytes(data)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("This script is zstd-compressed; install the 'zstandard' package to read it.")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown script codec: {codec}")
@@ -0,0 +1,316 @@
+# api/broadcasters.py
+
+import datetime
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from django.core.management.base import CommandError
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from .profiling import stage
+
+
+# The news day changes at 10 PM: before that we are still looking at
+# yesterday's evening broadcasts. Watch mode follows the broadcasts live, so
+# its day starts when they go on air.
+NEWS_DAY_CUTOFF_HOUR = 22
+BROADCAST_START_HOUR = 19
+
+
+def get_news_date(now: datetime.datetime = None, cutoff_hour: int = NEWS_DAY_CUTOFF_HOUR) -> datetime.date:
+    now = now or datetime.datetime.now()
+    if now.hour >= cutoff_hour:
+        return now.date()
+    return now.date() - datetime.timedelta(days=1)
+
+
+# ==============================================================================
+#  FETCH RESULTS
+#  Fetching a segment never raises: it returns a FetchResult, so one bad page
+#  costs that segment only. Timeouts, connection errors and 429/5xx replies
+#  are retried with exponential backoff; other HTTP errors and pages whose
+#  structure the parser doesn't recognise fail at once.
+# ==============================================================================
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ParseError(ValueError):
+    """A segment page did not have the structure an adapter expects."""
+
+
+@dataclass
+class FetchResult:
+    url: str
+    body: str = None
+    error: str = ''
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.body is not None
+
+
+# ==============================================================================
+#  ADAPTER INTERFACE
+#  A broadcaster adapter knows where a day's rundown is listed, which listed
+#  items are news segments, and how to pull the script out of a segment page.
+#  `scrape` runs the shared part: render the listing, filter and number the
+#  segments, then fetch each body at the adapter's request rate.
+# ==============================================================================
+class Broadcaster:
+    name = None
+    base_url = None
+    listing_locator = None  # Selenium locator that is present once the listing has rendered
+    request_interval = 0.2  # minimum seconds between two article requests to this site
+    timeout = (5, 20)       # (connect, read) seconds for one article request
+    max_attempts = 3
+    backoff = 1.0           # seconds before the first retry, doubled for each next one
+
+    def __init__(self):
+        self._last_request = 0.0
+        self._lock = threading.Lock()
+
+    def listing_url(self, date: datetime.date) -> str:
+        raise NotImplementedError
+
+    def parse_listing(self, source: str) -> list[dict]:
+        """The day's news segments as {'title', 'url'} dicts, in broadcast order."""
+        raise NotImplementedError
+
+    def extract_body(self, html: str) -> str:
+        """The script of a segment page. Raises ParseError if it can't be found."""
+        raise NotImplementedError
+
+    def get_listing_source(self, url, driver, session):
+        # Listing pages are rendered by Selenium, so they bypass the HTTP session.
+        # Their page source is still written to the page cache so an offline
+        # re-run can rebuild the same article list without a browser.
+        if session.offline:
+            source = session.cache.get_text(url)
+            if source is None:
+                raise CommandError(f"Listing page {url} is not in the page cache.")
+            return source
+
+        with stage('listing render (selenium)'):
+            driver.get(url)
+            WebDriverWait(driver, 15).until(EC.presence_of_element_located(self.listing_locator))
+            source = driver.page_source
+        session.cache.put_text(url, source)
+        return source
+
+    def _throttle(self, session):
+        if session.offline or not self.request_interval:
+            return
+        with self._lock:
+            wait = self._last_request + self.request_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+
+    def fetch_body(self, url: str, session) -> FetchResult:
+        result = FetchResult(url)
+        while result.attempts < self.max_attempts:
+            if result.attempts:
+                with stage('retry backoff'):
+                    time.sleep(self.backoff * 2 ** (result.attempts - 1))
+            result.attempts += 1
+            self._throttle(session)
+            try:
+                with stage('article fetch (http)'):
+                    response = session.get(url, timeout=self.timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                result.error = f"{type(e).__name__}: {e}"
+                continue
+            except requests.RequestException as e:
+                # Includes CacheMiss in offline mode; retrying won't help
+                result.error = f"{type(e).__name__}: {e}"
+                return result
+
+            if response.status_code in TRANSIENT_STATUSES:
+                result.error = f"HTTP {response.status_code}"
+                continue
+            if not response.ok:
+                result.error = f"HTTP {response.status_code}"
+                return result
+
+            try:
+                with stage('article parse'):
+                    result.body = self.extract_body(response.text)
+            except ParseError as e:
+                result.error = f"ParseError: {e}"
+            return result
+        return result
+
+    def list_segments(self, date: datetime.date, driver, session) -> list[dict]:
+        """The day's segments, numbered in broadcast order, without their bodies."""
+        source = self.get_listing_source(self.listing_url(date), driver, session)
+        with stage('listing parse'):
+            segments = self.parse_listing(source)
+        for order, segment in enumerate(segments, start=1):
+            segment.update({'company': self.name, 'article_date': date, 'order': order})
+        return segments
+
+    def fetch_segments(self, segments: list[dict], session) -> list[dict]:
+        """
+        Fill in each segment's 'news'. A segment that could not be fetched
+        keeps 'news' None and carries the reason in 'error'.
+        """
+        for segment in segments:
+            result = self.fetch_body(segment['url'], session)
+            segment['news'] = result.body
+            segment['error'] = result.error if not result.ok else ''
+        return segments
+
+    def scrape(self, date: datetime.date, driver, session) -> list[dict]:
+        return self.fetch_segments(self.list_segments(date, driver, session), session)
+
+
+BROADCASTERS: dict[str, Broadcaster] = {}
+
+
+def register(cls):
+    BROADCASTERS[cls.name] = cls()
+    return cls
+
+
+def get_broadcasters(names=None) -> list[Broadcaster]:
+    """Registered adapters, all of them or the named subset in the given order."""
+    if not names:
+        return list(BROADCASTERS.values())
+    unknown = [name for name in names if name not in BROADCASTERS]
+    if unknown:
+        raise CommandError(
+            f"Unknown broadcaster(s): {', '.join(unknown)}. Choose from {', '.join(BROADCASTERS)}."
+        )
+    return [BROADCASTERS[name] for name in names]
+
+
+# ==============================================================================
+#  ADAPTERS
+# ==============================================================================
+@register
+class KBS(Broadcaster):
+    name = 'kbs'
+    base_url = "https://news.kbs.co.kr"
+    listing_locator = (By.CLASS_NAME, "box-content")
+
+    def listing_url(self, date):
+        return f"https://news.kbs.co.kr/news/pc/program/program.do?bcd=0001&ref=pGnb#{date:%Y%m%d}"
+
+    def parse_listing(self, source):
+        soup = BeautifulSoup(source, 'lxml')
+        boxes = []
+        for item in soup.select("a.box-content"):
+            title = item.find('p', class_='title').get_text(strip=True) if item.find('p', class_='title') else "N/A"
+            if not item.get('href'):
+                continue
+            boxes.append({'title': title, 'url': urljoin(self.base_url, item.get('href'))})
+
+        # The news segments run from the opening to the sports headlines
+        segments, is_news = [], False
+        for box in boxes:
+            if box['title'] == '오프닝':
+                is_news = True
+                continue
+            if not is_news:
+                continue
+            if box['title'] == '[스포츠9 헤드라인]':
+                is_news = False
+                continue
+            segments.append(box)
+        return segments
+
+    def extract_body(self, html):
+        soup = BeautifulSoup(html, 'lxml')
+        script_tag = soup.find('script', string=re.compile(r"var messageText"))
+        match = script_tag and re.search(r'var messageText = "(.*?)";', script_tag.text, re.DOTALL)
+        if not match:
+            raise ParseError("no messageText script")
+        text = BeautifulSoup(match.group(1), 'lxml').get_text(separator="\n", strip=True)
+        text = text.replace("\\", "")
+        return re.sub(r"\nKBS 뉴스 [가-힣]+입니다\.[\s\S]*", "", text).strip()
+
+
+@register
+class MBC(Broadcaster):
+    name = 'mbc'
+    base_url = "https://imnews.imbc.com"
+    listing_locator = (By.CLASS_NAME, "item")
+
+    def listing_url(self, date):
+        return f"https://imnews.imbc.com/replay/{date.year}/nwdesk/"
+
+    def parse_listing(self, source):
+        soup = BeautifulSoup(source, 'lxml')
+        segments = []
+        for item in soup.select("li.item"):
+            title = None
+            if item.find('span', class_='tit ellipsis2'):
+                title = item.find('span', class_='tit ellipsis2').get_text(strip=True)
+            elif item.find('span', class_='tit ellipsis'):
+                title = item.find('span', class_='tit ellipsis').get_text(strip=True)
+            link = item.find('a')
+            if title is None or link is None or not link.get('href'):
+                continue
+            # Sports and the closing segments follow the top play
+            if title.startswith('[톱플레이]'):
+                break
+            segments.append({'title': title, 'url': urljoin(self.base_url, link.get('href'))})
+        return segments
+
+    def extract_body(self, html):
+        soup = BeautifulSoup(html, 'lxml')
+        article_div = soup.select_one("div.news_txt")
+        if article_div is None:
+            raise ParseError("no div.news_txt")
+        text = article_div.get_text(separator="\n", strip=True)
+        return re.sub(r"\nMBC ?뉴스 [가-힣]+입니다\.[\s\S]*", "", text).strip()
+
+
+@register
+class SBS(Broadcaster):
+    name = 'sbs'
+    base_url = "https://news.sbs.co.kr"
+    listing_locator = (By.CSS_SELECTOR, 'li[itemprop="itemListElement"]')
+
+    def listing_url(self, date):
+        return (f"https://news.sbs.co.kr/news/programMain.do?prog_cd=R1&broad_date={date:%Y%m%d}"
+                f"&plink=CAL&cooper=SBSNEWS")
+
+    def parse_listing(self, source):
+        soup = BeautifulSoup(source, 'lxml')
+        segments = []
+        for item in soup.select('li[itemprop="itemListElement"]'):
+            category_tag = item.find("em", class_="cate")
+            if category_tag and category_tag.get_text(strip=True) == "스포츠":
+                continue
+            image, link = item.find('img'), item.find('a')
+            if image is None or link is None or not link.get('href'):
+                continue
+            title = image.get('alt') or ''
+            # The weather closes the news block
+            if title.startswith('[날씨]'):
+                break
+            segments.append({'title': title, 'url': urljoin(self.base_url, link.get('href'))})
+        return segments
+
+    def extract_body(self, html):
+        soup = BeautifulSoup(html, 'lxml')
+        script_tag = soup.find('script', type='application/ld+json')
+        if script_tag is None or not script_tag.string:
+            raise ParseError("no ld+json metadata")
+        try:
+            article_body = json.loads(script_tag.string).get("articleBody")
+        except (json.JSONDecodeError, AttributeError) as e:
+            raise ParseError(f"unreadable ld+json: {e}")
+        if not article_body:
+            raise ParseError("ld+json has no articleBody")
+        return article_body
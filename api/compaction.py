@@ -0,0 +1,362 @@
+# api/compaction.py
+
+import random
+import shutil
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .embedding_store import EmbeddingStore
+
+COMPACTOR_FILE = 'compactor.npz'
+METHODS = ('pca', 'random')
+DTYPES = ('int8', 'float16', 'float32')
+
+
+def _unit(X) -> np.ndarray:
+    X = np.asarray(X, dtype=np.float32)
+    X = X.reshape(len(X), -1) if X.ndim != 1 else X.reshape(1, -1)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.where(norms == 0, 1, norms)
+
+
+# ==============================================================================
+#  PROJECTION + QUANTIZATION
+#  Everything downstream compares embeddings by cosine, so a compactor keeps
+#  dot products of unit vectors: vectors are normalized, projected to `dim`
+#  dimensions and quantized. The projections are not normalized again:
+#  what a projection drops is mostly the near-orthogonal per-segment part of
+#  each vector, and rescaling the remainder to unit length would shrink
+#  every distance and make DBSCAN merge stories it would otherwise keep
+#  apart.
+#    - 'pca' projects onto the top right-singular vectors of the (uncentered)
+#      unit vectors of a sample of the archive, which best preserves their
+#      dot products, i.e. the cosine similarities.
+#    - 'random' is a Gaussian random projection: no fitting, and dot
+#      products are preserved up to O(1/sqrt(dim)) noise.
+#  int8 codes use one symmetric scale per projected dimension, taken from
+#  the fitted sample; float16 is a plain cast.
+#
+#  The fit also calibrates distances: on the closest pairs of the sample it
+#  fits full ~ offset + slope * compact cosine distance, and records as
+#  `margin` the 99.5th percentile of the remaining error. A compact distance
+#  further than `margin` from eps decides a DBSCAN link as full precision
+#  would; closer ones are re-measured (see refined_cosine_distances).
+# ==============================================================================
+class Compactor:
+    def __init__(self, components: np.ndarray, dtype: str = 'int8', method: str = 'pca', scale: np.ndarray = None,
+                 calibration=(0.0, 1.0, 0.05)):
+        self.components = np.asarray(components, dtype=np.float32)  # (full_dim, dim)
+        self.dtype = np.dtype(dtype)
+        self.method = method
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float32)
+        self.offset, self.slope, self.margin = (float(value) for value in calibration)
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, sample, dim: int = 128, method: str = 'pca', dtype: str = 'int8', seed: int = 0,
+            calibration_size: int = 3000):
+        """Fit on `sample`, an (n, full_dim) array of archive embeddings."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown projection {method!r}; expected one of {', '.join(METHODS)}.")
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown dtype {dtype!r}; expected one of {', '.join(DTYPES)}.")
+        X = _unit(sample)
+        if dim > X.shape[1]:
+            raise ValueError(f"Cannot project {X.shape[1]}-dim embeddings up to {dim} dimensions.")
+
+        if method == 'pca':
+            if len(X) < dim:
+                raise ValueError(f"A {dim}-dim PCA needs at least {dim} sample vectors, got {len(X)}.")
+            _, _, vt = np.linalg.svd(X, full_matrices=False)
+            components = vt[:dim].T
+        else:
+            rng = np.random.default_rng(seed)
+            components = rng.standard_normal((X.shape[1], dim)).astype(np.float32) / np.sqrt(dim)
+
+        compactor = cls(components, dtype=dtype, method=method)
+        if compactor.dtype == np.int8:
+            projected = compactor.project(X)
+            compactor.scale = np.maximum(np.abs(projected).max(axis=0), 1e-6) / 127
+        compactor.calibrate(X[:calibration_size])
+        return compactor
+
+    def calibrate(self, X, pairs: int = 5000):
+        X = _unit(X)
+        upper = np.triu_indices(len(X), k=1)
+        full = (1 - X @ X.T)[upper]
+        Y = self.decode(self.encode(X))
+        compact = (1 - Y @ Y.T)[upper]
+        # Only the close pairs matter: far ones never come near eps
+        nearest = np.argsort(full)[:pairs]
+        if len(nearest) < 2:
+            return
+        self.slope, self.offset = np.polyfit(compact[nearest], full[nearest], 1)
+        error = np.abs(self.offset + self.slope * compact[nearest] - full[nearest])
+        self.margin = float(np.quantile(error, 0.995))
+
+    def distances(self, Y) -> np.ndarray:
+        """Calibrated estimate of the pairwise cosine distances behind decoded vectors `Y`."""
+        Y = np.asarray(Y, dtype=np.float32)
+        D = np.clip(self.offset + self.slope * (1 - Y @ Y.T), 0, 2)
+        np.fill_diagonal(D, 0)
+        return D
+
+    def project(self, X) -> np.ndarray:
+        """Projections of the unit vectors of `X`, as float32."""
+        return _unit(X) @ self.components
+
+    def encode(self, X) -> np.ndarray:
+        Y = self.project(X)
+        if self.dtype == np.int8:
+            return np.clip(np.rint(Y / self.scale), -127, 127).astype(np.int8)
+        return Y.astype(self.dtype)
+
+    def decode(self, codes) -> np.ndarray:
+        """Codes back to float32 projections, whose dot products approximate the original cosines."""
+        Y = np.asarray(codes, dtype=np.float32)
+        if self.scale is not None:
+            Y = Y * self.scale
+        return Y
+
+    def bytes_per_vector(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    def save(self, path):
+        arrays = {'components': self.components, 'dtype': np.array(self.dtype.name), 'method': np.array(self.method),
+                  'calibration': np.array([self.offset, self.slope, self.margin])}
+        if self.scale is not None:
+            arrays['scale'] = self.scale
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['components'], dtype=str(data['dtype']), method=str(data['method']),
+                       scale=data['scale'] if 'scale' in data else None, calibration=data['calibration'])
+
+
+# ==============================================================================
+#  COMPACT STORE
+#  An EmbeddingStore whose shards hold codes instead of vectors, with the
+#  fitted compactor next to them. Reads decode to float32 projections, so
+#  code written for the full store works on it unchanged. `full` is the
+#  full-precision store that re-ranking falls back on.
+# ==============================================================================
+class CompactEmbeddingStore(EmbeddingStore):
+    def __init__(self, root=None, full: EmbeddingStore = None, compactor: Compactor = None):
+        root = Path(root or settings.EMBEDDING_COMPACT_DIR)
+        self.compactor = compactor or Compactor.load(root / COMPACTOR_FILE)
+        super().__init__(root, dtype=self.compactor.dtype)
+        self.full = full
+
+    @classmethod
+    def open(cls, root=None, full: EmbeddingStore = None):
+        """The compact store at `root`, or None if none has been built there."""
+        root = Path(root or settings.EMBEDDING_COMPACT_DIR)
+        if not (root / COMPACTOR_FILE).exists():
+            return None
+        return cls(root, full=full)
+
+    @classmethod
+    def build(cls, full: EmbeddingStore, root=None, dim: int = 128, method: str = 'pca', dtype: str = 'int8',
+              sample_size: int = 20000, seed: int = 0, batch_size: int = 10000):
+        """
+        Fit a compactor on a random sample of `full` and encode every vector
+        of it into a new compact store at `root`, replacing any previous one.
+        """
+        root = Path(root or settings.EMBEDDING_COMPACT_DIR)
+        if not len(full):
+            raise ValueError("The embedding store is empty; run sync_embedding_store first.")
+        # Sample shard by shard, so the archive is never loaded as a whole
+        rows = sorted(random.Random(seed).sample(range(len(full)), min(sample_size, len(full))))
+        sample, offset = [], 0
+        for shard in full.shards():
+            shard_ids, _, shard_vectors = full._load_shard(shard)
+            picked = [row - offset for row in rows if offset <= row < offset + len(shard_ids)]
+            if picked:
+                sample.append(np.asarray(shard_vectors[picked], dtype=np.float32))
+            offset += len(shard_ids)
+        compactor = Compactor.fit(np.concatenate(sample), dim=dim, method=method, dtype=dtype, seed=seed)
+
+        shutil.rmtree(root, ignore_errors=True)
+        root.mkdir(parents=True)
+        compactor.save(root / COMPACTOR_FILE)
+        store = cls(root, full=full, compactor=compactor)
+        for shard in full.shards():
+            shard_ids, dates, shard_vectors = full._load_shard(shard)
+            for start in range(0, len(shard_ids), batch_size):
+                end = start + batch_size
+                store.upsert(shard_ids[start:end], shard_vectors[start:end], dates[start:end])
+        return store
+
+    def upsert(self, ids: list[str], embeddings, date_keys: list[int]):
+        super().upsert(ids, self.compactor.encode(embeddings), date_keys)
+
+    def codes(self, date_from: int = None, date_to: int = None):
+        """(ids, date_keys, codes) as stored, without decoding."""
+        return super().vectors(date_from, date_to)
+
+    def vectors(self, date_from: int = None, date_to: int = None):
+        ids, dates, codes = self.codes(date_from, date_to)
+        return ids, dates, self.compactor.decode(codes) if ids else codes
+
+    def get(self, ids: list[str]):
+        codes = super().get(ids)
+        return self.compactor.decode(codes) if len(ids) else codes
+
+    def nbytes(self) -> int:
+        return sum((self.root / f"{shard}.npy").stat().st_size for shard in self.shards())
+
+
+# ==============================================================================
+#  RE-RANKING
+#  Compact vectors decide what is clearly near or clearly far; where the
+#  answer is close, the full-precision vectors of just those items are read
+#  from the memory-mapped full store and decide instead.
+# ==============================================================================
+def refined_cosine_distances(X, ids: list[str], compactor: Compactor, full: EmbeddingStore = None,
+                             eps: float = 0.12) -> np.ndarray:
+    """
+    Pairwise cosine distances estimated from the decoded vectors `X`. Pairs
+    within the compactor's calibrated margin of `eps`, where a DBSCAN link
+    could flip, are measured again with the full vectors from `full` when
+    it has them.
+    """
+    D = compactor.distances(X)
+    if full is None:
+        return D
+
+    close = np.abs(D - eps) <= compactor.margin
+    np.fill_diagonal(close, False)
+    rows = np.flatnonzero(close.any(axis=1))
+    rows = np.array([r for r in rows if ids[r] in full], dtype=int)
+    if len(rows):
+        F = _unit(full.get([ids[r] for r in rows]))
+        block = np.ix_(rows, rows)
+        D[block] = np.where(close[block], np.clip(1 - F @ F.T, 0, 2), D[block])
+    return D
+
+
+def search(query, store: CompactEmbeddingStore, k: int = 10, date_from: int = None, date_to: int = None,
+           rerank: int = None, batch_size: int = 65536) -> list[tuple]:
+    """
+    Top-k (id, date_key, cosine distance) for `query` over the compact store.
+    The `k * rerank` best candidates by compact score are re-scored with the
+    full vectors when the store has a full store; rerank=0 skips that.
+    """
+    rerank = settings.EMBEDDING_COMPACT_RERANK if rerank is None else rerank
+    ids, dates, codes = store.codes(date_from, date_to)
+    if not ids:
+        return []
+    q = store.compactor.project(query)[0]
+    n_candidates = min(len(ids), k * rerank if store.full is not None and rerank else k)
+
+    # Score batch by batch so only one batch of codes is decoded at a time
+    scores = np.empty(len(ids), dtype=np.float32)
+    for start in range(0, len(ids), batch_size):
+        scores[start:start + batch_size] = store.compactor.decode(codes[start:start + batch_size]) @ q
+    candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+
+    if store.full is not None and rerank:
+        exact = [i for i in candidates if ids[i] in store.full]
+        if exact:
+            full_scores = _unit(store.full.get([ids[i] for i in exact])) @ _unit(query)[0]
+            scores[exact] = full_scores
+    top = sorted(candidates, key=lambda i: -scores[i])[:k]
+    return [(ids[i], int(dates[i]), float(1 - scores[i])) for i in top]
+
+
+# ==============================================================================
+#  QUALITY REPORT
+#  Compares a compact store against the full-precision store it was built
+#  from: bytes per vector, search recall@k with and without re-ranking, and
+#  how often clustering a day gives the same partition as full precision.
+# ==============================================================================
+def evaluate(full: EmbeddingStore, compact: CompactEmbeddingStore, k: int = 10, queries: int = 200,
+             days: int = 30, eps: float = 0.12, noise: float = 0.35, seed: int = 0,
+             date_from: int = None, date_to: int = None) -> dict:
+    """
+    The exact search baseline scans the full vectors between `date_from`
+    and `date_to` in memory, so narrow the range on very large archives.
+    """
+    from sklearn.cluster import DBSCAN
+    from sklearn.metrics import adjusted_rand_score
+
+    rng = np.random.default_rng(seed)
+    ids, dates, vectors = full.vectors(date_from, date_to)
+    full_dim = vectors.shape[1]
+    report = {
+        'vectors': len(ids),
+        'full_bytes': len(ids) * full_dim * full.dtype.itemsize,
+        'compact_bytes': len(ids) * compact.compactor.bytes_per_vector(),
+        'full_dim': full_dim,
+        'dim': compact.compactor.dim,
+        'dtype': compact.compactor.dtype.name,
+        'method': compact.compactor.method,
+    }
+
+    # Search: queries are archive vectors plus noise, like a query phrased
+    # differently from the script it should find
+    X = _unit(vectors)
+    rows = rng.choice(len(ids), size=min(queries, len(ids)), replace=False)
+    Q = _unit(X[rows] + noise * rng.standard_normal((len(rows), full_dim)).astype(np.float32) / np.sqrt(full_dim))
+    truth = np.argsort(-(Q @ X.T), axis=1)[:, :k]
+    position = {item_id: i for i, item_id in enumerate(ids)}
+    for name, rerank in (('recall_compact', 0), ('recall_reranked', None)):
+        hits = 0
+        for q, expected in zip(Q, truth):
+            found = {position[item_id] for item_id, _, _ in
+                     search(q, compact, k=k, date_from=date_from, date_to=date_to, rerank=rerank)}
+            hits += len(found & set(expected.tolist()))
+        report[name] = hits / (len(Q) * min(k, len(ids)))
+
+    # Clustering: per-day DBSCAN partitions against full precision
+    day_keys = sorted(set(int(d) for d in dates))
+    day_keys = sorted(rng.choice(day_keys, size=min(days, len(day_keys)), replace=False).tolist())
+    pairs = close = 0
+    for name, refine in (('cluster_compact', None), ('cluster_refined', full)):
+        scores, same = [], 0
+        for key in day_keys:
+            day_ids, _, day_vectors = full.vectors(key, key)
+            if len(day_ids) < 2:
+                continue
+            expected = DBSCAN(eps=eps, min_samples=1, metric='cosine').fit(_unit(day_vectors)).labels_
+            decoded = compact.get(day_ids)
+            D = refined_cosine_distances(decoded, day_ids, compact.compactor, refine, eps)
+            labels = DBSCAN(eps=eps, min_samples=1, metric='precomputed').fit(D).labels_
+            scores.append(adjusted_rand_score(expected, labels))
+            same += scores[-1] == 1.0
+            if refine is not None:
+                n = len(day_ids)
+                pairs += n * (n - 1) // 2
+                close += int(np.triu(np.abs(compact.compactor.distances(decoded) - eps)
+                                     <= compact.compactor.margin, k=1).sum())
+        report[name] = {'ari': float(np.mean(scores)) if scores else 1.0, 'identical_days': same,
+                        'days': len(scores)}
+    report['margin'] = compact.compactor.margin
+    report['remeasured_pairs'] = close / pairs if pairs else 0.0
+    return report
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['vectors']} vectors, {report['full_dim']}-dim float -> {report['dim']}-dim {report['dtype']} "
+        f"({report['method']})",
+        f"  vector bytes: {report['full_bytes'] / 2**20:.1f} MiB -> {report['compact_bytes'] / 2**20:.1f} MiB "
+        f"({report['full_bytes'] / max(report['compact_bytes'], 1):.1f}x smaller)",
+        f"  search recall@k: compact only {report['recall_compact']:.3f}, "
+        f"re-ranked with full vectors {report['recall_reranked']:.3f}",
+    ]
+    for name, label in (('cluster_compact', 'compact only'), ('cluster_refined', 'refined near eps')):
+        result = report[name]
+        lines.append(f"  clustering vs full precision, {label}: mean ARI {result['ari']:.3f}, "
+                     f"{result['identical_days']}/{result['days']} days identical")
+    lines.append(f"  calibrated margin {report['margin']:.3f}: {report['remeasured_pairs']:.1%} of a day's pairs "
+                 f"re-measured in full precision")
+    return "\n".join(lines)
@@ -0,0 +1,95 @@
+# api/daily_stats.py
+
+import collections
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import DailyCompanyStats, NewsArticle, TopicMembership
+
+
+# ==============================================================================
+#  MATERIALIZED DAILY STATS
+#  DailyCompanyStats rows are derived data: one day is rebuilt from that
+#  day's articles and topics (two queries) whenever either changes, so the
+#  trends endpoint never has to rescan articles or topics.
+# ==============================================================================
+def compute_daily_stats(day) -> list[DailyCompanyStats]:
+    """Unsaved DailyCompanyStats rows for every company that aired on `day`."""
+    articles = list(
+        NewsArticle.objects.filter(article_date=day)
+        .order_by('article_company', 'article_order', 'id')
+        .values('id', 'article_company', 'article_order', length=F('script_blob__size'))
+    )
+    memberships = list(
+        TopicMembership.objects.filter(topic_date=day)
+        .values('article_id', 'article_company', 'topic_id', 'topic__label',
+                'topic__company_count', 'topic__item_count', 'topic__position')
+    )
+
+    by_company = collections.defaultdict(list)
+    for article in articles:
+        by_company[article['article_company']].append(article)
+
+    topics_of_article = collections.defaultdict(list)
+    for m in memberships:
+        topics_of_article[m['article_id']].append(m)
+
+    # The day's top story: covered by the most companies, then the most items
+    top = min(
+        memberships,
+        key=lambda m: (-m['topic__company_count'], -m['topic__item_count'], m['topic__position']),
+        default=None,
+    )
+
+    rows = []
+    for company, company_articles in by_company.items():
+        covered = {}
+        for article in company_articles:
+            for m in topics_of_article[article['id']]:
+                covered.setdefault(m['topic_id'], m)
+        unique = [m['topic__label'] for m in covered.values() if m['topic__company_count'] == 1]
+
+        lead = topics_of_article[company_articles[0]['id']]
+        top_rank = None
+        if top is not None:
+            for rank, article in enumerate(company_articles, start=1):
+                if any(m['topic_id'] == top['topic_id'] for m in topics_of_article[article['id']]):
+                    top_rank = rank
+                    break
+
+        rows.append(DailyCompanyStats(
+            stats_date=day,
+            article_company=company,
+            item_count=len(company_articles),
+            avg_segment_length=sum(a['length'] or 0 for a in company_articles) / len(company_articles),
+            topic_count=len(covered),
+            unique_topic_count=len(unique),
+            unique_topic_labels=unique,
+            lead_topic_label=min(lead, key=lambda m: m['topic__position'])['topic__label'] if lead else '',
+            top_topic_label=top['topic__label'] if top else '',
+            top_topic_rank=top_rank,
+        ))
+    return rows
+
+
+def refresh_daily_stats(day) -> list[DailyCompanyStats]:
+    """
+    Rebuild the materialized rows of one day: upsert a row per company that
+    aired and drop rows of companies that no longer have articles that day.
+    """
+    rows = compute_daily_stats(day)
+    with transaction.atomic():
+        DailyCompanyStats.objects.filter(stats_date=day).exclude(
+            article_company__in=[row.article_company for row in rows]
+        ).delete()
+        DailyCompanyStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['stats_date', 'article_company'],
+            update_fields=[
+                'item_count', 'avg_segment_length', 'topic_count', 'unique_topic_count', 'unique_topic_labels',
+                'lead_topic_label', 'top_topic_label', 'top_topic_rank', 'updated_at',
+            ],
+        )
+    return rows
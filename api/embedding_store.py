@@ -0,0 +1,205 @@
+# api/embedding_store.py
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+
+class EmbeddingStore:
+    """
+    Local copy of the article embeddings as memory-mapped `.npy` shards, one
+    per month, so clustering and analytics can read vectors straight from
+    disk instead of deserializing Chroma's Python float lists.
+
+    Each shard `<YYYY_MM>` is three files:
+      - `<YYYY_MM>.npy`        (n, dim) float16 or float32 vectors
+      - `<YYYY_MM>.dates.npy`  (n,) int32 date keys (YYYYMMDD)
+      - `<YYYY_MM>.ids.json`   the Chroma id of each row
+    An in-memory id -> (shard, row) index is built from the ids files.
+    """
+
+    def __init__(self, root=None, dtype=None):
+        self.root = Path(root or settings.EMBEDDING_STORE_DIR)
+        self.dtype = np.dtype(dtype or settings.EMBEDDING_STORE_DTYPE)
+        self._index = None
+
+    # --------------------------------------------------------------------------
+    #  Layout
+    # --------------------------------------------------------------------------
+    @staticmethod
+    def shard_for(date_key: int) -> str:
+        return f"{date_key // 10000:04d}_{date_key // 100 % 100:02d}"
+
+    def _paths(self, shard: str):
+        return (
+            self.root / f"{shard}.npy",
+            self.root / f"{shard}.dates.npy",
+            self.root / f"{shard}.ids.json",
+        )
+
+    def shards(self) -> list[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name[:-len(".ids.json")] for p in self.root.glob("*.ids.json"))
+
+    def _load_shard(self, shard: str):
+        vectors_path, dates_path, ids_path = self._paths(shard)
+        ids = json.loads(ids_path.read_text())
+        vectors = np.load(vectors_path, mmap_mode="r")
+        dates = np.load(dates_path, mmap_mode="r")
+        return ids, dates, vectors
+
+    @property
+    def index(self) -> dict:
+        if self._index is None:
+            self._index = {}
+            for shard in self.shards():
+                ids = json.loads(self._paths(shard)[2].read_text())
+                for row, item_id in enumerate(ids):
+                    self._index[item_id] = (shard, row)
+        return self._index
+
+    def __contains__(self, item_id) -> bool:
+        return item_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    # --------------------------------------------------------------------------
+    #  Writes
+    # --------------------------------------------------------------------------
+    def upsert(self, ids: list[str], embeddings, date_keys: list[int]):
+        """
+        Insert or overwrite vectors. Existing rows are updated in place through
+        a writable memmap; new rows are appended by rewriting the (small)
+        monthly shard and swapping it in atomically.
+        """
+        embeddings = np.asarray(embeddings, dtype=self.dtype)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        by_shard = {}
+        for i, (item_id, key) in enumerate(zip(ids, date_keys)):
+            by_shard.setdefault(self.shard_for(int(key)), []).append((i, item_id, int(key)))
+
+        for shard, rows in by_shard.items():
+            vectors_path, dates_path, ids_path = self._paths(shard)
+            if ids_path.exists():
+                shard_ids = json.loads(ids_path.read_text())
+            else:
+                shard_ids = []
+            positions = {item_id: row for row, item_id in enumerate(shard_ids)}
+
+            updates = [(positions[item_id], i, key) for i, item_id, key in rows if item_id in positions]
+            appends = [(i, item_id, key) for i, item_id, key in rows if item_id not in positions]
+
+            if updates:
+                vectors = np.load(vectors_path, mmap_mode="r+")
+                dates = np.load(dates_path, mmap_mode="r+")
+                for row, i, key in updates:
+                    vectors[row] = embeddings[i]
+                    dates[row] = key
+                vectors.flush()
+                dates.flush()
+                del vectors, dates
+
+            if appends:
+                new_vectors = embeddings[[i for i, _, _ in appends]]
+                new_dates = np.array([key for _, _, key in appends], dtype=np.int32)
+                if shard_ids:
+                    new_vectors = np.concatenate([np.load(vectors_path, mmap_mode="r"), new_vectors])
+                    new_dates = np.concatenate([np.load(dates_path, mmap_mode="r"), new_dates])
+                shard_ids = shard_ids + [item_id for _, item_id, _ in appends]
+
+                self._atomic_save(vectors_path, new_vectors)
+                self._atomic_save(dates_path, new_dates)
+                tmp = ids_path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(shard_ids))
+                os.replace(tmp, ids_path)
+
+                if self._index is not None:
+                    for row, item_id in enumerate(shard_ids):
+                        self._index[item_id] = (shard, row)
+
+    def rename(self, mapping: dict) -> int:
+        """
+        Re-key rows from old to new ids without touching their vectors. Rows
+        whose new id is already present keep their old id. Returns the number
+        of rows renamed.
+        """
+        renamed = 0
+        present = set(self.index)
+        for shard in self.shards():
+            ids_path = self._paths(shard)[2]
+            shard_ids = json.loads(ids_path.read_text())
+            changed = [
+                mapping[item_id] if item_id in mapping and mapping[item_id] not in present else item_id
+                for item_id in shard_ids
+            ]
+            count = sum(a != b for a, b in zip(shard_ids, changed))
+            if count:
+                tmp = ids_path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(changed))
+                os.replace(tmp, ids_path)
+                renamed += count
+        self._index = None
+        return renamed
+
+    @staticmethod
+    def _atomic_save(path: Path, array):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+
+    # --------------------------------------------------------------------------
+    #  Reads
+    # --------------------------------------------------------------------------
+    def vectors(self, date_from: int = None, date_to: int = None):
+        """
+        (ids, date_keys, vectors) for every row with date_from <= date <= date_to
+        (inclusive YYYYMMDD keys; None leaves the range open). Whole shards are
+        returned as memmap views without copying; partial shards copy only the
+        selected rows.
+        """
+        all_ids, all_dates, all_vectors = [], [], []
+        for shard in self.shards():
+            first = int(shard.replace("_", "")) * 100 + 1
+            last = first + 30
+            if (date_from and last < date_from) or (date_to and first > date_to):
+                continue
+
+            ids, dates, vectors = self._load_shard(shard)
+            mask = np.ones(len(ids), dtype=bool)
+            if date_from:
+                mask &= dates >= date_from
+            if date_to:
+                mask &= dates <= date_to
+            if mask.all():
+                all_ids.extend(ids)
+                all_dates.append(dates)
+                all_vectors.append(vectors)
+            elif mask.any():
+                rows = np.flatnonzero(mask)
+                all_ids.extend(ids[r] for r in rows)
+                all_dates.append(dates[rows])
+                all_vectors.append(vectors[rows])
+
+        if not all_vectors:
+            return [], np.empty(0, dtype=np.int32), np.empty((0, 0), dtype=self.dtype)
+        if len(all_vectors) == 1:
+            return all_ids, all_dates[0], all_vectors[0]
+        return all_ids, np.concatenate(all_dates), np.concatenate(all_vectors)
+
+    def get(self, ids: list[str]):
+        """Vectors for specific ids, in the given order."""
+        shards = {}
+        rows = []
+        for item_id in ids:
+            shard, row = self.index[item_id]
+            if shard not in shards:
+                shards[shard] = self._load_shard(shard)[2]
+            rows.append(shards[shard][row])
+        return np.stack(rows) if rows else np.empty((0, 0), dtype=self.dtype)
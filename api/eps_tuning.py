@@ -0,0 +1,148 @@
+# api/eps_tuning.py
+
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.sparse.csgraph import connected_components
+
+
+# ==============================================================================
+#  AUTOMATIC EPS
+#  The day's pairwise cosine distances are computed once, in one matrix
+#  product. Every candidate eps is then evaluated on that same matrix: with
+#  min_samples=1 DBSCAN is single linkage, so its clusters are the connected
+#  components of the graph D <= eps, found without re-running DBSCAN.
+#  Candidates come from a fixed grid plus quantiles of the k-nearest-neighbor
+#  distance profile, the classical DBSCAN heuristic. Each is scored by
+#    - silhouette on the precomputed distances: unrelated stories merged
+#      into one cluster, or one story split in two, both lower it
+#    - cross-broadcaster coverage: the share of segments whose cluster
+#      spans more than one broadcaster, since the same story usually airs
+#      on several; it rewards not splitting identical stories
+#  and candidates whose largest cluster takes more than `max_cluster_share`
+#  of the day (chaining) are ruled out. All of it runs before any LLM call.
+# ==============================================================================
+DEFAULT_EPS_GRID = tuple(round(0.04 + 0.01 * i, 2) for i in range(27))  # 0.04 .. 0.30
+
+
+@dataclass
+class EpsCandidate:
+    eps: float
+    clusters: int
+    silhouette: float
+    coverage: float
+    largest_share: float
+    score: float = float('-inf')
+
+    def __str__(self):
+        return (f"eps={self.eps:.3f}  clusters={self.clusters:3d}  silhouette={self.silhouette:6.3f}  "
+                f"coverage={self.coverage:.2f}  largest={self.largest_share:.2f}  score={self.score:6.3f}")
+
+
+def cosine_distances(X) -> np.ndarray:
+    X = np.asarray(X, dtype=np.float32).reshape(len(X), -1)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    X = X / np.where(norms == 0, 1, norms)
+    D = np.clip(1 - X @ X.T, 0, 2)
+    np.fill_diagonal(D, 0)
+    return D
+
+
+def knn_distances(D: np.ndarray, k: int = 1) -> np.ndarray:
+    """Distance from each point to its k-th nearest other point."""
+    k = min(k, len(D) - 1)
+    others = D + np.diag(np.full(len(D), np.inf))
+    return np.partition(others, k - 1, axis=1)[:, k - 1]
+
+
+def candidate_eps(D: np.ndarray, k: int = 1, grid=DEFAULT_EPS_GRID) -> list[float]:
+    knn = knn_distances(D, k)
+    quantiles = np.quantile(knn, np.linspace(0.1, 0.9, 9))
+    low, high = min(grid), max(grid)
+    return sorted({*grid, *(round(float(q), 3) for q in quantiles if low <= q <= high)})
+
+
+def labels_at(D: np.ndarray, eps: float, min_samples: int = 1) -> np.ndarray:
+    if min_samples <= 1:
+        return connected_components(D <= eps, directed=False)[1]
+    from sklearn.cluster import DBSCAN
+    return DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit(D).labels_
+
+
+def silhouette(D: np.ndarray, labels: np.ndarray) -> float:
+    """Mean silhouette on precomputed distances; singletons and noise score 0, as in sklearn."""
+    n = len(labels)
+    clusters = np.unique(labels)
+    if not 2 <= len(clusters) <= n - 1:
+        return -1.0
+    onehot = (labels[:, None] == clusters[None, :]).astype(np.float32)
+    sizes = onehot.sum(axis=0)
+    sums = D @ onehot                                   # (n, clusters) summed distances
+    own = np.searchsorted(clusters, labels)
+    own_size = sizes[own]
+    a = sums[np.arange(n), own] / np.maximum(own_size - 1, 1)
+    others = sums / sizes
+    others[np.arange(n), own] = np.inf
+    b = others.min(axis=1)
+    s = np.where(own_size > 1, (b - a) / np.maximum(np.maximum(a, b), 1e-12), 0.0)
+    if -1 in clusters:
+        s[labels == -1] = 0.0
+    return float(s.mean())
+
+
+def coverage(labels: np.ndarray, companies: list) -> float:
+    """Share of points whose cluster holds more than one broadcaster."""
+    spans = {}
+    for label, company in zip(labels, companies):
+        if label != -1:
+            spans.setdefault(label, set()).update(company if isinstance(company, (set, frozenset)) else {company})
+    return float(np.mean([label != -1 and len(spans[label]) > 1 for label in labels]))
+
+
+def sweep(D: np.ndarray, companies: list, eps_values=None, min_samples: int = 1, coverage_weight: float = 0.5,
+          max_cluster_share: float = 0.3) -> list[EpsCandidate]:
+    """
+    Score every candidate eps on the distance matrix `D`. `companies` holds
+    each point's broadcaster, or a set of them for a point that stands for
+    a near-duplicate group.
+    """
+    results = []
+    for eps in sorted(eps_values or candidate_eps(D, k=max(1, min_samples))):
+        labels = labels_at(D, eps, min_samples)
+        clustered = labels[labels != -1]
+        largest = np.bincount(clustered).max() / len(labels) if len(clustered) else 0.0
+        candidate = EpsCandidate(
+            eps=eps, clusters=len(set(clustered.tolist())), silhouette=silhouette(D, labels),
+            coverage=coverage(labels, companies), largest_share=float(largest),
+        )
+        if candidate.largest_share <= max_cluster_share and candidate.silhouette > -1:
+            candidate.score = candidate.silhouette + coverage_weight * candidate.coverage
+        results.append(candidate)
+    return results
+
+
+def tune_eps(X, companies: list, default: float = 0.12, D: np.ndarray = None,
+             **kwargs) -> tuple[float, list[EpsCandidate]]:
+    """
+    The best-scoring eps for the vectors `X`, and the whole sweep. Pass the
+    distance matrix `D` instead (with X=None) when clustering runs on other
+    distances than exact cosines, e.g. the compact store's calibrated ones,
+    so eps is tuned on the scale it is applied to. A range
+    of eps values often clusters the day identically; the middle of the
+    first best-scoring run is picked, as far as possible from the split on
+    one side and the merge on the other. Falls back to `default` when no
+    candidate is usable, e.g. for a day with fewer than three segments.
+    """
+    if D is None:
+        D = cosine_distances(X)
+    if len(D) < 3:
+        return default, []
+    results = sweep(D, companies, **kwargs)
+    best = max(c.score for c in results)
+    if best == float('-inf'):
+        return default, results
+    first = next(i for i, c in enumerate(results) if c.score == best)
+    last = first
+    while last + 1 < len(results) and results[last + 1].score == best:
+        last += 1
+    return results[(first + last) // 2].eps, results
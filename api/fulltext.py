@@ -0,0 +1,186 @@
+# api/fulltext.py
+
+import re
+
+from django.db import connection
+
+from .blobs import decompress
+from .models import NewsArticle
+
+
+# ==============================================================================
+#  FULL-TEXT INDEX
+#  SQLite FTS5 over character bigrams. Korean has no spaces between a word
+#  and its particles (국회가, 국회는), and many words are only two syllables,
+#  so word tokenizers miss matches and the trigram tokenizer cannot find
+#  two-character terms at all. Each run of word characters is indexed as
+#  overlapping bigrams instead, and queries are turned into bigram phrases.
+# ==============================================================================
+FTS_TABLE = "api_newsarticle_fts"
+
+CREATE_FTS_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+    USING fts5(grams, tokenize = 'unicode61 remove_diacritics 0')
+"""
+
+_WORD_RUN = re.compile(r"\w+")
+_QUERY_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def is_supported(conn=None) -> bool:
+    return (conn or connection).vendor == "sqlite"
+
+
+def ngrams(text: str) -> str:
+    """
+    Space-separated character bigrams of every word run in `text`.
+    Single-character runs are kept as they are.
+    """
+    grams = []
+    for run in _WORD_RUN.findall((text or "").lower()):
+        if len(run) == 1:
+            grams.append(run)
+        else:
+            grams.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return " ".join(grams)
+
+
+def query_terms(q: str) -> list[str]:
+    """Split a query into terms; "double quoted" parts stay one phrase."""
+    return [phrase or word for phrase, word in _QUERY_TERM.findall(q) if (phrase or word).strip()]
+
+
+def build_match(q: str) -> str:
+    """
+    FTS5 MATCH expression for a user query. Every term becomes a phrase of
+    its bigrams, so a term matches wherever it occurs as a substring, and
+    the terms are ANDed together. A single character becomes a prefix query.
+    """
+    parts = []
+    for term in query_terms(q):
+        grams = ngrams(term).split()
+        if not grams:
+            continue
+        if len(grams) == 1 and len(grams[0]) == 1:
+            parts.append(f'"{grams[0]}" *')
+        else:
+            parts.append('"' + " ".join(grams) + '"')
+    return " AND ".join(parts)
+
+
+def index_article(article_id: int, title: str, script: str):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [article_id])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, grams) VALUES (%s, %s)",
+            [article_id, ngrams(f"{title}\n{script}")],
+        )
+
+
+def remove_article(article_id: int):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [article_id])
+
+
+def rebuild_index(batch_size: int = 1000):
+    """Re-index every article, e.g. after bulk writes that bypass signals."""
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_FTS_SQL)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        rows = NewsArticle.objects.values_list("id", "article_title", "script_blob__data", "script_blob__codec")
+        batch = []
+        for article_id, title, data, codec in rows.iterator(chunk_size=batch_size):
+            batch.append((article_id, ngrams(f"{title}\n{decompress(data, codec)}")))
+            if len(batch) >= batch_size:
+                cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, grams) VALUES (%s, %s)", batch)
+                batch = []
+        if batch:
+            cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, grams) VALUES (%s, %s)", batch)
+
+
+# ==============================================================================
+#  SEARCH
+# ==============================================================================
+def highlight(text: str, terms: list[str], width: int = 60, tag=("<mark>", "</mark>")) -> str:
+    """
+    Snippet of `text` around the first matching term with every term
+    occurrence wrapped in `tag`. Matching is case-insensitive.
+    """
+    text = text or ""
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    first = pattern.search(text)
+    if not terms or first is None:
+        return text[:width * 2]
+
+    start = max(first.start() - width, 0)
+    end = min(first.end() + width, len(text))
+    window = text[start:end]
+    window = pattern.sub(lambda m: f"{tag[0]}{m.group(0)}{tag[1]}", window)
+    return ("…" if start > 0 else "") + window + ("…" if end < len(text) else "")
+
+
+def fulltext_search(q: str, company=None, date_from=None, date_to=None, k: int = 20) -> list[dict]:
+    """
+    Articles whose title or script contains every term of `q`, best match
+    first, with a highlighted snippet. On databases other than SQLite this
+    falls back to an icontains scan.
+    """
+    terms = query_terms(q)
+    match = build_match(q)
+    if not match:
+        return []
+
+    if is_supported():
+        sql = [
+            f"SELECT a.id FROM {FTS_TABLE} f",
+            f"JOIN {NewsArticle._meta.db_table} a ON a.id = f.rowid",
+            f"WHERE {FTS_TABLE} MATCH %s",
+        ]
+        params = [match]
+        if company:
+            sql.append("AND a.article_company = %s")
+            params.append(company)
+        if date_from:
+            sql.append("AND a.article_date >= %s")
+            params.append(date_from)
+        if date_to:
+            sql.append("AND a.article_date <= %s")
+            params.append(date_to)
+        sql.append("ORDER BY f.rank LIMIT %s")
+        params.append(k)
+
+        with connection.cursor() as cursor:
+            cursor.execute(" ".join(sql), params)
+            ids = [row[0] for row in cursor.fetchall()]
+        by_id = NewsArticle.objects.with_script().in_bulk(ids)
+        articles = [by_id[i] for i in ids if i in by_id]
+    else:
+        # Scripts are stored compressed, so the scan matches them in Python
+        qs = NewsArticle.objects.with_script()
+        if company:
+            qs = qs.filter(article_company=company)
+        if date_from:
+            qs = qs.filter(article_date__gte=date_from)
+        if date_to:
+            qs = qs.filter(article_date__lte=date_to)
+        lowered = [term.lower() for term in terms]
+        articles = []
+        for a in qs.order_by('-article_date', 'article_order').iterator(chunk_size=500):
+            text = f"{a.article_title}\n{a.article_script}".lower()
+            if all(term in text for term in lowered):
+                articles.append(a)
+                if len(articles) >= k:
+                    break
+
+    return [
+        {
+            "id": a.pk,
+            "company": a.article_company,
+            "date": a.article_date,
+            "order": a.article_order,
+            "title": a.article_title,
+            "url": a.article_url,
+            "highlight": highlight(a.article_script, terms),
+        }
+        for a in articles
+    ]
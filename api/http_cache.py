@@ -0,0 +1,129 @@
+# api/http_cache.py
+
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+
+# Every article page the scrapers download lives on one of these hosts.
+# Each host gets its own pooled adapter so keep-alive connections are reused
+# across the whole nightly run instead of being reopened per article.
+SCRAPER_HOSTS = (
+    "https://news.kbs.co.kr",
+    "https://imnews.imbc.com",
+    "https://news.sbs.co.kr",
+)
+
+
+class CacheMiss(requests.RequestException):
+    """Raised in offline mode when a URL has never been fetched."""
+
+
+class PageCache:
+    """
+    Gzip-compressed raw responses on disk, keyed by the sha1 of the URL.
+    Each entry is a `<key>.html.gz` body plus a `<key>.json` sidecar holding
+    the URL, encoding and validators (ETag / Last-Modified).
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        folder = self.cache_dir / key[:2]
+        return folder / f"{key}.html.gz", folder / f"{key}.json"
+
+    def get(self, url: str):
+        """Return (body_bytes, meta) for a cached URL, or (None, {})."""
+        body_path, meta_path = self._paths(url)
+        if not body_path.exists() or not meta_path.exists():
+            return None, {}
+        with gzip.open(body_path, "rb") as f:
+            body = f.read()
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        return body, meta
+
+    def put(self, url: str, body: bytes, encoding: str = "utf-8", headers=None):
+        body_path, meta_path = self._paths(url)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        headers = headers or {}
+        meta = {
+            "url": url,
+            "encoding": encoding,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        with gzip.open(body_path, "wb") as f:
+            f.write(body)
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    def get_text(self, url: str):
+        """Decoded body of a cached URL, handy for offline parser fixtures."""
+        body, meta = self.get(url)
+        if body is None:
+            return None
+        return body.decode(meta.get("encoding") or "utf-8", errors="replace")
+
+    def put_text(self, url: str, text: str):
+        self.put(url, text.encode("utf-8"), encoding="utf-8")
+
+
+class CachedSession(requests.Session):
+    """
+    A `requests.Session` that revalidates article pages against the on-disk
+    cache with If-None-Match / If-Modified-Since and serves 304s from disk.
+
+    With `offline=True` the network is never touched: every GET is answered
+    from the cache, and a URL that was never fetched raises `CacheMiss`.
+    """
+
+    def __init__(self, cache_dir=None, offline: bool = False, pool_maxsize: int = 8, hosts=SCRAPER_HOSTS):
+        super().__init__()
+        if cache_dir is None:
+            cache_dir = settings.SCRAPE_CACHE_DIR
+        self.cache = PageCache(cache_dir)
+        self.offline = offline
+
+        for host in hosts:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+            self.mount(host, adapter)
+
+    def _from_cache(self, url: str, body: bytes, meta: dict) -> requests.Response:
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response._content = body
+        response.encoding = meta.get("encoding") or "utf-8"
+        response.from_cache = True
+        return response
+
+    def get(self, url, **kwargs):
+        body, meta = self.cache.get(url)
+
+        if self.offline:
+            if body is None:
+                raise CacheMiss(f"{url} is not in the page cache")
+            return self._from_cache(url, body, meta)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if body is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = super().get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and body is not None:
+            return self._from_cache(url, body, meta)
+
+        if response.ok:
+            self.cache.put(url, response.content, response.encoding, response.headers)
+        response.from_cache = False
+        return response
@@ -0,0 +1,58 @@
+# api/jobs.py
+
+import asyncio
+
+from django.utils import timezone
+
+from .llm import analyze_article_script_async
+from .models import AnalysisJob, AnalysisResult, NewsArticle
+
+# asyncio only keeps weak references to tasks; hold running jobs here so
+# they are not garbage-collected before they finish
+_running_jobs = set()
+
+
+async def run_analysis_job(job: AnalysisJob) -> AnalysisJob:
+    """
+    Analyze the job's article through the async LLM client and save the
+    result, moving the job from queued to running to done (or failed).
+    """
+    try:
+        article = await NewsArticle.objects.with_script().aget(pk=job.article_id)
+        job.status = AnalysisJob.STATUS_RUNNING
+        await job.asave(update_fields=['status', 'updated_at'])
+
+        analysis = await analyze_article_script_async(article.article_script)
+
+        if analysis is None:
+            job.status = AnalysisJob.STATUS_FAILED
+            job.error = "The model reply could not be obtained or failed validation after repair."
+        else:
+            await AnalysisResult.objects.aupdate_or_create(
+                article=article,
+                defaults={
+                    'headline_analysis': analysis.get('headline_analysis', {}),
+                    'key_agenda_items': analysis.get('key_agenda_items', []),
+                    'editorial_critique': analysis.get('editorial_critique', 'Critique failed.'),
+                    'notable_elements': analysis.get('notable_elements', {}),
+                    'status': AnalysisResult.STATUS_COMPLETE,
+                    'content_hash': article.content_hash,
+                },
+            )
+            job.status = AnalysisJob.STATUS_DONE
+    except Exception as e:
+        # A background task's exception is never seen by anyone; record it
+        # on the job so it does not stay 'running' forever
+        job.status = AnalysisJob.STATUS_FAILED
+        job.error = f"{type(e).__name__}: {e}"
+    job.finished_at = timezone.now()
+    await job.asave(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+    return job
+
+
+def start_analysis_job(job: AnalysisJob) -> asyncio.Task:
+    """Run a job in the background on the current (server) event loop."""
+    task = asyncio.get_running_loop().create_task(run_analysis_job(job))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return task
@@ -0,0 +1,203 @@
+# api/llm.py
+
+import asyncio
+import functools
+import json
+import os
+import time
+
+import google.generativeai as genai
+from django.conf import settings
+from dotenv import load_dotenv
+
+from .llm_schemas import LLM_SCHEMAS, parse_and_validate, placeholder, repair_prompt, schema_stats
+from .profiling import stage
+
+
+# ==============================================================================
+#  MODEL BACKENDS
+#  settings.LLM_BACKEND picks the client: 'gemini' (google.generativeai) or
+#  'fake', a stand-in that waits FAKE_LLM_LATENCY seconds and replies with
+#  schema-valid placeholder JSON. Both expose the same generate_content /
+#  generate_content_async surface, so the pipeline, the async API and load
+#  tests run unchanged without a Gemini key.
+# ==============================================================================
+class FakeReply:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, model_name: str, generation_config: dict = None):
+        self.model_name = model_name
+        self.schema = (generation_config or {}).get("response_schema")
+
+    def _reply(self) -> FakeReply:
+        if self.schema is None:
+            return FakeReply("Placeholder topic label")
+        return FakeReply(json.dumps(placeholder(self.schema), ensure_ascii=False))
+
+    def generate_content(self, prompt, stream: bool = False):
+        time.sleep(settings.FAKE_LLM_LATENCY)
+        reply = self._reply()
+        if stream:
+            return [FakeReply(reply.text[i:i + 32]) for i in range(0, len(reply.text), 32)]
+        return reply
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(settings.FAKE_LLM_LATENCY)
+        return self._reply()
+
+
+@functools.cache
+def _configure_gemini():
+    load_dotenv()
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found. Please set it in your .env file.")
+    genai.configure(api_key=api_key)
+
+
+def get_model(model_name: str, generation_config: dict = None):
+    if settings.LLM_BACKEND == "fake":
+        return FakeModel(model_name, generation_config)
+    _configure_gemini()
+    return genai.GenerativeModel(model_name, generation_config=generation_config)
+
+
+def structured_model(model_name: str, schema_name: str):
+    return get_model(
+        model_name,
+        generation_config={"response_schema": LLM_SCHEMAS[schema_name], "response_mime_type": "application/json"}
+    )
+
+
+# ==============================================================================
+#  STRUCTURED GENERATION
+#  Sync and async variants share the validation and repair policy; the async
+#  ones await the model instead of blocking a worker thread on the network.
+# ==============================================================================
+def validate_or_repair(model, schema_name: str, text: str, max_repairs: int):
+    """
+    Validate a complete reply. A reply that fails to parse or validate is
+    sent back with its errors in a short repair-only prompt (the original
+    input is not resent), up to `max_repairs` times. Outcomes are counted in
+    `schema_stats`.
+    """
+    schema = LLM_SCHEMAS[schema_name]
+
+    for attempt in range(max_repairs + 1):
+        data, errors = parse_and_validate(text, schema)
+        if not errors:
+            schema_stats.record(schema_name, "ok" if attempt == 0 else "repaired")
+            return data
+        if attempt == max_repairs:
+            break
+
+        print(f"  - {schema_name} reply failed validation ({len(errors)} errors), requesting repair...")
+        try:
+            text = model.generate_content(repair_prompt(schema_name, text, errors)).text
+        except Exception as e:
+            print(f"An error occurred during {schema_name} repair: {e}")
+            break
+
+    print(f"Giving up on {schema_name}: {errors[:3]}")
+    schema_stats.record(schema_name, "failed")
+    return None
+
+
+async def validate_or_repair_async(model, schema_name: str, text: str, max_repairs: int):
+    """Async counterpart of validate_or_repair."""
+    schema = LLM_SCHEMAS[schema_name]
+
+    for attempt in range(max_repairs + 1):
+        data, errors = parse_and_validate(text, schema)
+        if not errors:
+            schema_stats.record(schema_name, "ok" if attempt == 0 else "repaired")
+            return data
+        if attempt == max_repairs:
+            break
+
+        print(f"  - {schema_name} reply failed validation ({len(errors)} errors), requesting repair...")
+        try:
+            text = (await model.generate_content_async(repair_prompt(schema_name, text, errors))).text
+        except Exception as e:
+            print(f"An error occurred during {schema_name} repair: {e}")
+            break
+
+    print(f"Giving up on {schema_name}: {errors[:3]}")
+    schema_stats.record(schema_name, "failed")
+    return None
+
+
+def generate_structured(model_name: str, prompt: str, schema_name: str, max_repairs: int = 2):
+    """
+    Call the model with the registry schema as `response_schema` and return
+    the validated reply, repairing it if needed. Returns None on failure.
+    """
+    model = structured_model(model_name, schema_name)
+
+    try:
+        with stage(f'llm request ({schema_name})'):
+            text = model.generate_content(prompt).text
+    except Exception as e:
+        print(f"An error occurred during {schema_name} generation: {e}")
+        schema_stats.record(schema_name, "failed")
+        return None
+
+    return validate_or_repair(model, schema_name, text, max_repairs)
+
+
+async def generate_structured_async(model_name: str, prompt: str, schema_name: str, max_repairs: int = 2):
+    """Async counterpart of generate_structured."""
+    model = structured_model(model_name, schema_name)
+
+    try:
+        text = (await model.generate_content_async(prompt)).text
+    except Exception as e:
+        print(f"An error occurred during {schema_name} generation: {e}")
+        schema_stats.record(schema_name, "failed")
+        return None
+
+    return await validate_or_repair_async(model, schema_name, text, max_repairs)
+
+
+# ==============================================================================
+#  ARTICLE ANALYSIS
+# ==============================================================================
+ARTICLE_ANALYSIS_MODEL = 'gemini-2.5-flash'
+
+
+def article_analysis_prompt(script_text: str) -> str:
+    # This is the most important part: The Prompt!
+    return f"""
+    You are a senior media analyst and broadcast news critic.
+    Perform a sophisticated analysis of the following news script, focusing on its editorial choices, framing, and potential biases in korean.
+
+
+    Your analysis must include the following components:
+    - headline_analysis: Analyze the main headline. What is the topic? How is it framed? What other major stories might have been downplayed?
+    - key_agenda_items: Identify 2-4 major news blocks. For each, describe the topic, its placement in the broadcast, and a brief analytic comment on the coverage angle.
+    - editorial_critique: Provide a 2-4 sentence paragraph assessing the overall editorial stance of the broadcast.
+    - notable_elements: List any stories claimed as "exclusives" and identify any potential major events that are conspicuously omitted from the broadcast.
+
+    Here is the news script:
+    ---
+    {script_text}
+    ---
+    """
+
+
+def analyze_article_script(script_text):
+    """
+    Sends a script to the LLM for analysis and returns the structured result.
+    """
+    # Returns None if the analysis fails even after repair
+    return generate_structured(ARTICLE_ANALYSIS_MODEL, article_analysis_prompt(script_text), "article_analysis")
+
+
+async def analyze_article_script_async(script_text):
+    """Async counterpart of analyze_article_script, used by the ASGI views."""
+    return await generate_structured_async(
+        ARTICLE_ANALYSIS_MODEL, article_analysis_prompt(script_text), "article_analysis"
+    )
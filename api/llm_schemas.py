@@ -0,0 +1,305 @@
+# api/llm_schemas.py
+
+import collections
+import json
+
+
+# ==============================================================================
+#  SCHEMA REGISTRY
+#  Every structured LLM output is declared here once. The same dicts are
+#  passed to Gemini as `response_schema` and used to validate the reply.
+#  Only the OpenAPI subset Gemini understands is used (type, properties,
+#  required, items, enum, description).
+# ==============================================================================
+HEADLINE_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "topic": {"type": "string", "description": "Topic of the main headline story."},
+        "framing": {"type": "string", "description": "How the headline story is framed."},
+        "downplayed_stories": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Other major stories that might have been downplayed.",
+        },
+    },
+    "required": ["topic", "framing", "downplayed_stories"],
+}
+
+KEY_AGENDA_ITEMS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "topic": {"type": "string"},
+            "placement": {"type": "string", "description": "Where in the broadcast the block runs."},
+            "comment": {"type": "string", "description": "Brief comment on the coverage angle."},
+        },
+        "required": ["topic", "placement", "comment"],
+    },
+}
+
+EDITORIAL_CRITIQUE_SCHEMA = {
+    "type": "string",
+    "description": "2-4 sentence assessment of the broadcast's overall editorial stance.",
+}
+
+NOTABLE_ELEMENTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "exclusives_claimed": {"type": "array", "items": {"type": "string"}},
+        "potential_omissions": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["exclusives_claimed", "potential_omissions"],
+}
+
+ARTICLE_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "headline_analysis": HEADLINE_ANALYSIS_SCHEMA,
+        "key_agenda_items": KEY_AGENDA_ITEMS_SCHEMA,
+        "editorial_critique": EDITORIAL_CRITIQUE_SCHEMA,
+        "notable_elements": NOTABLE_ELEMENTS_SCHEMA,
+    },
+    "required": ["headline_analysis", "key_agenda_items", "editorial_critique", "notable_elements"],
+}
+
+COMPARATIVE_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "primary_narrative": {"type": "string", "description": "The primary narrative of the day."},
+        "company_focus": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "company": {"type": "string"},
+                    "focus": {"type": "string"},
+                },
+                "required": ["company", "focus"],
+            },
+        },
+        "unique_coverage": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "company": {"type": "string"},
+                    "topic": {"type": "string"},
+                },
+                "required": ["company", "topic"],
+            },
+        },
+        "potential_omissions": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["primary_narrative", "company_focus", "unique_coverage", "potential_omissions"],
+}
+
+LLM_SCHEMAS = {
+    "headline_analysis": HEADLINE_ANALYSIS_SCHEMA,
+    "key_agenda_items": KEY_AGENDA_ITEMS_SCHEMA,
+    "editorial_critique": EDITORIAL_CRITIQUE_SCHEMA,
+    "notable_elements": NOTABLE_ELEMENTS_SCHEMA,
+    "article_analysis": ARTICLE_ANALYSIS_SCHEMA,
+    "comparative_analysis": COMPARATIVE_ANALYSIS_SCHEMA,
+}
+
+
+# ==============================================================================
+#  VALIDATION
+# ==============================================================================
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+def validate(data, schema: dict, path: str = "$") -> list[str]:
+    """
+    Check `data` against a registry schema and return a list of error
+    strings (empty when valid). Paths are JSONPath-like, e.g. `$.notable_elements`.
+    """
+    expected = _JSON_TYPES[schema["type"]]
+    if not isinstance(data, expected) or (schema["type"] in ("integer", "number") and isinstance(data, bool)):
+        return [f"{path}: expected {schema['type']}, got {type(data).__name__}"]
+
+    errors = []
+    if "enum" in schema and data not in schema["enum"]:
+        errors.append(f"{path}: {data!r} is not one of {schema['enum']}")
+
+    if schema["type"] == "object":
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: missing required field '{key}'")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in data:
+                errors.extend(validate(data[key], sub_schema, f"{path}.{key}"))
+
+    elif schema["type"] == "array":
+        for i, item in enumerate(data):
+            errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+
+    return errors
+
+
+def placeholder(schema: dict):
+    """Smallest value that validates against `schema`, for the fake LLM backend."""
+    kind = schema["type"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if kind == "object":
+        return {key: placeholder(sub_schema) for key, sub_schema in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [placeholder(schema["items"])]
+    if kind == "string":
+        return "placeholder"
+    if kind == "boolean":
+        return False
+    return 0
+
+
+def parse_and_validate(text: str, schema: dict):
+    """
+    Parse a raw model reply and validate it. Returns (data, errors).
+    Markdown code fences are tolerated so a fenced but otherwise valid reply
+    does not need a repair round-trip.
+    """
+    cleaned = (text or "").strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("\n", 1)[1] if "\n" in cleaned else ""
+        cleaned = cleaned.rsplit("```", 1)[0].strip()
+
+    try:
+        data = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        return None, [f"$: invalid JSON ({e})"]
+
+    return data, validate(data, schema)
+
+
+def repair_prompt(schema_name: str, bad_output: str, errors: list[str]) -> str:
+    """
+    A repair-only prompt: it carries the broken output and the validation
+    errors, not the original script, so fixing a reply costs a small call
+    instead of a full re-analysis.
+    """
+    error_lines = "\n".join(f"- {e}" for e in errors)
+    return f"""
+    The following JSON was produced for the `{schema_name}` schema but failed validation.
+    Fix only what the errors describe and return the corrected JSON. Keep all other content unchanged.
+
+    ERRORS:
+    {error_lines}
+
+    JSON:
+    {bad_output}
+    """
+
+
+# ==============================================================================
+#  STREAMING
+# ==============================================================================
+class IncrementalObjectParser:
+    """
+    Parses a streamed JSON object one top-level field at a time. Feed it
+    chunks of text as they arrive; `feed` returns the (key, value) pairs that
+    became complete with that chunk, so callers can act on a field before the
+    rest of the reply has been generated.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self.done = False
+        self._pos = None  # index just after '{' or the last complete field
+        self._decoder = json.JSONDecoder()
+
+    def _skip(self, chars: str):
+        while self._pos < len(self.buffer) and self.buffer[self._pos] in chars:
+            self._pos += 1
+
+    def feed(self, chunk: str) -> list[tuple]:
+        self.buffer += chunk or ""
+        completed = []
+
+        if self._pos is None:
+            start = self.buffer.find("{")
+            if start == -1:
+                return completed
+            self._pos = start + 1
+
+        while not self.done:
+            self._skip(" \t\r\n,")
+            if self._pos >= len(self.buffer):
+                break
+            if self.buffer[self._pos] == "}":
+                self.done = True
+                break
+
+            try:
+                key, after_key = self._decoder.raw_decode(self.buffer, self._pos)
+                colon = self.buffer.index(":", after_key)
+                value_start = colon + 1
+                while value_start < len(self.buffer) and self.buffer[value_start] in " \t\r\n":
+                    value_start += 1
+                value, end = self._decoder.raw_decode(self.buffer, value_start)
+            except (json.JSONDecodeError, ValueError):
+                break  # field still incomplete, wait for more text
+
+            # A bare number or literal at the very end may still be growing
+            if end >= len(self.buffer) and not isinstance(value, (dict, list, str)):
+                break
+
+            self.fields[key] = value
+            completed.append((key, value))
+            self._pos = end
+
+        return completed
+
+    @property
+    def text(self) -> str:
+        return self.buffer
+
+
+# ==============================================================================
+#  FAILURE TRACKING
+# ==============================================================================
+class SchemaStats:
+    """
+    Per-schema outcome counters for structured LLM calls: 'ok' on the first
+    try, 'repaired' after one or more repair prompts, 'failed' otherwise.
+    """
+
+    OUTCOMES = ("ok", "repaired", "failed")
+
+    def __init__(self):
+        self.counts = collections.defaultdict(collections.Counter)
+
+    def record(self, schema_name: str, outcome: str):
+        self.counts[schema_name][outcome] += 1
+
+    def failure_rate(self, schema_name: str) -> float:
+        counts = self.counts[schema_name]
+        total = sum(counts.values())
+        return counts["failed"] / total if total else 0.0
+
+    def repair_rate(self, schema_name: str) -> float:
+        counts = self.counts[schema_name]
+        total = sum(counts.values())
+        return counts["repaired"] / total if total else 0.0
+
+    def summary(self) -> str:
+        lines = []
+        for name, counts in sorted(self.counts.items()):
+            total = sum(counts.values())
+            lines.append(
+                f"{name}: {total} calls, {counts['ok']} ok, {counts['repaired']} repaired, "
+                f"{counts['failed']} failed ({self.failure_rate(name):.1%} failure rate)"
+            )
+        return "\n".join(lines)
+
+
+schema_stats = SchemaStats()
@@ -0,0 +1,60 @@
+# api/management/commands/analyze_news.py
+
+import datetime
+
+from django.core.management.base import CommandError
+
+from api.llm_schemas import schema_stats
+from api.broadcasters import get_news_date
+from api.services import run_daily_analysis_pipeline
+from api.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = "Analyzes all of a day's broadcasts in one batch pipeline run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            default=None,
+            help='News date to analyze as YYYY-MM-DD (defaults to the current news day).',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of article scripts sent to the LLM concurrently.',
+        )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Stream each script analysis and save its fields as soon as they are complete.',
+        )
+        parser.add_argument(
+            '--eps',
+            default=None,
+            help="DBSCAN eps for clustering, or 'auto' to tune it for the day (defaults to settings.CLUSTER_EPS).",
+        )
+
+    def handle(self, *args, **options):
+        date_str = options['date'] or get_news_date().isoformat()
+        try:
+            analysis_date = datetime.date.fromisoformat(date_str)
+        except ValueError:
+            raise CommandError(f"Invalid --date {date_str!r}; expected YYYY-MM-DD.")
+        eps = options['eps']
+        if eps not in (None, 'auto'):
+            try:
+                eps = float(eps)
+            except ValueError:
+                raise CommandError(f"Invalid --eps {eps!r}; expected a number or 'auto'.")
+
+        self.stdout.write(f"Analyzing broadcasts for {analysis_date}...")
+        report = run_daily_analysis_pipeline(
+            analysis_date, max_workers=options['workers'], stream=options['stream'], eps=eps
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done. {report}"))
+
+        if schema_stats.counts:
+            self.stdout.write("Structured output outcomes:")
+            self.stdout.write(schema_stats.summary())
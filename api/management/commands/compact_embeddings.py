@@ -0,0 +1,42 @@
+# api/management/commands/compact_embeddings.py
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from api.compaction import DTYPES, METHODS, CompactEmbeddingStore, evaluate, format_report
+from api.embedding_store import EmbeddingStore
+from api.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = ("Builds the compact (projected and quantized) copy of the embedding store and reports its size "
+            "and its search and clustering quality against the full vectors.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dim', type=int, default=settings.EMBEDDING_COMPACT_DIM,
+                            help="Projected dimension.")
+        parser.add_argument('--method', choices=METHODS, default='pca',
+                            help="'pca' fits the projection on the archive; 'random' needs no fitting.")
+        parser.add_argument('--dtype', choices=DTYPES, default=settings.EMBEDDING_COMPACT_DTYPE)
+        parser.add_argument('--sample', type=int, default=20000, help="Vectors the projection is fitted on.")
+        parser.add_argument('--output', type=str, help="Defaults to settings.EMBEDDING_COMPACT_DIR.")
+        parser.add_argument('--no-evaluate', action='store_true', help="Skip the quality report.")
+        parser.add_argument('--eps', type=float, default=0.12, help="DBSCAN eps used by the clustering check.")
+
+    def handle(self, *args, **options):
+        full = EmbeddingStore()
+        try:
+            store = CompactEmbeddingStore.build(
+                full, options['output'], dim=options['dim'], method=options['method'], dtype=options['dtype'],
+                sample_size=options['sample'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {len(store)} vectors to {options['dim']}-dim {options['dtype']} in {store.root}."
+        ))
+        if not options['no_evaluate']:
+            self.stdout.write(format_report(evaluate(full, store, eps=options['eps'])))
+        if not settings.EMBEDDING_COMPACT:
+            self.stdout.write("Set EMBEDDING_COMPACT=1 to cluster and search with it.")
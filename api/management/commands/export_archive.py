@@ -0,0 +1,53 @@
+# api/management/commands/export_archive.py
+
+import datetime
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from api import archive
+from api.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = ("Exports articles, analyses and embeddings to Parquet files partitioned by date and company. "
+            "Only months holding days that are new or changed since the last export are rewritten, unless --full is "
+            "given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, help="Archive directory. Defaults to settings.ARCHIVE_EXPORT_DIR.")
+        parser.add_argument('--date-from', type=str, help="First date (YYYY-MM-DD). Defaults to the oldest article.")
+        parser.add_argument('--date-to', type=str, help="Last date (YYYY-MM-DD). Defaults to the newest article.")
+        parser.add_argument('--full', action='store_true', help="Re-export every month in the range.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows per database fetch and row group.")
+        parser.add_argument('--no-embeddings', action='store_true', help="Skip the embeddings table.")
+
+    def handle(self, *args, **options):
+        if archive.pa is None:
+            raise CommandError("export_archive needs the 'pyarrow' package: pip install pyarrow")
+        try:
+            date_from = options['date_from'] and datetime.date.fromisoformat(options['date_from'])
+            date_to = options['date_to'] and datetime.date.fromisoformat(options['date_to'])
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        output = options['output'] or settings.ARCHIVE_EXPORT_DIR
+        writer = archive.ArchiveWriter(
+            output, chunk_size=options['chunk_size'], embeddings=not options['no_embeddings'],
+        )
+
+        def progress(month, counts):
+            self.stdout.write(
+                f"  {month:%Y-%m}: {counts['articles']} articles, {counts['analyses']} analyses, "
+                f"{counts['embeddings']} embeddings"
+            )
+
+        totals = writer.export(date_from, date_to, full=options['full'], progress=progress)
+        if not totals['days']:
+            self.stdout.write(self.style.SUCCESS(f"The archive in {output} is up to date."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {totals['months']} months ({totals['days']} new or changed days) to {output}: "
+            f"{totals['articles']} articles, "
+            f"{totals['analyses']} analyses, {totals['embeddings']} embeddings."
+        ))
@@ -0,0 +1,74 @@
+# api/management/commands/migrate_chroma_layout.py
+
+import datetime
+
+from django.core.management.base import CommandError
+
+from api.profiling import ProfiledCommand
+from api.services import (
+    CHROMA_LAYOUTS, COLLECTION_PREFIX, chroma_client, collection_names, create_cluster, typed_metadata,
+)
+
+
+class Command(ProfiledCommand):
+    help = (
+        "Copies the per-day Chroma collections into the monthly or single layout, "
+        "reusing the stored embeddings (nothing is re-embedded)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', dest='layout', required=True, choices=[l for l in CHROMA_LAYOUTS if l != 'daily'])
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--delete-source',
+            action='store_true',
+            help='Delete each daily collection once it has been copied and verified.',
+        )
+
+    def handle(self, *args, **options):
+        layout = options['layout']
+        batch_size = options['batch_size']
+
+        daily = collection_names(layout='daily')
+        if not daily:
+            raise CommandError("No daily collections found.")
+
+        self.stdout.write(f"Migrating {len(daily)} daily collections to the '{layout}' layout...")
+        copied_total = 0
+
+        for name in daily:
+            day = datetime.datetime.strptime(name[len(COLLECTION_PREFIX):], "%Y_%m_%d").date()
+            source = chroma_client.get_collection(name=name)
+            target = create_cluster(day.isoformat(), layout=layout)
+
+            copied = 0
+            offset = 0
+            while True:
+                page = source.get(
+                    include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset,
+                )
+                if len(page["ids"]) == 0:
+                    break
+                target.upsert(
+                    ids=page["ids"],
+                    embeddings=page["embeddings"],
+                    documents=page["documents"],
+                    metadatas=[typed_metadata(meta, day) for meta in page["metadatas"]],
+                )
+                copied += len(page["ids"])
+                offset += batch_size
+
+            # Ids are unique per day, so the target must now hold all of them
+            present = target.get(ids=source.get(include=[])["ids"], include=[])["ids"]
+            if len(present) != source.count():
+                raise CommandError(f"{name}: copied {len(present)} of {source.count()} items; source kept.")
+
+            copied_total += copied
+            self.stdout.write(f"  {name} -> {target.name}: {copied} items")
+
+            if options['delete_source']:
+                chroma_client.delete_collection(name=name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {copied_total} items. Set CHROMA_LAYOUT = '{layout}' in settings to use the new layout."
+        ))
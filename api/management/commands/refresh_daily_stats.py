@@ -0,0 +1,36 @@
+# api/management/commands/refresh_daily_stats.py
+
+import datetime
+
+from django.core.management.base import CommandError
+
+from api.daily_stats import refresh_daily_stats
+from api.models import NewsArticle
+from api.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = "Rebuilds the materialized per-(date, company) stats, e.g. to backfill them or after manual edits."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=str, help="First date (YYYY-MM-DD). Defaults to the oldest article.")
+        parser.add_argument('--date-to', type=str, help="Last date (YYYY-MM-DD). Defaults to the newest article.")
+
+    def handle(self, *args, **options):
+        try:
+            date_from = options['date_from'] and datetime.date.fromisoformat(options['date_from'])
+            date_to = options['date_to'] and datetime.date.fromisoformat(options['date_to'])
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        days = NewsArticle.objects.order_by('article_date').values_list('article_date', flat=True).distinct()
+        if date_from:
+            days = days.filter(article_date__gte=date_from)
+        if date_to:
+            days = days.filter(article_date__lte=date_to)
+
+        days = list(days)
+        rows = 0
+        for day in days:
+            rows += len(refresh_daily_stats(day))
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {rows} rows over {len(days)} days."))
@@ -1,272 +1,347 @@
 # api/management/commands/scrape_news.py
 
-import time
-import requests
+import argparse
 import datetime
-import lxml
-from urllib.parse import urljoin
-
-from bs4 import BeautifulSoup
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-import codecs
-import re
-import json
-
-from django.core.management.base import BaseCommand, CommandError
-from api.models import NewsArticle
-# You might need to import your scraper functions or other libraries here
-# from get_news import your_scraper_function # Example
-
-def get_news_date():
-
-    # Get the current date and time
-    now = datetime.datetime.now()
-
-    # The cutoff hour is 10 PM, which is 22 in 24-hour format
-    cutoff_hour = 22
-
-    # Check if the current hour is past the cutoff time
-    if now.hour >= cutoff_hour:
-        # It's 10 PM or later, so the news day is today
-        target_date = datetime.date.today()
-    else:
-        # It's before 10 PM, so we should be looking at yesterday's news
-        target_date = datetime.date.today() - datetime.timedelta(days=1)
-
-    # Format the determined date into the desired string format
-    return target_date
-
-def get_kbsnews(url, session):
-    response = session.get(url)
-    soup = BeautifulSoup(response.text, 'lxml')
-    script_tag = soup.find('script', string=re.compile(r"var messageText"))
-    pattern = re.compile(r'var messageText = "(.*?)";', re.DOTALL)
-    match = pattern.search(script_tag.text)
-    content = match.group(1)
-    news_soup = BeautifulSoup(content, 'lxml')
-    text = news_soup.get_text(separator="\n", strip=True)
-    text = text.replace("\\", "")
-    pattern = r"\nKBS 뉴스 [가-힣]+입니다\.[\s\S]*"
-    cleaned_text = re.sub(pattern, "", text).strip()
-    return cleaned_text
-
-def scrape_kbs_news(date, driver, session):
-    kbs_program_url = f"https://news.kbs.co.kr/news/pc/program/program.do?bcd=0001&ref=pGnb#{date}"
-
-    # Get Selenium driver response of kbs news url
-    driver.get(kbs_program_url)
-    wait = WebDriverWait(driver, 15)
-    wait.until(EC.presence_of_element_located((By.CLASS_NAME, "box-content")))
-
-    # Get html elements containing label box-content
-    kbs_source = driver.page_source
-    kbs_soup = BeautifulSoup(kbs_source, 'lxml')
-    kbs_items = kbs_soup.select("a.box-content")
-
-    # make initial list
-    kbs_base_url = "https://news.kbs.co.kr"
-    kbs_boxlist = []
-    for item in kbs_items:
-        title = item.find('p', class_='title').get_text(strip=True) if item.find('p', class_='title') else "N/A"
-        relative_link = item.get('href')
-        full_link = urljoin(kbs_base_url, relative_link)
-        kbs_boxlist.append({
-            'company': 'kbs',
-            'article_date': date,
-            'title': title,
-            'url': full_link})
-
-    # Remove empty elements and sports
-    isNews = False
-    kbs_newslist = []
-    for i in range(len(kbs_boxlist)):
-        if kbs_boxlist[i]['title'] == '오프닝':
-            isNews = True
-            continue
-        if isNews == False:
-            continue
-        else:
-            if kbs_boxlist[i]['title'] == '[스포츠9 헤드라인]':
-                isNews = False
-                continue
-            kbs_newslist.append(kbs_boxlist[i])
-
-    # add index 
-    for i in range(len(kbs_newslist)):
-        kbs_newslist[i]['order'] = i + 1
-
-    # add news
-    for i in range(len(kbs_newslist)):
-        news = get_kbsnews(kbs_newslist[i]['url'], session)
-        kbs_newslist[i]['news'] = news
-
-    return kbs_newslist
-
-
-def get_mbcnews(url, session):
-    response = session.get(url)
-    soup = BeautifulSoup(response.text, 'lxml')
-    article_divs = soup.select_one("div.news_txt")
-    text = article_divs.get_text(separator="\n", strip=True)
-    pattern = r"\nMBC뉴스 [가-힣]+입니다\.[\s\S]*"
-    cleaned_text = re.sub(pattern, "", text).strip()
-    pattern1 = r"\nMBC 뉴스 [가-힣]+입니다\.[\s\S]*"
-    cleaned_text = re.sub(pattern1, "", cleaned_text).strip()
-    return cleaned_text
-
-
-def scrape_mbc_news(date, driver, session):
-    mbc_program_url = f"https://imnews.imbc.com/replay/2025/nwdesk/"
-    # Get Selenium driver response of mbc news url
-    driver.get(mbc_program_url)
-    wait = WebDriverWait(driver, 15)
-    wait.until(EC.presence_of_element_located((By.CLASS_NAME, "item")))
-
-    # Get html elements containing label box-content
-    mbc_source = driver.page_source
-    soup = BeautifulSoup(mbc_source, 'lxml')
-    mbc_news_html = soup.select("li.item")
-
-    # get newslist, which contains title, and url of news. note that it is yet unsanitized.
-    session = requests.Session()
-    mbc_newslist = []
-    for item in mbc_news_html:
-        title = None
-        if item.find('span', class_='tit ellipsis2'):
-            title = item.find('span', class_='tit ellipsis2').get_text(strip=True)
-        elif item.find('span', class_='tit ellipsis'):
-            title = item.find('span', class_='tit ellipsis').get_text(strip=True)
-        else:
-            "N/A"
-        if (title.startswith('[톱플레이]')):
-            break
-        link = item.find('a').get('href')
-        news = get_mbcnews(link, session)
-        mbc_newslist.append({
-            'company': 'mbc',
-            'article_date': date, 
-            'title': title, 
-            'url': link,
-            'news': news})
-
-    for i in range(len(mbc_newslist)):
-        mbc_newslist[i]['order'] = i + 1
-
-    return mbc_newslist
-
-def get_sbsnews(url, session):
-    response = session.get(url)
-    soup = BeautifulSoup(response.text, 'lxml')
-
-    script_tag = soup.find('script', type='application/ld+json')
-    if script_tag:
-        # Get the string content of the script tag
-        json_text = script_tag.string
-
-        # 4. Parse the JSON text into a Python dictionary
-        data = json.loads(json_text)
-
-        # 5. Access the "articleBody" value
-        article_body = data.get("articleBody")
-
-    return article_body
-
-def scrape_sbs_news(date, driver, session):
-    sbs_program_url = f"https://news.sbs.co.kr/news/programMain.do?prog_cd=R1&broad_date={date}&plink=CAL&cooper=SBSNEWS"
-
-    # Get Selenium response of sbs url
-    driver.get(sbs_program_url)
-    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'li[itemprop="itemListElement"]')))
-
-    sbs_source = driver.page_source
-    soup = BeautifulSoup(sbs_source, 'lxml')
-    sbs_news_html = soup.select('li[itemprop="itemListElement"]')
-
-    sbs_base_url = "https://news.sbs.co.kr"
-    sbs_newslist = []
-    for item in sbs_news_html:
-        category_tag = item.find("em", class_="cate")
-        if category_tag and category_tag.get_text(strip=True) == "스포츠":
-            continue
-        title = item.find('img').get('alt')
-        relative_link = item.find('a').get('href')
-        full_link = urljoin(sbs_base_url, relative_link)
-        news = get_sbsnews(full_link, session)
-
-        if title.startswith('[날씨]'):
-            break
-
-        sbs_newslist.append({
-            'company': 'sbs',
-            'article_date': date,
-            'title': title, 
-            'url': full_link,
-            'news': news})
-
-    for i in range(len(sbs_newslist)):
-        sbs_newslist[i]['order'] = i + 1   
-
-
-    return sbs_newslist
-
-class Command(BaseCommand):
-    help = 'Scrapes news from broadcast sites and saves new articles to the database.'
 
-    def handle(self, *args, **options):
-        # This is where all the logic for your command goes.
-        # It's the main function that will be executed.
-
-        self.stdout.write("Starting the news scraping process...")
-
-        # --- Your scraper logic will go here ---
-
-        target_date_obj = get_news_date() # Scrape for today, for 
-        target_date_str = target_date_obj.strftime("%Y%m%d")
-        broadcasters_to_scrape = [scrape_kbs_news, scrape_mbc_news, scrape_sbs_news] # Add your functions here
-        
-        new_articles_count = 0
+from django.core.management.base import CommandError
+from api.broadcasters import BROADCAST_START_HOUR, BROADCASTERS, get_broadcasters, get_news_date
+from api.models import NewsArticle, QuarantinedFetch, script_fingerprint
+from api.http_cache import CachedSession
+from api.near_duplicates import mark_near_duplicates
+from api.daily_stats import refresh_daily_stats
+from api.watch import AdaptiveInterval
+from api.profiling import ProfiledCommand, profile_thread, stage
+
+
+class ScrapeWorker:
+    """
+    One broadcaster with its own browser and HTTP session, so several
+    broadcasters can run side by side in worker threads. Watch mode keeps a
+    worker (and its browser) open across polls.
+    """
+
+    def __init__(self, broadcaster, offline, cache_dir):
+        self.broadcaster = broadcaster
+        self.session = CachedSession(cache_dir=cache_dir, offline=offline, hosts=[broadcaster.base_url])
+        self.driver = None
+        if not offline:
+            chrome_options = webdriver.ChromeOptions()
+            chrome_options.add_argument("--headless")
+            with stage('browser start'):
+                self.driver = webdriver.Chrome(options=chrome_options)
+
+    def scrape(self, date):
+        return self.broadcaster.scrape(date, self.driver, self.session)
+
+    def poll(self, date, seen):
+        """Fetch only the listed segments whose (company, url) is not in `seen`."""
+        segments = self.broadcaster.list_segments(date, self.driver, self.session)
+        new = [s for s in segments if (s['company'], s['url']) not in seen]
+        return self.broadcaster.fetch_segments(new, self.session)
+
+    def close(self):
+        self.session.close()
+        if self.driver is not None:
+            with stage('browser quit'):
+                self.driver.quit()
+
+
+def scrape_broadcaster(broadcaster, date, offline, cache_dir):
+    worker = ScrapeWorker(broadcaster, offline, cache_dir)
+    try:
+        return worker.scrape(date)
+    finally:
+        worker.close()
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}; expected YYYY-MM-DD")
+
+
+def parse_time(value):
+    try:
+        return datetime.time.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time {value!r}; expected HH:MM")
+
+
+class Command(ProfiledCommand):
+    help = 'Scrapes news from broadcast sites and saves new articles to the database.'
 
-        options = webdriver.ChromeOptions()
-        options.add_argument("--headless")
-        driver = webdriver.Chrome(options=options)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--offline',
+            action='store_true',
+            help='Replay listing and article pages from the page cache without touching the network.',
+        )
+        parser.add_argument(
+            '--cache-dir',
+            default=None,
+            help='Directory of the raw page cache (defaults to settings.SCRAPE_CACHE_DIR).',
+        )
+        parser.add_argument(
+            '--broadcasters',
+            nargs='+',
+            default=None,
+            help=f"Broadcasters to scrape (default: all of {', '.join(BROADCASTERS)}).",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of broadcasters scraped concurrently, each with its own browser.',
+        )
+        parser.add_argument(
+            '--date',
+            type=parse_date,
+            default=None,
+            help='News date to scrape as YYYY-MM-DD (defaults to the current news day).',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep polling the listings and process new segments as they are published.',
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='In watch mode, embed, cluster and analyze each poll\'s new segments right away.',
+        )
+        parser.add_argument(
+            '--poll-min',
+            type=float,
+            default=60,
+            help='Seconds between polls while new segments keep appearing.',
+        )
+        parser.add_argument(
+            '--poll-max',
+            type=float,
+            default=600,
+            help='Longest wait between polls once the listings stop changing.',
+        )
+        parser.add_argument(
+            '--watch-until',
+            type=parse_time,
+            default=datetime.time(23, 30),
+            help='Local time at which watch mode stops (HH:MM, after midnight means the next day).',
+        )
+        parser.add_argument(
+            '--max-polls',
+            type=int,
+            default=None,
+            help='Stop watch mode after this many polls.',
+        )
+
+    def quarantine(self, news):
+        entry, created = QuarantinedFetch.objects.get_or_create(
+            article_company=news['company'],
+            article_url=news['url'],
+            defaults=dict(article_date=news['article_date'], article_order=news['order'],
+                          article_title=news['title'], error=news['error']),
+        )
+        if not created:
+            entry.error = news['error']
+            entry.failures += 1
+            entry.save(update_fields=['error', 'failures', 'last_failed_at'])
+        self.stdout.write(self.style.WARNING(f"QUARANTINED {news['company']} {news['url']}: {news['error']}"))
+
+    def save_segments(self, segments, counts) -> list[NewsArticle]:
+        """
+        Save new and changed segments and return their articles. Segments
+        that failed to fetch are quarantined instead, and saved ones leave
+        the quarantine.
+        """
+        saved = []
+        for news in segments:
+            if news.get('error'):
+                counts['failed'] += 1
+                self.quarantine(news)
+                continue
+            QuarantinedFetch.objects.filter(article_company=news['company'], article_url=news['url']).delete()
+
+            # Look the segment up by its identity (company, date, url) rather than
+            # by its full text, so a re-scrape updates the row instead of duplicating it.
+            fingerprint = script_fingerprint(news['news'])
+            obj = NewsArticle.objects.filter(
+                article_company=news['company'],
+                article_date=news['article_date'],
+                article_url=news['url'],
+            ).first()
+
+            # Only write when something changed, so unchanged scripts stay
+            # clean for the embedding and analysis stages downstream.
+            if obj is None:
+                obj = NewsArticle.objects.create(
+                    article_company=news['company'],
+                    article_date=news['article_date'],
+                    article_order=news['order'],
+                    article_title=news['title'],
+                    article_url=news['url'],
+                    article_script=news['news']
+                )
+                counts['new'] += 1
+                saved.append(obj)
+                self.stdout.write(self.style.SUCCESS(f"CREATED new article: {obj}"))
+            elif obj.content_hash != fingerprint:
+                obj.article_order = news['order']
+                obj.article_title = news['title']
+                obj.article_script = news['news']
+                obj.save()
+                counts['changed'] += 1
+                saved.append(obj)
+                self.stdout.write(self.style.NOTICE(f"UPDATED changed article: {obj}"))
+            else:
+                if (obj.article_order, obj.article_title) != (news['order'], news['title']):
+                    obj.article_order = news['order']
+                    obj.article_title = news['title']
+                    obj.save(update_fields=['article_order', 'article_title'])
+                counts['unchanged'] += 1
+        return saved
+
+    def retry_quarantined(self, broadcasters, options, counts) -> set:
+        """Refetch the segments earlier runs quarantined. Returns the days that gained articles."""
+        names = {b.name: b for b in broadcasters}
+        entries = list(QuarantinedFetch.objects.retryable(companies=list(names)))
+        if not entries:
+            return set()
+
+        self.stdout.write(f"Retrying {len(entries)} quarantined segments first...")
+        session = CachedSession(cache_dir=options['cache_dir'], offline=options['offline'])
+        try:
+            segments = [
+                {'company': e.article_company, 'article_date': e.article_date, 'order': e.article_order,
+                 'title': e.article_title, 'url': e.article_url}
+                for e in entries
+            ]
+            for segment in segments:
+                names[segment['company']].fetch_segments([segment], session)
+        finally:
+            session.close()
+        return {article.article_date for article in self.save_segments(segments, counts)}
+
+    def watch(self, day, broadcasters, options):
+        if options['analyze']:
+            # Imported here: plain scraping doesn't need the LLM and Chroma clients
+            from api.services import process_new_segments
+
+        deadline = datetime.datetime.combine(day, options['watch_until'])
+        if options['watch_until'].hour < BROADCAST_START_HOUR:
+            deadline += datetime.timedelta(days=1)
+        interval = AdaptiveInterval(options['poll_min'], options['poll_max'])
+
+        # Segments are identified by (company, url), so a restart resumes
+        # without fetching what is already stored
+        seen = set(NewsArticle.objects.filter(article_date=day).values_list('article_company', 'article_url'))
+        workers = [ScrapeWorker(b, options['offline'], options['cache_dir']) for b in broadcasters]
+        polls, total = 0, 0
+        names = ', '.join(b.name for b in broadcasters)
+        self.stdout.write(f"Watching {names} for {day} until {deadline:%Y-%m-%d %H:%M}...")
 
         try:
-            session = requests.Session()
+            with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+                while True:
+                    polls += 1
+                    futures = {executor.submit(profile_thread(worker.poll), day, seen): worker for worker in workers}
+                    new_segments = []
+                    for future in as_completed(futures):
+                        try:
+                            new_segments.extend(future.result())
+                        except Exception as e:
+                            # A failed poll is retried on the next one
+                            self.stdout.write(self.style.WARNING(
+                                f"Polling {futures[future].broadcaster.name} failed: {e}"
+                            ))
+
+                    counts = {'new': 0, 'changed': 0, 'unchanged': 0, 'failed': 0}
+                    with stage('save (orm)'):
+                        saved = self.save_segments(new_segments, counts)
+                    # Failed segments stay unseen and are retried on the next poll
+                    seen.update((s['company'], s['url']) for s in new_segments if not s['error'])
+                    if saved:
+                        total += len(saved)
+                        with stage('near-duplicates'):
+                            mark_near_duplicates(NewsArticle.objects.filter(article_date=day).with_script())
+                        if options['analyze']:
+                            with stage('analyze new segments'):
+                                process_new_segments(saved, max_workers=options['workers'])
+                        else:
+                            with stage('daily stats'):
+                                refresh_daily_stats(day)
+
+                    wait = interval.next(bool(saved))
+                    self.stdout.write(f"Poll {polls}: {len(saved)} new segments, next poll in {wait:.0f}s.")
+                    remaining = (deadline - datetime.datetime.now()).total_seconds()
+                    if remaining <= 0 or (options['max_polls'] and polls >= options['max_polls']):
+                        break
+                    time.sleep(min(wait, remaining))
+        finally:
+            for worker in workers:
+                worker.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Watch finished after {polls} polls: {total} new segments."))
 
-            for scraper_func in broadcasters_to_scrape:
-                # 1. Run the scraper to get data
-                scraped_data = scraper_func(target_date_str, driver, session)
+    def handle(self, *args, **options):
+        self.stdout.write("Starting the news scraping process...")
+        broadcasters = get_broadcasters(options['broadcasters'])
+        if options['watch']:
+            return self.watch(options['date'] or get_news_date(cutoff_hour=BROADCAST_START_HOUR), broadcasters, options)
+
+        target_date_obj = options['date'] or get_news_date()
+        counts = {'new': 0, 'changed': 0, 'unchanged': 0, 'failed': 0}
+        failed = []
+
+        # 0. Segments that failed on an earlier run go first. Days other than
+        # today that gain articles get their stats refreshed right away.
+        for day in self.retry_quarantined(broadcasters, options, counts) - {target_date_obj}:
+            refresh_daily_stats(day)
+
+        # 1. Scrape the broadcasters concurrently. Each worker only downloads and
+        # parses; all database writes stay on this thread as results come in.
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = {
+                executor.submit(profile_thread(scrape_broadcaster), broadcaster, target_date_obj,
+                                options['offline'], options['cache_dir']): broadcaster
+                for broadcaster in broadcasters
+            }
+            for future in as_completed(futures):
+                name = futures[future].name
+                try:
+                    scraped_data = future.result()
+                except Exception as e:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(f"Scraping {name} failed: {e}"))
+                    continue
                 if not scraped_data:
-                    self.stdout.write(self.style.WARNING(f"Could not retrieve data from {scraper_func.__name__}."))
+                    self.stdout.write(self.style.WARNING(f"Could not retrieve data from {name}."))
                     continue
 
-                for news in scraped_data:
-                    # 2. Use `update_or_create` to prevent duplicates
-                    # It tries to find an object matching the `defaults`. If found, it updates it.
-                    # If not found, it creates a new one. This is better for idempotent scraping.
-                    obj, created = NewsArticle.objects.update_or_create(
-                        article_company=news['company'],
-                        article_date=news['article_date'],
-                        article_order=news['order'],
-                        article_title=news['title'],
-                        article_url=news['url'],
-                        article_script=news['news']
-                    )
-
-                    # 3. Report the result
-                    if created:
-                        new_articles_count += 1
-                        self.stdout.write(self.style.SUCCESS(f"CREATED new article: {obj}"))
-                    else:
-                        self.stdout.write(self.style.NOTICE(f"UPDATED existing article: {obj}"))
-
-            self.stdout.write(self.style.SUCCESS('Successfully scraped and saved new articles.'))
-
-        finally:
-            self.stdout.write("Closing Selenium driver...")
-            driver.quit()
+                # 2. Save new and changed segments
+                with stage('save (orm)'):
+                    self.save_segments(scraped_data, counts)
+
+        # 3. Group near-identical segments across broadcasters (e.g. the same
+        # wire story) so clustering and labeling can treat them as one
+        with stage('near-duplicates'):
+            groups = mark_near_duplicates(NewsArticle.objects.filter(article_date=target_date_obj).with_script())
+        for group in groups:
+            members = ", ".join(f"{a.article_company} #{a.article_order}" for a in group)
+            self.stdout.write(self.style.NOTICE(f"NEAR-DUPLICATES: {members}"))
+
+        # 4. Refresh the day's materialized per-company stats
+        if counts['new'] or counts['changed']:
+            with stage('daily stats'):
+                refresh_daily_stats(target_date_obj)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully scraped: {counts['new']} new, {counts['changed']} changed, "
+            f"{counts['unchanged']} unchanged (skipped downstream), {counts['failed']} quarantined."
+        ))
+        if failed:
+            raise CommandError(f"Scraping failed for: {', '.join(failed)}")
@@ -0,0 +1,108 @@
+# api/management/commands/sync_embedding_store.py
+
+import hashlib
+
+from api.models import NewsArticle, stable_id
+from api.services import chroma_client, collection_names, compact_store, date_key, embedding_store
+from api.profiling import ProfiledCommand
+
+
+def legacy_stable_id(article, collection_date: str) -> str:
+    # Ids used to include the running order and an always-empty title term
+    key = f"{article.article_company}|{article.article_order}|{article.article_url}||{collection_date}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _key(meta: dict) -> int:
+    # Older daily ingests stored the date as an ISO string
+    return meta["date"] if isinstance(meta.get("date"), int) else date_key(meta["date"])
+
+
+class Command(ProfiledCommand):
+    help = (
+        "Backfills the local memory-mapped embedding store from the Chroma collections, after moving items "
+        "to the current ids and filling in missing article_id metadata."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+
+        for name in collection_names():
+            collection = chroma_client.get_collection(name=name)
+            articles = self.articles_in(collection)
+            renamed = self.rekey(collection, articles, batch_size)
+            if renamed:
+                self.stdout.write(f"  {name}: re-keyed {renamed} items to the current ids")
+            backfilled = self.backfill_article_ids(collection, articles, batch_size)
+            if backfilled:
+                self.stdout.write(f"  {name}: added article_id to {backfilled} items")
+            offset = 0
+            while True:
+                page = collection.get(include=["embeddings", "metadatas"], limit=batch_size, offset=offset)
+                if len(page["ids"]) == 0:
+                    break
+                embedding_store.upsert(page["ids"], page["embeddings"], [_key(meta) for meta in page["metadatas"]])
+                total += len(page["ids"])
+                offset += batch_size
+            self.stdout.write(f"  {name}: synced")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced {total} embeddings; the store now holds {len(embedding_store)} vectors."
+        ))
+
+    def articles_in(self, collection) -> list[NewsArticle]:
+        """The articles of every date the collection holds items for."""
+        listing = collection.get(include=["metadatas"])
+        dates = {_key(meta) for meta in listing["metadatas"] if meta and meta.get("date")}
+        return list(NewsArticle.objects.filter(
+            article_date__in=[f"{k // 10000:04d}-{k // 100 % 100:02d}-{k % 100:02d}" for k in dates]
+        ).only('article_company', 'article_order', 'article_url', 'article_date'))
+
+    def rekey(self, collection, articles: list[NewsArticle], batch_size: int) -> int:
+        """
+        Move items stored under the legacy id scheme (see legacy_stable_id)
+        to their current stable_id, in Chroma and in the local stores, so a
+        segment is not embedded a second time under its new id.
+        """
+        mapping = {}
+        for article in articles:
+            day = article.article_date.isoformat()
+            mapping[legacy_stable_id(article, day)] = stable_id(article, day)
+        present = set(collection.get(include=[])["ids"])
+        mapping = {old: new for old, new in mapping.items() if old in present and new not in present}
+
+        old_ids = list(mapping)
+        for start in range(0, len(old_ids), batch_size):
+            batch = old_ids[start:start + batch_size]
+            # Chroma holds no documents, only the script_hash (see ingest)
+            page = collection.get(ids=batch, include=["embeddings", "metadatas"])
+            collection.upsert(
+                ids=[mapping[i] for i in page["ids"]], embeddings=page["embeddings"], metadatas=page["metadatas"],
+            )
+            collection.delete(ids=page["ids"])
+        embedding_store.rename(mapping)
+        if compact_store is not None:
+            compact_store.rename(mapping)
+        return len(mapping)
+
+    def backfill_article_ids(self, collection, articles: list[NewsArticle], batch_size: int) -> int:
+        """
+        Items embedded before ingest recorded `article_id` would otherwise
+        keep returning "article_id": None from search, since ingest only
+        rewrites the metadata of changed articles.
+        """
+        pk_of = {stable_id(a, a.article_date.isoformat()): a.pk for a in articles}
+        listing = collection.get(include=["metadatas"])
+        missing = [
+            (item_id, {**(meta or {}), "article_id": pk_of[item_id]})
+            for item_id, meta in zip(listing["ids"], listing["metadatas"])
+            if (meta or {}).get("article_id") is None and item_id in pk_of
+        ]
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            collection.update(ids=[i for i, _ in batch], metadatas=[meta for _, meta in batch])
+        return len(missing)
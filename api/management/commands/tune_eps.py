@@ -0,0 +1,50 @@
+# api/management/commands/tune_eps.py
+
+import datetime
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from api.broadcasters import get_news_date
+from api.embedding_store import EmbeddingStore
+from api.eps_tuning import tune_eps
+from api.models import NewsArticle, stable_id
+from api.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    help = ("Reports how a day's segments would cluster for a sweep of DBSCAN eps values and which one "
+            "eps='auto' picks, from the embedding store alone (no LLM calls).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', default=None,
+                            help='News date as YYYY-MM-DD (defaults to the current news day).')
+        parser.add_argument('--min-samples', type=int, default=1)
+        parser.add_argument('--coverage-weight', type=float, default=settings.CLUSTER_EPS_COVERAGE_WEIGHT)
+        parser.add_argument('--max-cluster-share', type=float, default=settings.CLUSTER_EPS_MAX_SHARE)
+
+    def handle(self, *args, **options):
+        date_str = options['date'] or get_news_date().isoformat()
+        try:
+            day = datetime.date.fromisoformat(date_str)
+        except ValueError:
+            raise CommandError(f"Invalid --date {date_str!r}; expected YYYY-MM-DD.")
+
+        store = EmbeddingStore()
+        articles = [
+            a for a in NewsArticle.objects.filter(article_date=day).order_by('article_company', 'article_order')
+            if stable_id(a, day.isoformat()) in store
+        ]
+        if not articles:
+            raise CommandError(f"No embedded segments for {day}; run analyze_news or sync_embedding_store first.")
+
+        eps, sweep = tune_eps(
+            store.get([stable_id(a, day.isoformat()) for a in articles]),
+            [a.article_company for a in articles],
+            min_samples=options['min_samples'],
+            coverage_weight=options['coverage_weight'],
+            max_cluster_share=options['max_cluster_share'],
+        )
+        for candidate in sweep:
+            self.stdout.write(("* " if candidate.eps == eps else "  ") + str(candidate))
+        self.stdout.write(self.style.SUCCESS(f"{len(articles)} segments on {day}: eps={eps:.3f}"))
@@ -0,0 +1,67 @@
+# Brings the migration state in line with api/models.py, which had drifted:
+# NewsArticle's columns were renamed and AnalysisResult was redesigned
+# around the LLM's structured output.
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_newsarticle_article_order_newsarticle_article_title_and_more'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='newsarticle',
+            old_name='broadcaster',
+            new_name='article_company',
+        ),
+        migrations.RenameField(
+            model_name='newsarticle',
+            old_name='raw_script',
+            new_name='article_script',
+        ),
+        migrations.RemoveField(
+            model_name='analysisresult',
+            name='core_topic',
+        ),
+        migrations.RemoveField(
+            model_name='analysisresult',
+            name='item_count',
+        ),
+        migrations.RemoveField(
+            model_name='analysisresult',
+            name='summary',
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='headline_analysis',
+            field=models.JSONField(default=dict, help_text='Analysis of the main headline story, its framing, and context.'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='editorial_critique',
+            field=models.TextField(default='', help_text="The LLM's overall critique of the broadcast's editorial choices."),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='notable_elements',
+            field=models.JSONField(default=dict, help_text='Lists any claimed exclusives or noteworthy omissions.'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+import hashlib
+import re
+
+from django.db import migrations, models
+
+
+def fill_content_hash(apps, schema_editor):
+    # Same normalization as api.models.script_fingerprint, frozen here so the
+    # migration does not depend on the current model module.
+    NewsArticle = apps.get_model('api', 'NewsArticle')
+    articles = []
+    for article in NewsArticle.objects.only('id', 'article_script').iterator():
+        normalized = re.sub(r"\s+", " ", article.article_script or "").strip()
+        article.content_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        articles.append(article)
+    NewsArticle.objects.bulk_update(articles, ['content_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_sync_newsarticle_and_analysisresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsarticle',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='newsarticle',
+            name='embedded_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
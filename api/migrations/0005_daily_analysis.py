@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_content_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('analysis_date', models.DateField(unique=True)),
+                ('clustered_topics', models.JSONField(default=list, help_text='Labeled topic clusters with per-company source contributions.')),
+                ('comparative_analysis', models.JSONField(default=dict, help_text="The LLM's comparison of editorial choices across companies.")),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='clustered_topics',
+            field=models.JSONField(blank=True, default=list, help_text='Topic labels of the clusters this article belongs to.'),
+        ),
+    ]
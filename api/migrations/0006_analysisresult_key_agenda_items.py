@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_daily_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='key_agenda_items',
+            field=models.JSONField(blank=True, default=list, help_text="The broadcast's major news blocks with placement and coverage angle."),
+        ),
+    ]
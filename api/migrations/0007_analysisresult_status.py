@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_analysisresult_key_agenda_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='status',
+            field=models.CharField(choices=[('partial', 'Partial'), ('complete', 'Complete')], default='complete', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='editorial_critique',
+            field=models.TextField(default='', help_text="The LLM's overall critique of the broadcast's editorial choices."),
+        ),
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='headline_analysis',
+            field=models.JSONField(default=dict, help_text='Analysis of the main headline story, its framing, and context.'),
+        ),
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='notable_elements',
+            field=models.JSONField(default=dict, help_text='Lists any claimed exclusives or noteworthy omissions.'),
+        ),
+    ]
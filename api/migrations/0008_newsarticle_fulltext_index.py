@@ -0,0 +1,55 @@
+# Creates the SQLite FTS5 bigram index over NewsArticle titles and scripts
+# (see api/fulltext.py) and fills it from the existing rows. Other database
+# backends skip this and search with icontains instead.
+
+import re
+
+from django.db import migrations
+
+FTS_TABLE = "api_newsarticle_fts"
+
+
+def ngrams(text):
+    # Same bigrams as api.fulltext.ngrams, frozen here so the migration does
+    # not depend on the current module.
+    grams = []
+    for run in re.findall(r"\w+", (text or "").lower()):
+        if len(run) == 1:
+            grams.append(run)
+        else:
+            grams.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return " ".join(grams)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    NewsArticle = apps.get_model('api', 'NewsArticle')
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5(grams, tokenize = 'unicode61 remove_diacritics 0')"
+    )
+    rows = NewsArticle.objects.values_list("id", "article_title", "article_script")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, grams) VALUES (%s, %s)",
+            [(pk, ngrams(f"{title}\n{script}")) for pk, title, script in rows.iterator()],
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_analysisresult_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_clustered_topics(apps, schema_editor):
+    # Turn each DailyAnalysis.clustered_topics blob (labeled clusters whose
+    # items carry the Chroma metadata) into Topic and TopicMembership rows.
+    DailyAnalysis = apps.get_model('api', 'DailyAnalysis')
+    NewsArticle = apps.get_model('api', 'NewsArticle')
+    Topic = apps.get_model('api', 'Topic')
+    TopicMembership = apps.get_model('api', 'TopicMembership')
+
+    companies = dict(NewsArticle.objects.values_list('id', 'article_company'))
+    for daily in DailyAnalysis.objects.all():
+        topics, members = [], []
+        for position, cluster in enumerate(daily.clustered_topics or []):
+            article_ids = []
+            for item in cluster.get('items', []):
+                article_id = (item.get('meta') or {}).get('article_id')
+                if article_id in companies and article_id not in article_ids:
+                    article_ids.append(article_id)
+            topics.append(Topic(
+                topic_date=daily.analysis_date,
+                label=(cluster.get('topic_label') or '')[:255],
+                position=position,
+                item_count=cluster.get('total_items', len(article_ids)),
+                company_count=len({companies[a] for a in article_ids}),
+            ))
+            members.append(article_ids)
+
+        for topic, article_ids in zip(Topic.objects.bulk_create(topics), members):
+            TopicMembership.objects.bulk_create(
+                TopicMembership(topic=topic, article_id=a, topic_date=topic.topic_date, article_company=companies[a])
+                for a in article_ids
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_analysisjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Topic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic_date', models.DateField(db_index=True)),
+                ('label', models.CharField(db_index=True, max_length=255)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('company_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['topic_date', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TopicMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic_date', models.DateField()),
+                ('article_company', models.CharField(max_length=50)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_memberships', to='api.newsarticle')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='api.topic')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='articles',
+            field=models.ManyToManyField(related_name='topics', through='api.TopicMembership', to='api.newsarticle'),
+        ),
+        migrations.AddIndex(
+            model_name='topicmembership',
+            index=models.Index(fields=['topic_date', 'article_company', 'topic'], name='api_topicme_topic_d_209a5a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topicmembership',
+            index=models.Index(fields=['article_company', 'topic'], name='api_topicme_article_2e2507_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='topicmembership',
+            constraint=models.UniqueConstraint(fields=('topic', 'article'), name='unique_topic_article'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['topic_date', 'label'], name='api_topic_topic_d_b9fda4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['company_count', 'topic_date'], name='api_topic_company_eeb5ba_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='topic',
+            constraint=models.UniqueConstraint(fields=('topic_date', 'position'), name='unique_topic_position'),
+        ),
+        migrations.RunPython(copy_clustered_topics, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='analysisresult',
+            name='clustered_topics',
+        ),
+        migrations.RemoveField(
+            model_name='dailyanalysis',
+            name='clustered_topics',
+        ),
+    ]
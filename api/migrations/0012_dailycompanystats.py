@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_topics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCompanyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stats_date', models.DateField()),
+                ('article_company', models.CharField(max_length=50)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('avg_segment_length', models.FloatField(default=0.0, help_text='Average script length in characters.')),
+                ('topic_count', models.PositiveIntegerField(default=0)),
+                ('unique_topic_count', models.PositiveIntegerField(default=0)),
+                ('unique_topic_labels', models.JSONField(blank=True, default=list)),
+                ('lead_topic_label', models.CharField(blank=True, default='', max_length=255)),
+                ('top_topic_label', models.CharField(blank=True, default='', max_length=255)),
+                ('top_topic_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['article_company', 'stats_date'], name='api_dailyco_article_f03325_idx')],
+                'constraints': [models.UniqueConstraint(fields=('stats_date', 'article_company'), name='unique_daily_company_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_dailycompanystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuarantinedFetch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article_company', models.CharField(max_length=50)),
+                ('article_date', models.DateField()),
+                ('article_order', models.IntegerField(default=0)),
+                ('article_title', models.TextField(default='')),
+                ('article_url', models.CharField(max_length=255)),
+                ('error', models.TextField(blank=True, default='')),
+                ('failures', models.PositiveIntegerField(default=1)),
+                ('first_failed_at', models.DateTimeField(auto_now_add=True)),
+                ('last_failed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('article_company', 'article_url'), name='unique_quarantined_url')],
+            },
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:05
+
+import hashlib
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Same hashing and codecs as api.blobs when this migration was written,
+# frozen here so replaying it does not depend on the current module.
+def blob_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def compress(text):
+    raw = (text or "").encode("utf-8")
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=9).compress(raw)
+    return 'zlib', zlib.compress(raw, 9)
+
+
+def decompress(data, codec):
+    data = bytes(data)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("This script is zstd-compressed; install the 'zstandard' package to read it.")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if codec == 'zlib':
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown script codec: {codec}")
+
+
+def move_scripts_to_blobs(apps, schema_editor):
+    # Compress every distinct script once and point its articles at it
+    NewsArticle = apps.get_model('api', 'NewsArticle')
+    ScriptBlob = apps.get_model('api', 'ScriptBlob')
+
+    articles = list(NewsArticle.objects.only('id', 'article_script'))
+    blobs = {}
+    for article in articles:
+        key = blob_hash(article.article_script)
+        if key not in blobs:
+            codec, data = compress(article.article_script)
+            blobs[key] = ScriptBlob(hash=key, codec=codec, data=data, size=len(article.article_script or ''))
+        article.script_blob_id = key
+    ScriptBlob.objects.bulk_create(blobs.values(), batch_size=500)
+    NewsArticle.objects.bulk_update(articles, ['script_blob'], batch_size=500)
+
+
+def restore_scripts(apps, schema_editor):
+    NewsArticle = apps.get_model('api', 'NewsArticle')
+    articles = list(NewsArticle.objects.select_related('script_blob'))
+    for article in articles:
+        article.article_script = decompress(article.script_blob.data, article.script_blob.codec)
+    NewsArticle.objects.bulk_update(articles, ['article_script'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_quarantinedfetch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScriptBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('codec', models.CharField(max_length=8)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='newsarticle',
+            name='script_blob',
+            field=models.ForeignKey(
+                db_column='script_hash', null=True, on_delete=django.db.models.deletion.PROTECT,
+                related_name='articles', to='api.scriptblob',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='newsarticle',
+            name='article_script',
+            field=models.TextField(default=''),
+        ),
+        migrations.RunPython(move_scripts_to_blobs, restore_scripts),
+        migrations.RemoveField(
+            model_name='newsarticle',
+            name='article_script',
+        ),
+        migrations.AlterField(
+            model_name='newsarticle',
+            name='script_blob',
+            field=models.ForeignKey(
+                db_column='script_hash', on_delete=django.db.models.deletion.PROTECT,
+                related_name='articles', to='api.scriptblob',
+            ),
+        ),
+    ]
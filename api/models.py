@@ -1,4 +1,112 @@
+import collections
+import datetime
+import hashlib
+import re
+
 from django.db import models
+from django.db.models import Count, F, Q
+
+from .blobs import DEFAULT_CODEC, blob_hash, compress, decompress
+
+
+def script_fingerprint(script: str) -> str:
+    """
+    sha256 of the script with whitespace collapsed, so re-scrapes that only
+    differ in line breaks or trailing spaces count as unchanged.
+    """
+    normalized = re.sub(r"\s+", " ", script or "").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def stable_id(article, collection_date: str) -> str:
+    """
+    Deterministic Chroma / embedding-store id of a segment, so re-ingesting
+    it won't duplicate. Keyed on the identity scrape_news matches segments
+    by (company, url, date); the running order is left out so a reordered
+    re-scrape keeps the same id.
+    """
+    company = str(getattr(article, "article_company", ""))
+    url     = str(getattr(article, "article_url", ""))
+
+    key = f"{company}|{url}|{collection_date}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class ScriptBlobQuerySet(models.QuerySet):
+    def store(self, texts: list[str]) -> dict:
+        """
+        Make sure a blob exists for every text and return {text: ScriptBlob}.
+        Texts already stored (by any article) are not compressed again.
+        """
+        by_hash = {blob_hash(text): text for text in texts}
+        existing = self.in_bulk(list(by_hash))
+        missing = {
+            key: ScriptBlob(hash=key, codec=DEFAULT_CODEC, data=compress(text, DEFAULT_CODEC), size=len(text))
+            for key, text in by_hash.items() if key not in existing
+        }
+        self.bulk_create(missing.values(), ignore_conflicts=True)
+
+        blobs = {}
+        for key, text in by_hash.items():
+            blob = existing.get(key) or missing[key]
+            blob._text = text
+            blobs[text] = blob
+        return blobs
+
+    def unreferenced(self):
+        return self.filter(articles__isnull=True)
+
+
+class ScriptBlob(models.Model):
+    """
+    A compressed article script, stored once and addressed by the sha256 of
+    its text. Articles reference it by hash and decompress it on access.
+    """
+    hash = models.CharField(max_length=64, primary_key=True)
+    codec = models.CharField(max_length=8)
+    data = models.BinaryField()
+    # Uncompressed length in characters, so lengths never need decompression
+    size = models.PositiveIntegerField(default=0)
+
+    objects = ScriptBlobQuerySet.as_manager()
+
+    @property
+    def text(self) -> str:
+        if getattr(self, '_text', None) is None:
+            self._text = decompress(self.data, self.codec)
+        return self._text
+
+    def __str__(self):
+        return f"{self.hash[:12]} ({self.size} chars, {self.codec})"
+
+
+class NewsArticleQuerySet(models.QuerySet):
+    def with_script(self):
+        # Join the script blobs, for lists that read every article's script
+        return self.select_related('script_blob')
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # save() is bypassed here, so store pending scripts first
+        objs = list(objs)
+        for obj in objs:
+            if obj.script_blob_id is None and obj._pending_script is None:
+                obj._pending_script = ''
+        pending = [obj for obj in objs if obj._pending_script is not None]
+        blobs = ScriptBlob.objects.store([obj._pending_script for obj in pending])
+        for obj in pending:
+            obj._apply_script(blobs[obj._pending_script])
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def needs_embedding(self):
+        # Never embedded, or the script changed since it was last embedded
+        return self.exclude(embedded_hash=F('content_hash'))
+
+    def needs_analysis(self):
+        # No analysis yet, or the analysis was made from an older script
+        return self.filter(
+            Q(analysis__isnull=True) | ~Q(analysis__content_hash=F('content_hash'))
+        )
+
 
 # Create your models here.
 class NewsArticle(models.Model):
@@ -7,32 +115,416 @@ class NewsArticle(models.Model):
     article_order = models.IntegerField(default=0)
     article_title = models.TextField(default='')
     article_url = models.CharField(max_length=100, default='')
-    article_script = models.TextField()
+    # The script lives in ScriptBlob; read and assign it through `article_script`
+    script_blob = models.ForeignKey(
+        ScriptBlob, on_delete=models.PROTECT, related_name='articles', db_column='script_hash'
+    )
     scraped_at = models.DateTimeField(auto_now_add=True)
 
+    # Fingerprint of article_script, and the fingerprint that was last pushed
+    # to Chroma. When the two differ the article is dirty for embedding.
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    embedded_hash = models.CharField(max_length=64, blank=True, default='')
+
+    # Canonical article of this one's near-duplicate group (e.g. the same wire
+    # story aired by another broadcaster), set by api.near_duplicates
+    duplicate_of = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.SET_NULL, related_name='duplicates'
+    )
+
+    objects = NewsArticleQuerySet.as_manager()
+
+    _pending_script = None
+
+    @property
+    def article_script(self) -> str:
+        if self._pending_script is not None:
+            return self._pending_script
+        if self.script_blob_id is None:
+            return ''
+        return self.script_blob.text
+
+    @article_script.setter
+    def article_script(self, value):
+        self._pending_script = value or ''
+
+    def _apply_script(self, blob: ScriptBlob):
+        self.script_blob = blob
+        self.content_hash = script_fingerprint(self._pending_script)
+        self._pending_script = None
+
+    def save(self, *args, **kwargs):
+        if self.script_blob_id is None and self._pending_script is None:
+            self._pending_script = ''
+        replaced = None
+        if self._pending_script is not None:
+            replaced = self.script_blob_id
+            self._apply_script(ScriptBlob.objects.store([self._pending_script])[self._pending_script])
+            if replaced == self.script_blob_id:
+                replaced = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'article_script' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'script_blob', 'content_hash'} - {'article_script'}
+        super().save(*args, **kwargs)
+        # The old script may now be unreferenced
+        if replaced is not None:
+            ScriptBlob.objects.filter(pk=replaced).unreferenced().delete()
+
     def __str__(self):
-        return f"{self.company} News - {self.article_date}"
+        return f"{self.article_company} News - {self.article_date}"
 
 class AnalysisResult(models.Model):
+    STATUS_PARTIAL = 'partial'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_PARTIAL, 'Partial'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+
     article = models.OneToOneField(NewsArticle, on_delete=models.CASCADE, related_name='analysis')
+
+    # A streamed analysis is saved field by field while the LLM is still
+    # generating; it stays 'partial' until every field has arrived.
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_COMPLETE)
     
     headline_analysis = models.JSONField(
+        default=dict,
         help_text="Analysis of the main headline story, its framing, and context."
     )
 
+    # Stores the [{'topic': ..., 'placement': ..., 'comment': ...}] news blocks
+    key_agenda_items = models.JSONField(
+        default=list, blank=True,
+        help_text="The broadcast's major news blocks with placement and coverage angle."
+    )
+
     # Stores the overall summary paragraph from the LLM
     editorial_critique = models.TextField(
+        default='',
         help_text="The LLM's overall critique of the broadcast's editorial choices."
     )
 
     # Stores the {'exclusives_claimed': [...], 'potential_omissions': [...]} object
     notable_elements = models.JSONField(
+        default=dict,
         help_text="Lists any claimed exclusives or noteworthy omissions."
     )
 
+    # Fingerprint of the article script this analysis was generated from
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+
     # Good practice to have timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Analysis for {self.article.article_title}"
+        # article_id, not article.article_title: listing analyses must not
+        # cost one extra query per row
+        return f"Analysis for article {self.article_id}"
+
+
+class DailyAnalysis(models.Model):
+    """
+    Day-level output of the batch pipeline: the single comparative analysis
+    shared by every broadcaster's articles. The day's labeled topic clusters
+    are Topic rows with the same date.
+    """
+    analysis_date = models.DateField(unique=True)
+
+    comparative_analysis = models.JSONField(
+        default=dict,
+        help_text="The LLM's comparison of editorial choices across companies."
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Daily analysis - {self.analysis_date}"
+
+
+class AnalysisJob(models.Model):
+    """
+    An on-demand analysis requested through the API. The async views run it
+    on the event loop and record each status change so clients can poll it.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    article = models.ForeignKey(NewsArticle, on_delete=models.CASCADE, related_name='analysis_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Analysis job {self.pk} ({self.status})"
+
+
+class TopicQuerySet(models.QuerySet):
+    def between(self, date_from=None, date_to=None):
+        queryset = self
+        if date_from:
+            queryset = queryset.filter(topic_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(topic_date__lte=date_to)
+        return queryset
+
+    def covered_only_by(self, company: str):
+        # company_count is written with the topic, so this is an indexed
+        # filter plus one join rather than a GROUP BY over memberships
+        return self.filter(company_count=1, memberships__article_company=company).distinct()
+
+
+class Topic(models.Model):
+    """
+    One labeled topic cluster of a day, as found by the batch pipeline.
+    Which articles (and so which companies) covered it is in TopicMembership.
+    """
+    topic_date = models.DateField(db_index=True)
+    label = models.CharField(max_length=255, db_index=True)
+    # Order of the cluster within its day
+    position = models.PositiveIntegerField(default=0)
+
+    # Denormalized from the memberships when the topic is written
+    item_count = models.PositiveIntegerField(default=0)
+    company_count = models.PositiveIntegerField(default=0)
+
+    articles = models.ManyToManyField(NewsArticle, through='TopicMembership', related_name='topics')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TopicQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['topic_date', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['topic_date', 'position'], name='unique_topic_position'),
+        ]
+        indexes = [
+            models.Index(fields=['topic_date', 'label']),
+            models.Index(fields=['company_count', 'topic_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic_date} - {self.label}"
+
+
+class TopicMembershipQuerySet(models.QuerySet):
+    def between(self, date_from=None, date_to=None):
+        queryset = self
+        if date_from:
+            queryset = queryset.filter(topic_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(topic_date__lte=date_to)
+        return queryset
+
+    def coverage_by_company(self):
+        """Per (topic, company) item counts: {'topic': id, 'company': ..., 'items': n}."""
+        return (
+            self.values('topic', company=F('article_company'))
+            .annotate(items=Count('id'))
+            .order_by('topic', 'company')
+        )
+
+    def coverage_by_day(self):
+        """Items and distinct topics per company per day, grouped in SQL."""
+        return (
+            self.values('topic_date', company=F('article_company'))
+            .annotate(items=Count('id'), topics=Count('topic', distinct=True))
+            .order_by('topic_date', 'company')
+        )
+
+    def coverage_share(self, period: str = 'month') -> list[dict]:
+        """
+        Each company's coverage per period ('day', 'week', 'month' or 'year'):
+        {'period': date, 'company': ..., 'items': n, 'topics': n, 'share': 0..1},
+        share being the company's fraction of all items in the period.
+
+        The counting runs in SQL over the (topic_date, article_company) index.
+        Days are folded into periods here rather than with Trunc, which SQLite
+        evaluates through a Python function per row; a topic belongs to one
+        day, so per-day distinct topic counts add up exactly.
+        """
+        buckets = {}
+        for row in self.coverage_by_day():
+            key = (period_start(row['topic_date'], period), row['company'])
+            bucket = buckets.setdefault(key, {'period': key[0], 'company': key[1], 'items': 0, 'topics': 0})
+            bucket['items'] += row['items']
+            bucket['topics'] += row['topics']
+
+        totals = collections.Counter()
+        for bucket in buckets.values():
+            totals[bucket['period']] += bucket['items']
+        for bucket in buckets.values():
+            bucket['share'] = bucket['items'] / totals[bucket['period']]
+        return sorted(buckets.values(), key=lambda b: (b['period'], b['company']))
+
+
+def period_start(day, period: str):
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    if period == 'year':
+        return day.replace(month=1, day=1)
+    raise ValueError(f"Unknown period: {period!r}")
+
+
+class TopicMembership(models.Model):
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='memberships')
+    article = models.ForeignKey(NewsArticle, on_delete=models.CASCADE, related_name='topic_memberships')
+    # Copied from the topic and the article so coverage counts group on one
+    # covering index without joining either table
+    topic_date = models.DateField()
+    article_company = models.CharField(max_length=50)
+
+    objects = TopicMembershipQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['topic', 'article'], name='unique_topic_article'),
+        ]
+        indexes = [
+            models.Index(fields=['topic_date', 'article_company', 'topic']),
+            models.Index(fields=['article_company', 'topic']),
+        ]
+
+    def __str__(self):
+        return f"{self.article_company} in topic {self.topic_id}"
+
+
+class DailyCompanyStatsQuerySet(models.QuerySet):
+    def between(self, date_from=None, date_to=None):
+        queryset = self
+        if date_from:
+            queryset = queryset.filter(stats_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(stats_date__lte=date_to)
+        return queryset
+
+    def trends(self, period: str = 'month') -> list[dict]:
+        """
+        Per (period, company) totals from the materialized rows: days, items,
+        topics, unique topics, item-weighted average segment length, average
+        rank of the day's top story and how often the company led with it.
+        """
+        buckets = {}
+        for row in self.order_by('stats_date', 'article_company').values(
+            'stats_date', 'article_company', 'item_count', 'topic_count', 'unique_topic_count',
+            'avg_segment_length', 'top_topic_rank', 'lead_topic_label', 'top_topic_label',
+        ):
+            key = (period_start(row['stats_date'], period), row['article_company'])
+            bucket = buckets.setdefault(key, {
+                'period': key[0], 'company': key[1], 'days': 0, 'items': 0, 'topics': 0,
+                'unique_topics': 0, 'chars': 0.0, 'ranks': [], 'led_with_top_story': 0,
+            })
+            bucket['days'] += 1
+            bucket['items'] += row['item_count']
+            bucket['topics'] += row['topic_count']
+            bucket['unique_topics'] += row['unique_topic_count']
+            bucket['chars'] += row['avg_segment_length'] * row['item_count']
+            if row['top_topic_rank'] is not None:
+                bucket['ranks'].append(row['top_topic_rank'])
+            if row['lead_topic_label'] and row['lead_topic_label'] == row['top_topic_label']:
+                bucket['led_with_top_story'] += 1
+
+        trends = []
+        for bucket in buckets.values():
+            chars, ranks = bucket.pop('chars'), bucket.pop('ranks')
+            bucket['avg_segment_length'] = chars / bucket['items'] if bucket['items'] else 0.0
+            bucket['avg_top_topic_rank'] = sum(ranks) / len(ranks) if ranks else None
+            trends.append(bucket)
+        return trends
+
+
+class DailyCompanyStats(models.Model):
+    """
+    Materialized per-(date, company) numbers for trend dashboards, rebuilt
+    for one day at a time by api.daily_stats.refresh_daily_stats whenever
+    that day's articles or topics change.
+    """
+    stats_date = models.DateField()
+    article_company = models.CharField(max_length=50)
+
+    item_count = models.PositiveIntegerField(default=0)
+    avg_segment_length = models.FloatField(default=0.0, help_text="Average script length in characters.")
+
+    # Topics the company covered, and how many of them no other company did
+    topic_count = models.PositiveIntegerField(default=0)
+    unique_topic_count = models.PositiveIntegerField(default=0)
+    unique_topic_labels = models.JSONField(default=list, blank=True)
+
+    # Topic of the company's first segment of the day
+    lead_topic_label = models.CharField(max_length=255, blank=True, default='')
+
+    # The day's top story (widest coverage across companies) and the 1-based
+    # place of the company's first segment on it in its running order
+    top_topic_label = models.CharField(max_length=255, blank=True, default='')
+    top_topic_rank = models.PositiveIntegerField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DailyCompanyStatsQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['stats_date', 'article_company'], name='unique_daily_company_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['article_company', 'stats_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.article_company} stats - {self.stats_date}"
+
+
+class QuarantinedFetchQuerySet(models.QuerySet):
+    def retryable(self, companies=None):
+        queryset = self.filter(failures__lt=QuarantinedFetch.MAX_FAILURES)
+        if companies is not None:
+            queryset = queryset.filter(article_company__in=companies)
+        return queryset.order_by('article_date', 'article_company', 'article_order')
+
+
+class QuarantinedFetch(models.Model):
+    """
+    A listed segment whose page could not be fetched or parsed. The scraper
+    retries these first on its next run and deletes the row once the segment
+    is saved; after MAX_FAILURES attempts it stops retrying and the row stays
+    for inspection.
+    """
+    MAX_FAILURES = 5
+
+    article_company = models.CharField(max_length=50)
+    article_date = models.DateField()
+    article_order = models.IntegerField(default=0)
+    article_title = models.TextField(default='')
+    article_url = models.CharField(max_length=255)
+
+    error = models.TextField(blank=True, default='')
+    failures = models.PositiveIntegerField(default=1)
+    first_failed_at = models.DateTimeField(auto_now_add=True)
+    last_failed_at = models.DateTimeField(auto_now=True)
+
+    objects = QuarantinedFetchQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['article_company', 'article_url'], name='unique_quarantined_url'),
+        ]
+
+    def __str__(self):
+        return f"{self.article_company} {self.article_url} ({self.failures} failures)"
@@ -0,0 +1,237 @@
+# api/near_duplicates.py
+
+import collections
+
+import numpy as np
+
+from .models import NewsArticle
+
+
+# ==============================================================================
+#  MINHASH
+#  Character shingles suit Korean better than word shingles: particles are
+#  glued to words (정부는 / 정부가), so word sets of two near-identical wire
+#  stories differ far more than their character sequences do.
+# ==============================================================================
+_EMPTY_SLOT = np.iinfo(np.uint32).max
+_VALUE_BITS = 25  # bin minima stay below 2**25; densified slots sit above it
+
+
+def _mix64(x: np.ndarray, seed: int) -> np.ndarray:
+    """splitmix64 finalizer: spreads every input bit over all 64 output bits."""
+    x = x + np.uint64(seed)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+class MinHasher:
+    """
+    MinHash signatures over character k-shingles, computed with NumPy as a
+    one-permutation sketch: every shingle is hashed once, the hash picks one
+    of `num_perm` bins and the signature keeps each bin's minimum. That is a
+    single pass over the shingles instead of one per permutation, and bins a
+    short text leaves empty are filled from the next non-empty bin
+    (rotation densification) so signatures stay comparable slot by slot.
+
+    `signatures` handles a whole batch at once: the texts are encoded and
+    rolled as one array and the per-bin minima are taken with
+    `np.minimum.at`, so the per-text Python work is a single string split.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        if num_perm > 64:
+            raise ValueError("num_perm must be at most 64")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+
+    def _batch_shingle_hashes(self, texts):
+        """
+        32-bit shingle hashes of many texts in one pass: the texts are encoded
+        as a single UTF-32 array, rolled once, and shingles that straddle two
+        texts are dropped. Returns (hashes, counts), counts[i] per text.
+        """
+        texts = [" ".join((t or "").split()) for t in texts]
+        codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+        lengths = np.array([len(t) for t in texts], dtype=np.int64)
+        k = self.shingle_size
+
+        # Texts shorter than one shingle have none
+        counts = np.maximum(lengths - k + 1, 0)
+        if counts.sum() == 0:
+            return np.empty(0, dtype=np.uint32), counts
+
+        n = len(codes) - k + 1
+        rolled = np.zeros(n, dtype=np.uint32)
+        with np.errstate(over="ignore"):
+            for j in range(k):
+                rolled *= np.uint32(1000003)  # wraps mod 2**32
+                rolled += codes[j:j + n]
+
+        text_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        shingle_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        positions = np.arange(counts.sum()) + np.repeat(text_starts - shingle_starts, counts)
+        return rolled[positions], counts
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        """32-bit hashes of the text's character shingles (may repeat)."""
+        return self._batch_shingle_hashes([text])[0]
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.signatures([text])[0]
+
+    def signatures(self, texts) -> np.ndarray:
+        """
+        (len(texts), num_perm) uint32 signatures. Texts without a single
+        shingle get all-max rows; see `is_empty`.
+        """
+        texts = list(texts)
+        out = np.full((len(texts), self.num_perm), _EMPTY_SLOT, dtype=np.uint32)
+        hashes, counts = self._batch_shingle_hashes(texts)
+        if len(hashes) == 0:
+            return out
+
+        with np.errstate(over="ignore"):
+            mixed = _mix64(hashes.astype(np.uint64), self.seed)
+            bins = ((mixed >> np.uint64(32)) * np.uint64(self.num_perm)) >> np.uint64(32)
+        values = (mixed & np.uint64((1 << _VALUE_BITS) - 1)).astype(np.uint32)
+        slots = np.repeat(np.arange(len(texts)) * self.num_perm, counts) + bins.astype(np.int64)
+        np.minimum.at(out.reshape(-1), slots, values)
+
+        self._densify(out, counts)
+        return out
+
+    def _densify(self, out: np.ndarray, counts: np.ndarray):
+        """
+        Fill empty bins of non-empty rows from the next non-empty bin to the
+        right (wrapping), offset by the distance so a borrowed value can never
+        equal a genuine one. Only short texts have empty bins.
+        """
+        empty = out == _EMPTY_SLOT
+        for row in np.flatnonzero(empty.any(axis=1) & (counts > 0)):
+            filled = np.flatnonzero(~empty[row])
+            holes = np.flatnonzero(empty[row])
+            source = filled[np.searchsorted(filled, holes) % len(filled)]
+            distance = (source - holes) % self.num_perm
+            out[row, holes] = out[row, source] + (distance << _VALUE_BITS).astype(np.uint32)
+
+    @staticmethod
+    def is_empty(signature: np.ndarray) -> bool:
+        return bool((signature == _EMPTY_SLOT).all())
+
+
+def estimated_similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two shingle sets from their signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+# ==============================================================================
+#  LSH
+# ==============================================================================
+class LSHIndex:
+    """
+    Banded LSH over MinHash signatures. Two items become candidates when all
+    rows of at least one band agree; with b bands of r rows the candidate
+    probability crosses 1/2 around similarity (1/b) ** (1/r).
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets = [collections.defaultdict(list) for _ in range(bands)]
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature: np.ndarray):
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band][band_key].append(key)
+
+    def candidate_pairs(self):
+        pairs = set()
+        for buckets in self._buckets:
+            for keys in buckets.values():
+                for i in range(len(keys)):
+                    for j in range(i + 1, len(keys)):
+                        pairs.add((keys[i], keys[j]))
+        return pairs
+
+
+def find_near_duplicates(items, threshold: float = 0.8, hasher: MinHasher = None, bands: int = 16):
+    """
+    Group near-duplicate texts. `items` is an iterable of (key, text) pairs;
+    returns groups (lists of keys, in input order) of two or more items whose
+    estimated similarity chains together at `threshold` or above.
+    """
+    hasher = hasher or MinHasher()
+    keys, texts = [], []
+    for key, text in items:
+        keys.append(key)
+        texts.append(text)
+    if len(keys) < 2:
+        return []
+
+    signatures = hasher.signatures(texts)
+    index = LSHIndex(hasher.num_perm, bands)
+    for i, signature in enumerate(signatures):
+        # Blank or very short scripts would all share the same empty signature
+        if not hasher.is_empty(signature):
+            index.add(i, signature)
+
+    # Union-find over the verified candidate pairs
+    parent = list(range(len(keys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in index.candidate_pairs():
+        if estimated_similarity(signatures[i], signatures[j]) >= threshold:
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups = collections.defaultdict(list)
+    for i in range(len(keys)):
+        groups[find(i)].append(keys[i])
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def mark_near_duplicates(articles, threshold: float = 0.8) -> list[list]:
+    """
+    Find near-duplicate scripts among `articles` (NewsArticle instances) and
+    point every non-canonical member's `duplicate_of` at the group's first
+    article. Returns the groups as lists of articles.
+    """
+    articles = list(articles)
+    by_pk = {a.pk: a for a in articles}
+    groups = find_near_duplicates(((a.pk, a.article_script) for a in articles), threshold=threshold)
+
+    changed = []
+    grouped = set()
+    for group in groups:
+        canonical = group[0]
+        for pk in group:
+            grouped.add(pk)
+            target = None if pk == canonical else canonical
+            if by_pk[pk].duplicate_of_id != target:
+                by_pk[pk].duplicate_of_id = target
+                changed.append(by_pk[pk])
+
+    # Articles that no longer have a near-duplicate are released
+    for a in articles:
+        if a.pk not in grouped and a.duplicate_of_id is not None:
+            a.duplicate_of_id = None
+            changed.append(a)
+
+    NewsArticle.objects.bulk_update(changed, ["duplicate_of"])
+    return [[by_pk[pk] for pk in group] for group in groups]
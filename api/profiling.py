@@ -0,0 +1,273 @@
+# api/profiling.py
+
+import contextlib
+import cProfile
+import datetime
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+PROFILE_MODES = ('cpu', 'memory', 'stages')
+
+
+# ==============================================================================
+#  STAGE TIMERS
+#  Code marks its phases with `stage(name)`; while a profiled command runs,
+#  each stage's wall time and the CPU time of the thread running it are
+#  summed per name. A low CPU share means the stage waited (network, the
+#  browser, the LLM), a high one that it computed (parsing, regex, ORM
+#  row building). Outside a profiled run `stage` costs one global lookup.
+# ==============================================================================
+_active = None
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    profiler = _active
+    if profiler is None or not profiler.stages:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        profiler.record(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+
+def profile_thread(fn):
+    """
+    Wrap a function submitted to a worker thread. cProfile only sees the
+    thread that enabled it, so each call gets its own profiler whose stats
+    are merged into the command's at the end.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profiler = _active
+        if profiler is None or not profiler.cpu:
+            return fn(*args, **kwargs)
+        thread_profile = cProfile.Profile()
+        try:
+            return thread_profile.runcall(fn, *args, **kwargs)
+        finally:
+            with profiler.lock:
+                profiler.thread_profiles.append(thread_profile)
+    return wrapper
+
+
+# ==============================================================================
+#  COLLAPSED STACKS
+#  cProfile keeps caller -> callee edges, not whole stacks. The stacks are
+#  rebuilt by walking the call graph from its roots and splitting each
+#  function's time across its callers in proportion to the cumulative time
+#  each call edge accounts for, as flameprof and gprof2dot do. The output is
+#  the "frame;frame;frame microseconds" format read by flamegraph.pl and
+#  speedscope.
+# ==============================================================================
+def _frame_label(func) -> str:
+    filename, line, name = func
+    if filename == '~':
+        return name.replace(';', ':')
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(';', ':')
+
+
+def collapsed_stacks(stats: pstats.Stats, min_us: int = 1, max_depth: int = 256) -> list[str]:
+    entries = stats.stats
+    children = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in entries.items() if not any(c in entries for c in entry[4])]
+
+    totals = {}
+
+    def walk(func, path, on_path, scale):
+        _, _, tt, ct, _ = entries[func]
+        path = path + (_frame_label(func),)
+        own = tt * scale * 1e6
+        if own >= min_us:
+            key = ';'.join(path)
+            totals[key] = totals.get(key, 0) + own
+        if len(path) >= max_depth:
+            return
+        for child, edge_ct in children.get(func, ()):
+            child_ct = entries[child][3]
+            if child in on_path or not child_ct:
+                continue
+            child_scale = min(1.0, edge_ct / child_ct) * scale
+            if child_ct * child_scale * 1e6 >= min_us:
+                walk(child, path, on_path | {child}, child_scale)
+
+    for root in roots:
+        walk(root, (), frozenset([root]), 1.0)
+    return [f"{stack} {round(us)}" for stack, us in sorted(totals.items())]
+
+
+# ==============================================================================
+#  PROFILER
+# ==============================================================================
+class Profiler:
+    """
+    One profiled command run. `modes` is any of 'cpu' (cProfile, written as
+    .pstats and .collapsed), 'memory' (tracemalloc, written as a snapshot
+    and a top-allocators report) and 'stages' (the per-stage table).
+    Every file of a run shares the prefix `<command>-<timestamp>`, so runs
+    can be compared over time, e.g. with `pstats.Stats(a).add(b)` or
+    `Snapshot.load(b).compare_to(Snapshot.load(a), 'lineno')`.
+    """
+
+    def __init__(self, name: str, modes, output_dir=None, top: int = 20):
+        modes = set(modes or PROFILE_MODES)
+        self.cpu = 'cpu' in modes
+        self.memory = 'memory' in modes
+        self.stages = 'stages' in modes
+        self.output_dir = Path(output_dir or settings.PROFILE_DIR)
+        self.prefix = f"{name}-{datetime.datetime.now():%Y%m%d-%H%M%S}"
+        self.top = top
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.thread_profiles = []
+        self._profile = None
+
+    def record(self, name: str, wall: float, cpu: float):
+        with self.lock:
+            calls, total_wall, total_cpu = self.timings.get(name, (0, 0.0, 0.0))
+            self.timings[name] = (calls + 1, total_wall + wall, total_cpu + cpu)
+
+    def start(self):
+        global _active
+        _active = self
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        if self.memory:
+            tracemalloc.start()
+        if self.cpu:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self) -> list[str]:
+        """Stop profiling, write the output files and return the lines of a short report."""
+        global _active
+        if self._profile is not None:
+            self._profile.disable()
+        wall, cpu = time.perf_counter() - self._wall, time.process_time() - self._cpu
+        _active = None
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        lines, written = [], []
+        if self.stages:
+            table = self.stage_table(wall, cpu)
+            written.append(self._write('stages.txt', table))
+            lines.append(table)
+        if self.cpu:
+            written.extend(self._write_cpu())
+        if self.memory:
+            report = self._write_memory()
+            written.extend(report[1:])
+            lines.append(report[0])
+        lines.append("Profile written to: " + ", ".join(str(path) for path in written))
+        return lines
+
+    def _write(self, suffix: str, text: str) -> Path:
+        path = self.output_dir / f"{self.prefix}.{suffix}"
+        path.write_text(text)
+        return path
+
+    # --------------------------------------------------------------------------
+    #  Reports
+    # --------------------------------------------------------------------------
+    def stage_table(self, wall: float, cpu: float) -> str:
+        # Stages can nest and run in several threads at once, so their wall
+        # times need not add up to the total
+        rows = [("stage", "calls", "wall s", "cpu s", "cpu %")]
+        for name, (calls, stage_wall, stage_cpu) in sorted(self.timings.items(), key=lambda item: -item[1][1]):
+            rows.append((name, str(calls), f"{stage_wall:.3f}", f"{stage_cpu:.3f}",
+                         f"{100 * stage_cpu / stage_wall:.0f}" if stage_wall else "-"))
+        rows.append(("total (process)", "1", f"{wall:.3f}", f"{cpu:.3f}", f"{100 * cpu / wall:.0f}" if wall else "-"))
+        widths = [max(len(row[i]) for row in rows) for i in range(5)]
+        return "\n".join(
+            "  ".join([row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])])
+            for row in rows
+        )
+
+    def _write_cpu(self) -> list[Path]:
+        stats = pstats.Stats(self._profile)
+        for thread_profile in self.thread_profiles:
+            stats.add(thread_profile)
+        pstats_path = self.output_dir / f"{self.prefix}.pstats"
+        stats.dump_stats(pstats_path)
+
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats('cumulative').print_stats(self.top)
+        stats.sort_stats('tottime').print_stats(self.top)
+        return [
+            pstats_path,
+            self._write('cpu.txt', out.getvalue()),
+            self._write('collapsed', "\n".join(collapsed_stacks(stats)) + "\n"),
+        ]
+
+    def _write_memory(self) -> list:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ])
+        snapshot_path = self.output_dir / f"{self.prefix}.tracemalloc"
+        snapshot.dump(str(snapshot_path))
+
+        lines = [f"Traced memory: {current / 2**20:.1f} MiB still allocated, {peak / 2**20:.1f} MiB peak",
+                 f"Top {self.top} allocators still holding memory:"]
+        for statistic in snapshot.statistics('lineno')[:self.top]:
+            frame = statistic.traceback[0]
+            lines.append(f"  {statistic.size / 2**10:10.1f} KiB {statistic.count:8d} blocks  "
+                         f"{frame.filename}:{frame.lineno}")
+        report = "\n".join(lines)
+        return [report, snapshot_path, self._write('memory.txt', report + "\n")]
+
+
+# ==============================================================================
+#  MANAGEMENT COMMANDS
+#  ProfiledCommand adds the profiling options to a command's parser, so a
+#  command only has to subclass it instead of BaseCommand.
+# ==============================================================================
+class ProfiledCommand(BaseCommand):
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument(
+            '--profile', nargs='*', choices=PROFILE_MODES, default=None,
+            help=f"Profile the run: any of {', '.join(PROFILE_MODES)} (all of them when none is given).",
+        )
+        parser.add_argument(
+            '--profile-dir', default=None,
+            help='Directory for the profile files (defaults to settings.PROFILE_DIR).',
+        )
+        parser.add_argument(
+            '--profile-top', type=int, default=20,
+            help='Number of functions and allocators listed in the profile reports.',
+        )
+        return parser
+
+    def execute(self, *args, **options):
+        modes = options.get('profile')
+        if modes is None:
+            return super().execute(*args, **options)
+
+        name = self.__module__.rsplit('.', 1)[-1]
+        profiler = Profiler(name, modes, options.get('profile_dir'), options.get('profile_top') or 20)
+        profiler.start()
+        try:
+            return super().execute(*args, **options)
+        finally:
+            for line in profiler.stop():
+                self.stdout.write(line)
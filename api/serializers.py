@@ -1,17 +1,182 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
-from .models import NewsArticle
+from .models import AnalysisJob, AnalysisResult, DailyAnalysis, NewsArticle, Topic, TopicMembership
 
 class NewsArticleSerializer(serializers.ModelSerializer):
+    # Decompressed from the article's script blob
+    article_script = serializers.CharField(source='script_blob.text', read_only=True)
+
     class Meta:
         model = NewsArticle
         # Specify the fields from the model you want to include in the API output
         fields = [
             'id',
-            'broadcaster',
+            'article_company',
             'article_date',
-            'article_title', 
+            'article_order',
+            'article_title',
             'article_url',
-            'raw_script',
-            'scraped_at'
+            'article_script',
+            'scraped_at',
             ]
-        
\ No newline at end of file
+
+
+class AnalysisResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalysisResult
+        fields = [
+            'article',
+            'status',
+            'headline_analysis',
+            'key_agenda_items',
+            'editorial_critique',
+            'notable_elements',
+            'updated_at',
+        ]
+
+
+class NestedAnalysisSerializer(AnalysisResultSerializer):
+    class Meta(AnalysisResultSerializer.Meta):
+        fields = [f for f in AnalysisResultSerializer.Meta.fields if f != 'article']
+
+
+class TopicSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Topic
+        fields = ['id', 'topic_date', 'label', 'item_count', 'company_count']
+
+
+class ArticleWithAnalysisSerializer(NewsArticleSerializer):
+    """
+    An article with its analysis (null when not analyzed yet) and cluster
+    membership: the topics it was clustered into and the canonical article
+    of its near-duplicate group.
+    """
+    analysis = NestedAnalysisSerializer(read_only=True, allow_null=True)
+    topics = TopicSerializer(many=True, read_only=True)
+
+    class Meta(NewsArticleSerializer.Meta):
+        fields = NewsArticleSerializer.Meta.fields + ['duplicate_of', 'analysis', 'topics']
+
+
+class DailyAnalysisSerializer(serializers.ModelSerializer):
+    """The day's comparative analysis and its topics with per-company coverage."""
+    topics = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DailyAnalysis
+        fields = ['analysis_date', 'topics', 'comparative_analysis', 'updated_at']
+
+    def get_topics(self, obj):
+        topics = Topic.objects.filter(topic_date=obj.analysis_date)
+        coverage = {}
+        for row in TopicMembership.objects.filter(topic_date=obj.analysis_date).coverage_by_company():
+            coverage.setdefault(row['topic'], {})[row['company']] = row['items']
+        return [
+            dict(TopicSerializer(topic).data, coverage=coverage.get(topic.pk, {}))
+            for topic in topics
+        ]
+
+
+class AnalysisJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalysisJob
+        fields = ['id', 'article', 'status', 'error', 'created_at', 'finished_at']
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Validates the query string of the search endpoints."""
+    q = serializers.CharField()
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    company = serializers.CharField(required=False)
+    k = serializers.IntegerField(required=False, default=10, min_value=1, max_value=100)
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from must not be after date_to.")
+        return attrs
+
+
+class TrendsQuerySerializer(serializers.Serializer):
+    """Validates the query string of the trends endpoint."""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    company = serializers.CharField(required=False)
+    period = serializers.ChoiceField(choices=['day', 'week', 'month', 'year'], default='month')
+
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from must not be after date_to.")
+        return attrs
+
+
+# ==============================================================================
+#  FIELD SELECTION
+#  `?fields=id,article_title,analysis.status` keeps only the listed fields and
+#  `?omit=article_script,analysis.headline_analysis` drops fields; dotted
+#  names reach into nested serializers. The surviving fields also decide which
+#  columns are loaded, so skipped JSON blobs are never read from the database.
+# ==============================================================================
+def parse_field_list(value: str) -> list[list[str]]:
+    return [name.strip().split('.') for name in (value or '').split(',') if name.strip()]
+
+
+def select_fields(serializer, fields=None, omit=None):
+    """Prune `serializer.fields` in place from parsed `fields`/`omit` lists."""
+    if fields:
+        keep = {path[0] for path in fields}
+        for name in list(serializer.fields):
+            if name not in keep:
+                serializer.fields.pop(name)
+        for name, field in serializer.fields.items():
+            nested = [path[1:] for path in fields if path[0] == name and len(path) > 1]
+            field = getattr(field, 'child', field)
+            if nested and isinstance(field, serializers.Serializer):
+                select_fields(field, fields=nested)
+
+    for path in omit or []:
+        if path[0] not in serializer.fields:
+            continue
+        field = getattr(serializer.fields[path[0]], 'child', serializer.fields[path[0]])
+        if len(path) == 1:
+            serializer.fields.pop(path[0])
+        elif isinstance(field, serializers.Serializer):
+            select_fields(field, omit=[path[1:]])
+    return serializer
+
+
+def loaded_columns(serializer, prefix: str = '') -> tuple[list[str], list[str], list[str]]:
+    """
+    (only, select_related, prefetch_related) arguments covering exactly the
+    serializer's model fields: nested serializers of forward or one-to-one
+    relations are joined, nested lists of many-valued relations prefetched.
+    """
+    model = serializer.Meta.model
+    only = [prefix + model._meta.pk.name]
+    related, prefetch = [], []
+    for field in serializer.fields.values():
+        if field.source == '*':
+            continue
+        # A dotted source (script_blob.text) reads through a forward relation
+        source = field.source.split('.')[0]
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            continue
+        if source != field.source:
+            if model_field.many_to_one or model_field.one_to_one:
+                only.append(prefix + source)
+                related.append(prefix + source)
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            prefetch.append(prefix + field.source)
+        elif isinstance(field, serializers.Serializer):
+            related.append(prefix + field.source)
+            nested_only, nested_related, nested_prefetch = loaded_columns(field, prefix + field.source + '__')
+            only += nested_only
+            related += nested_related
+            prefetch += nested_prefetch
+        elif model_field.concrete:
+            only.append(prefix + model_field.name)
+    return only, related, prefetch
@@ -10,9 +10,29 @@ from dotenv import load_dotenv
 from sklearn.cluster import DBSCAN
 import collections
 import hashlib
+import functools
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Iterable
 
-from .models import NewsArticle, AnalysisResult
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .daily_stats import refresh_daily_stats
+from . import compaction
+from .compaction import CompactEmbeddingStore
+from .embedding_store import EmbeddingStore
+from . import eps_tuning
+from .watch import assign_new_articles
+from .models import NewsArticle, AnalysisResult, DailyAnalysis, ScriptBlob, Topic, TopicMembership, stable_id
+from .llm import (
+    ARTICLE_ANALYSIS_MODEL, analyze_article_script, article_analysis_prompt, generate_structured, get_model,
+    structured_model, validate_or_repair,
+)
+from .llm_schemas import LLM_SCHEMAS, IncrementalObjectParser, schema_stats
+from .profiling import profile_thread, stage
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,24 +50,12 @@ gemini_ef = chromadb.utils.embedding_functions.GoogleGenerativeAiEmbeddingFuncti
     model_name='models/text-embedding-004'
 )
 
-def get_news_date(date_format="%Y-%m-%d"):
-    # Get the current date and time
-    now = datetime.datetime.now()
-
-    # The cutoff hour is 10 PM, which is 22 in 24-hour format
-    cutoff_hour = 22
-
-    # Check if the current hour is past the cutoff time
-    if now.hour >= cutoff_hour:
-        # It's 10 PM or later, so the news day is today
-        target_date = datetime.date.today()
-    else:
-        # It's before 10 PM, so we should be looking at yesterday's news
-        target_date = datetime.date.today() - datetime.timedelta(days=1)
-
-    # Format the determined date into the desired string format
-    return target_date.strftime(date_format)
+# Memory-mapped copy of every embedding, kept in sync by ingest()
+embedding_store = EmbeddingStore()
 
+# Projected and quantized copy for clustering and search, once built with
+# `manage.py compact_embeddings` and switched on (see api.compaction)
+compact_store = CompactEmbeddingStore.open(full=embedding_store) if settings.EMBEDDING_COMPACT else None
 
 def fetch_article(date_str: str) -> Iterable[NewsArticle]:
     res = (
@@ -55,71 +63,431 @@ def fetch_article(date_str: str) -> Iterable[NewsArticle]:
         .filter(article_date=date_)
     )
 
-def create_cluster(collection_date: str):
-    name = f"broadcasts_{collection_date.replace('-', '_')}"
+# ==============================================================================
+#  STORAGE LAYOUT
+#  'daily' keeps one collection per date (broadcasts_YYYY_MM_DD), the original
+#  layout. 'monthly' shards by month (broadcasts_YYYY_MM) and 'single' keeps
+#  everything in one collection (broadcasts_all). The latter two rely on the
+#  typed `date` (int YYYYMMDD) and `company` metadata to select a day or range.
+# ==============================================================================
+COLLECTION_PREFIX = "broadcasts_"
+CHROMA_LAYOUTS = ("daily", "monthly", "single")
+
+
+def _as_date(value) -> datetime.date:
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value))
+
+
+def date_key(value) -> int:
+    """Typed date metadata: 2025-09-29 -> 20250929, so ranges can use $gte/$lte."""
+    day = _as_date(value)
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def collection_name(value, layout: str = None) -> str:
+    layout = layout or settings.CHROMA_LAYOUT
+    day = _as_date(value)
+    if layout == "daily":
+        return f"{COLLECTION_PREFIX}{day:%Y_%m_%d}"
+    if layout == "monthly":
+        return f"{COLLECTION_PREFIX}{day:%Y_%m}"
+    if layout == "single":
+        return f"{COLLECTION_PREFIX}all"
+    raise ValueError(f"Unknown CHROMA_LAYOUT {layout!r}; expected one of {CHROMA_LAYOUTS}")
+
+
+def day_filter(collection_date, layout: str = None):
+    """`where` clause selecting one day inside the layout's collection."""
+    layout = layout or settings.CHROMA_LAYOUT
+    if layout == "daily":
+        return None  # the collection already is the day
+    return {"date": date_key(collection_date)}
+
+
+def typed_metadata(meta: dict, day) -> dict:
+    """Normalize metadata written by older ingests (string date/order)."""
+    meta = dict(meta or {})
+    meta["date"] = date_key(day)
+    try:
+        meta["order"] = int(meta.get("order"))
+    except (TypeError, ValueError):
+        meta["order"] = 0
+    return {k: v for k, v in meta.items() if v is not None}
+
 
+def create_cluster(collection_date: str, layout: str = None):
     return chroma_client.get_or_create_collection(
-        name=name,
+        name=collection_name(collection_date, layout),
         embedding_function=gemini_ef,
         metadata={"hnsw:space": "cosine"}  # cosine is best for sentence embeddings
     )
 
-def _stable_id(article, collection_date: str) -> str:
+
+def collection_names(date_from=None, date_to=None, layout: str = None) -> list[str]:
+    """Names of the existing collections that can hold dates in [date_from, date_to]."""
+    layout = layout or settings.CHROMA_LAYOUT
+    date_format = {"daily": "%Y_%m_%d", "monthly": "%Y_%m"}.get(layout)
+
+    names = []
+    for c in chroma_client.list_collections():
+        name = getattr(c, "name", c)
+        if not name.startswith(COLLECTION_PREFIX):
+            continue
+        if layout == "single":
+            if name == f"{COLLECTION_PREFIX}all":
+                names.append(name)
+            continue
+        try:
+            start = datetime.datetime.strptime(name[len(COLLECTION_PREFIX):], date_format).date()
+        except ValueError:
+            continue
+        if layout == "daily":
+            end = start
+        else:
+            end = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
+        if date_from and end < date_from:
+            continue
+        if date_to and start > date_to:
+            continue
+        names.append(name)
+    return sorted(names)
+
+
+# ==============================================================================
+#  SEMANTIC SEARCH
+#  Queries are embedded once and fanned out over the collections in range.
+# ==============================================================================
+# Opened collection handles, reused across requests
+_collection_handles = {}
+
+# Shared pool for the per-collection fan-out, so requests don't pay for
+# spinning up threads
+_search_pool = ThreadPoolExecutor(max_workers=8)
+
+
+@functools.lru_cache(maxsize=1024)
+def embed_query(text: str) -> tuple:
+    """Embed a search query. Cached, since the same queries repeat a lot."""
+    return tuple(float(x) for x in gemini_ef([text])[0])
+
+
+def _open_collection(name: str):
+    if name not in _collection_handles:
+        _collection_handles[name] = chroma_client.get_collection(name=name, embedding_function=gemini_ef)
+    return _collection_handles[name]
+
+
+def script_texts(metas: list[dict]) -> dict:
+    """{script_hash: script} for the ScriptBlob hashes in Chroma metadata, in one query."""
+    hashes = {meta.get("script_hash") for meta in metas if meta and meta.get("script_hash")}
+    return {key: blob.text for key, blob in ScriptBlob.objects.in_bulk(list(hashes)).items()}
+
+
+def _item_text(doc, meta, texts: dict) -> str:
+    # Collections written before scripts moved to ScriptBlob still hold the document
+    return texts.get((meta or {}).get("script_hash")) or doc or ""
+
+
+def _meta_date(value):
+    # Typed int keys from current ingests, ISO strings from older daily ones
+    if isinstance(value, int):
+        return datetime.date(value // 10000, value // 100 % 100, value % 100).isoformat()
+    return value
+
+
+def semantic_search(query: str, date_from=None, date_to=None, company=None, k: int = 10,
+                    snippets: bool = True) -> list[dict]:
+    """
+    Top-k articles closest to `query` within the date range, optionally
+    limited to one company. Each collection in range returns its own top-k
+    in parallel and the hits are merged by cosine distance. Outside the
+    daily layout the date range is applied as a metadata filter.
+
+    When the compact store is on, searches without a company filter scan
+    it instead and re-rank the best candidates with the full vectors; Chroma
+    is then only asked for the metadata of the returned hits.
+
+    Snippets are read from ScriptBlob rows (see attach_snippets). With
+    `snippets=False` the search makes no database query and the hits keep
+    their metadata for a later attach_snippets call, so it can run on a
+    thread Django does not manage connections for.
+    """
+    embedding = list(embed_query(query))
+    if compact_store is not None and not company:
+        hits = _compact_search(embedding, date_from, date_to, k)
+        return attach_snippets(hits) if snippets else hits
+    names = collection_names(date_from, date_to)
+
+    clauses = []
+    if company:
+        clauses.append({"company": company})
+    if settings.CHROMA_LAYOUT != "daily":
+        if date_from:
+            clauses.append({"date": {"$gte": date_key(date_from)}})
+        if date_to:
+            clauses.append({"date": {"$lte": date_key(date_to)}})
+    where = {"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else None)
+
+    def search_one(name):
+        collection = _open_collection(name)
+        res = collection.query(
+            query_embeddings=[embedding],
+            n_results=min(k, collection.count()) or 1,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+        hits = []
+        for doc_id, doc, meta, distance in zip(
+            res["ids"][0], res["documents"][0], res["metadatas"][0], res["distances"][0]
+        ):
+            hits.append({
+                "id": doc_id,
+                "article_id": meta.get("article_id"),
+                "company": meta.get("company"),
+                "date": _meta_date(meta.get("date")),
+                "order": meta.get("order"),
+                "title": meta.get("title"),
+                "snippet": doc,
+                "meta": meta,
+                "distance": distance,
+                "score": 1.0 - distance,
+            })
+        return hits
+
+    hits = [hit for part in _search_pool.map(search_one, names) for hit in part]
+    top = heapq.nsmallest(k, hits, key=lambda h: h["distance"])
+    return attach_snippets(top) if snippets else top
+
+
+def attach_snippets(hits: list[dict]) -> list[dict]:
+    """Replace each hit's metadata with a snippet of its script, read in one query."""
+    # Scripts are only read for the hits that are returned
+    texts = script_texts([hit["meta"] for hit in hits])
+    for hit in hits:
+        hit["snippet"] = _item_text(hit["snippet"], hit.pop("meta"), texts)[:200]
+    return hits
+
+
+def _compact_search(embedding, date_from, date_to, k: int) -> list[dict]:
+    found = compaction.search(
+        embedding, compact_store, k=k,
+        date_from=date_from and date_key(date_from), date_to=date_to and date_key(date_to),
+    )
+    by_collection = collections.defaultdict(list)
+    for item_id, key, _ in found:
+        by_collection[collection_name(_meta_date(key))].append(item_id)
+    metas = {}
+    for name, item_ids in by_collection.items():
+        data = _open_collection(name).get(ids=item_ids, include=["metadatas"])
+        metas.update(zip(data["ids"], data["metadatas"]))
+
+    hits = []
+    for item_id, _, distance in found:
+        meta = metas.get(item_id) or {}
+        hits.append({
+            "id": item_id,
+            "article_id": meta.get("article_id"),
+            "company": meta.get("company"),
+            "date": _meta_date(meta.get("date")),
+            "order": meta.get("order"),
+            "title": meta.get("title"),
+            "snippet": None,
+            "meta": meta,
+            "distance": distance,
+            "score": 1.0 - distance,
+        })
+    return hits
+
+
+@dataclass
+class ChangeReport:
     """
-    Create a deterministic ID so re-ingesting the same item won’t duplicate.
-    Use whatever fields best identify uniqueness (url is great if present).
+    Which articles a pipeline stage actually processed, and which it skipped
+    because their content fingerprint had not changed since the last run.
     """
-    company = str(getattr(article, "article_company", ""))
-    order   = str(getattr(article, "article_order", ""))
-    url     = str(getattr(article, "article_url", "")) 
-    title   = str(getattr(article, "title", ""))
+    stage: str
+    processed: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
 
-    key = f"{company}|{order}|{url}|{title}|{collection_date}"
-    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+    def __str__(self):
+        summary = f"{self.stage}: {len(self.processed)} new/changed, {len(self.skipped)} unchanged (skipped)"
+        if self.failed:
+            summary += f", {len(self.failed)} failed"
+        return summary
 
-def ingest(articles: Iterable, collection, collection_date: str, batch_size: int = 128):
-    docs, metas, ids = [], [], []
+
+def split_by_change(articles: Iterable[NewsArticle], stage: str):
+    """
+    Split articles into those that are dirty for `stage` and those that can be
+    skipped. Stages are 'embedding' (compared against embedded_hash) and
+    'analysis' (compared against the stored AnalysisResult's content_hash).
+    """
+    report = ChangeReport(stage=stage)
+    dirty = []
 
     for a in articles:
-        ids.append(_stable_id(a, collection_date))
-        docs.append(str(getattr(a, "article_script", "")))
-        meta = {
-            "company": str(getattr(a, "article_company", "")),
-            "date": str(getattr(a, 'article_date', '')),
-            "order": str(getattr(a, "article_order", None)),
-            "title": getattr(a, "title", None),
-        }
-        metas.append(meta)
+        if stage == "embedding":
+            done_hash = a.embedded_hash
+        elif stage == "analysis":
+            analysis = getattr(a, "analysis", None)
+            done_hash = analysis.content_hash if analysis else ""
+        else:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
 
-    collection.add(
-        documents=docs,
-        metadatas=metas,
-        ids=ids
-    )
+        if done_hash and done_hash == a.content_hash:
+            report.skipped.append(a.pk)
+        else:
+            report.processed.append(a.pk)
+            dirty.append(a)
+
+    return dirty, report
+
+
+def ingest(articles: Iterable, collection, collection_date: str, batch_size: int = 128):
+    """
+    Upsert new or changed articles into the day's collection and record their
+    fingerprint in embedded_hash. Unchanged articles are not re-embedded.
+    The vectors are embedded once here and written both to Chroma and to
+    the local embedding store. Chroma keeps no copy of the script, only its
+    ScriptBlob hash in the `script_hash` metadata (see script_texts).
+    """
+    dirty, report = split_by_change(articles, "embedding")
+
+    for start in range(0, len(dirty), batch_size):
+        batch = dirty[start:start + batch_size]
+        docs, metas, ids = [], [], []
+
+        for a in batch:
+            ids.append(stable_id(a, collection_date))
+            docs.append(str(getattr(a, "article_script", "")))
+            meta = {
+                "company": str(getattr(a, "article_company", "")),
+                "date": date_key(a.article_date),
+                "order": int(getattr(a, "article_order", 0)),
+                "title": str(getattr(a, "article_title", "")),
+                "article_id": a.pk,
+                "content_hash": a.content_hash,
+                "script_hash": a.script_blob_id,
+            }
+            metas.append(meta)
+
+        embeddings = gemini_ef(docs)
+        collection.upsert(
+            embeddings=embeddings,
+            metadatas=metas,
+            ids=ids
+        )
+        embedding_store.upsert(ids, embeddings, [meta["date"] for meta in metas])
+        if compact_store is not None:
+            compact_store.upsert(ids, embeddings, [meta["date"] for meta in metas])
+
+        for a in batch:
+            a.embedded_hash = a.content_hash
+        NewsArticle.objects.bulk_update(batch, ["embedded_hash"])
+
+    print(f"Ingest {report}")
+    return report
 
 
-def cluster_collection(collection, eps: float = 0.12, min_samples: int = 1):
+def cluster_collection(collection, eps: float | str = 0.12, min_samples: int = 1, where: dict = None,
+                       store: EmbeddingStore = None, seeds: list[list[str]] = None):
     """
-    Pull embeddings back out of Chroma and cluster with DBSCAN.
-    eps is cosine distance if metric='cosine'.
+    Cluster a collection's embeddings with DBSCAN.
+    eps is cosine distance if metric='cosine'. `where` selects the day when
+    the collection holds more than one (see day_filter).
+
+    When every item is in the local embedding `store`, vectors are read from
+    its memory-mapped shards and Chroma is only asked for ids, then for the
+    documents and metadata of the clustered members. Otherwise everything is
+    pulled out of Chroma as before.
+
+    With a CompactEmbeddingStore the compact vectors are clustered, and
+    pairs whose distance is close to `eps` are re-measured with the full
+    vectors (see compaction.refined_cosine_distances).
+
+    `seeds` are groups of ids known to be near-duplicates (see
+    api.near_duplicates). Each group is clustered as a single point, its
+    first member, and always lands in one cluster together.
+
+    `eps='auto'` picks eps for this day from a sweep scored on one distance
+    matrix (see api.eps_tuning) instead of using a fixed value.
     """
-    data = collection.get(include=["embeddings", "documents", "metadatas"])
-    if not data.get("embeddings"):
+    ids = collection.get(where=where, include=[])["ids"]
+    if len(ids) == 0:
         raise RuntimeError("No embeddings returned; ensure include=['embeddings'] and embeddings exist.")
 
-    X = np.array(data["embeddings"], dtype=np.float32)
-    # DBSCAN can use cosine directly; normalization is optional here
-    db = DBSCAN(eps=eps, min_samples=min_samples, metric="cosine").fit(X)
-    labels = db.labels_
+    if store is not None and all(i in store for i in ids):
+        X = np.asarray(store.get(ids), dtype=np.float32)
+        data = None
+    else:
+        data = collection.get(where=where, include=["embeddings", "documents", "metadatas"])
+        ids = data["ids"]
+        X = np.array(data["embeddings"], dtype=np.float32)
+
+    # Collapse each seed group onto its first member before clustering
+    position = {item_id: idx for idx, item_id in enumerate(ids)}
+    point_of = list(range(len(ids)))
+    for group in seeds or []:
+        present = [position[i] for i in group if i in position]
+        for idx in present[1:]:
+            point_of[idx] = present[0]
+    points = sorted(set(point_of))
+    row_of_point = {p: row for row, p in enumerate(points)}
+
+    compact = isinstance(store, CompactEmbeddingStore) and data is None
+    D = None
+    if eps == 'auto':
+        # Tune on the distances DBSCAN will see: the compact store's
+        # calibrated estimates, or exact cosines
+        D = store.compactor.distances(X[points]) if compact else eps_tuning.cosine_distances(X[points])
+        # Broadcasters per point; a seed group's point carries all of its members'
+        fetched = data or collection.get(ids=ids, include=["metadatas"])
+        meta_of = dict(zip(fetched["ids"], fetched["metadatas"]))
+        companies = collections.defaultdict(set)
+        for idx, item_id in enumerate(ids):
+            companies[point_of[idx]].add((meta_of.get(item_id) or {}).get("company"))
+        eps, sweep = eps_tuning.tune_eps(
+            None, [companies[p] for p in points], D=D, min_samples=min_samples,
+            coverage_weight=settings.CLUSTER_EPS_COVERAGE_WEIGHT, max_cluster_share=settings.CLUSTER_EPS_MAX_SHARE,
+        )
+        print(f"Auto-tuned eps={eps:.3f} from {len(sweep)} candidates over {len(points)} points.")
+
+    if compact:
+        point_ids = [ids[p] for p in points]
+        distances = compaction.refined_cosine_distances(X[points], point_ids, store.compactor, store.full, eps)
+        db = DBSCAN(eps=eps, min_samples=min_samples, metric="precomputed").fit(distances)
+    elif D is not None:
+        db = DBSCAN(eps=eps, min_samples=min_samples, metric="precomputed").fit(D)
+    else:
+        # DBSCAN can use cosine directly; normalization is optional here
+        db = DBSCAN(eps=eps, min_samples=min_samples, metric="cosine").fit(X[points])
+    labels = [int(db.labels_[row_of_point[point_of[idx]]]) for idx in range(len(ids))]
+
+    members = [idx for idx, label in enumerate(labels) if label != -1]  # skip noise
+    if data is None:
+        # Fetch documents lazily, only for the items that end up in a cluster
+        fetched = collection.get(ids=[ids[idx] for idx in members], include=["documents", "metadatas"])
+        by_id = {
+            item_id: (doc, meta)
+            for item_id, doc, meta in zip(fetched["ids"], fetched["documents"], fetched["metadatas"])
+        }
+    else:
+        by_id = {
+            item_id: (doc, meta)
+            for item_id, doc, meta in zip(data["ids"], data["documents"], data["metadatas"])
+        }
 
+    texts = script_texts([meta for _, meta in by_id.values()])
     clusters = collections.defaultdict(list)
-    for idx, label in enumerate(labels):
-        if label == -1:
-            continue  # noise
-        clusters[int(label)].append({
-            "id": data["ids"][idx],
-            "text": data["documents"][idx],
-            "meta": data["metadatas"][idx],
+    for idx in members:
+        doc, meta = by_id[ids[idx]]
+        clusters[int(labels[idx])].append({
+            "id": ids[idx],
+            "text": _item_text(doc, meta, texts),
+            "meta": meta,
         })
 
     # Return list of clusters (each cluster is a list of items)
@@ -131,21 +499,31 @@ def cluster_collection(collection, eps: float = 0.12, min_samples: int = 1):
 #  STEP 1B: LABELING (using LLM)
 #  This function is also a pure data processor.
 # ==============================================================================
-def label_topic_clusters(clusters: list[list[dict]]) -> list[dict]:
+def label_topic_clusters(clusters: list[list[dict]], duplicate_of: dict = None) -> list[dict]:
     """
     Generates a topic label for each cluster and summarizes which companies contributed.
+    `duplicate_of` maps an item id to its near-duplicate group's canonical
+    item id; only one text per group goes into the prompt, but every item
+    still counts towards the source contribution.
     """
     print(f"Starting labeling for {len(clusters)} topic clusters...")
     if not clusters:
         return []
 
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    model = get_model('gemini-1.5-flash')
     labeled_topics = []
 
     for i, cluster in enumerate(clusters):
-        # Extract content for the prompt and sources for analysis
-        cluster_contents = [item['content'] for item in cluster]
-        cluster_sources = [item['source'] for item in cluster]
+        # Extract content for the prompt and sources for analysis,
+        # sending each near-duplicate story to the LLM only once
+        seen = set()
+        cluster_contents = []
+        for item in cluster:
+            canonical = (duplicate_of or {}).get(item['id'], item['id'])
+            if canonical not in seen:
+                seen.add(canonical)
+                cluster_contents.append(item['text'])
+        cluster_sources = [item['meta'].get('company', '') for item in cluster]
         
         items_str = "\n- ".join(cluster_contents)
         prompt = f"""
@@ -162,7 +540,7 @@ def label_topic_clusters(clusters: list[list[dict]]) -> list[dict]:
             label = response.text.strip().replace("*", "")
             
             # Count contributions from each source for this topic
-            source_counts = dict(Counter(cluster_sources))
+            source_counts = dict(collections.Counter(cluster_sources))
 
             labeled_topics.append({
                 "topic_label": label,
@@ -185,128 +563,352 @@ def generate_comparative_analysis(labeled_topics: list[dict], analysis_date: str
     if not labeled_topics:
         return {}
 
-    # Use a model that supports schema-enforced JSON output
-    model = genai.GenerativeModel(
-        'gemini-1.5-flash',
-        generation_config={"response_schema": comparative_analysis_schema, "response_mime_type": "application/json"}
-    )
-
     # Format the input for the prompt to be clear and concise
     topics_summary = []
     for topic in labeled_topics:
         sources_str = ", ".join([f"{source} ({count})" for source, count in topic['source_contribution'].items()])
         topics_summary.append(f"- Topic: \"{topic['topic_label']}\" (Total Items: {topic['total_items']}) | Covered by: {sources_str}")
-    
+    topics_block = "\n".join(topics_summary)
+
     prompt = f"""
     You are a senior media critic. Analyze the news coverage from multiple companies for {analysis_date}.
     Based on the following summary of topics, provide a comparative analysis of their editorial choices.
 
     TOPIC SUMMARY:
-    {'\n'.join(topics_summary)}
+    {topics_block}
 
     Your analysis must identify the primary narrative of the day, compare the focus of each company,
     point out any topics covered uniquely by a single company, and note any significant potential omissions.
     """
-    try:
-        response = model.generate_content(prompt)
-        return json.loads(response.text)
-    except Exception as e:
-        print(f"An error occurred during comparative analysis: {e}")
-        return {}
+    # Use a model that supports schema-enforced JSON output
+    return generate_structured('gemini-1.5-flash', prompt, "comparative_analysis") or {}
 
 
-def analyze_article_script(script_text):
+def closing_db_connections(fn):
     """
-    Sends a script to the Gemini API for analysis and returns the structured result.
+    Wrap a function run on a pool thread that uses the ORM. Django only
+    closes connections of the threads it manages (the request cycle), so
+    the connection the worker opened is closed when the call returns.
     """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return wrapper
 
-    model = genai.GenerativeModel(
-        'gemini-2.5-flash',
-        generation_config={"response_mime_type": "application/json"}
-    )
 
-    # This is the most important part: The Prompt!
-    prompt = f"""
-    You are a senior media analyst and broadcast news critic.
-    Perform a sophisticated analysis of the following news script, focusing on its editorial choices, framing, and potential biases in korean.
-    
+def stream_article_analysis(article: NewsArticle, max_repairs: int = 2):
+    """
+    Streaming variant of analyze_article_script for long scripts. The reply is
+    parsed as it arrives and each top-level field is saved to the article's
+    AnalysisResult (status 'partial') the moment it is complete, so readers
+    see the first fields long before the full completion has finished.
 
-    Your analysis must include the following components:
-    - headline_analysis: Analyze the main headline. What is the topic? How is it framed? What other major stories might have been downplayed?
-    - key_agenda_items: Identify 2-4 major news blocks. For each, describe the topic, its placement in the broadcast, and a brief analytic comment on the coverage angle.
-    - editorial_critique: Provide a 2-4 sentence paragraph assessing the overall editorial stance of the broadcast.
-    - notable_elements: List any stories claimed as "exclusives" and identify any potential major events that are conspicuously omitted from the broadcast.
+    Returns the validated analysis dict, or None if it fails. The row only
+    becomes 'complete' and records the script fingerprint once the full reply
+    validates, so a failed stream stays dirty for the next run.
 
-    Here is the news script:
-    ---
-    {script_text}
-    ---
+    It writes through the ORM, so when run on a worker thread wrap it in
+    closing_db_connections.
     """
+    label = f"{article.article_company} #{article.article_order}"
+    model = structured_model(ARTICLE_ANALYSIS_MODEL, "article_analysis")
+    field_names = list(LLM_SCHEMAS["article_analysis"]["properties"])
 
+    result, _ = AnalysisResult.objects.update_or_create(
+        article=article,
+        defaults={"status": AnalysisResult.STATUS_PARTIAL, "content_hash": ""},
+    )
+
+    parser = IncrementalObjectParser()
     try:
-        response = model.generate_content(prompt)
-        # Clean up the response to extract only the JSON part
-        json_response_text = response.text.strip().replace('```json', '').replace('```', '').strip()
-        analysis_data = json.loads(json_response_text)
-        return analysis_data
+        for chunk in model.generate_content(article_analysis_prompt(article.article_script), stream=True):
+            for key, value in parser.feed(chunk.text):
+                if key not in field_names:
+                    continue
+                setattr(result, key, value)
+                result.save(update_fields=[key, "updated_at"])
+                print(f"  - [{label}] {key} saved ({len(parser.fields)}/{len(field_names)})")
     except Exception as e:
-        print(f"An error occurred during LLM analysis: {e}")
-        # Return None or a default error structure if analysis fails
+        print(f"An error occurred while streaming analysis for {label}: {e}")
+        schema_stats.record("article_analysis", "failed")
         return None
 
+    final_analysis = validate_or_repair(model, "article_analysis", parser.text, max_repairs)
+    if final_analysis is None:
+        return None
+
+    for key in field_names:
+        setattr(result, key, final_analysis[key])
+    result.status = AnalysisResult.STATUS_COMPLETE
+    result.content_hash = article.content_hash
+    result.save()
+    print(f"  - [{label}] analysis complete")
+    return final_analysis
+
 
 # ==============================================================================
 #  THE ORCHESTRATOR - This is the key function that connects everything!
 # ==============================================================================
-def run_full_analysis_pipeline(article_id: int):
+def run_daily_analysis_pipeline(analysis_date, max_workers: int = 4, stream: bool = False,
+                                eps: float | str = None) -> ChangeReport:
+    """
+    Analyze every broadcast of one day in a single pass: one query for the
+    day's articles, one embedding/clustering pass, one labeling and
+    comparative analysis shared by all companies, and one transaction for
+    all AnalysisResult rows. Only new or changed scripts reach the LLM.
+
+    Per-article analyses start first and run alongside the day-level steps.
+    With `stream=True` each one is streamed and saved field by field as it
+    arrives (see stream_article_analysis) instead of at the end.
+
+    `eps` defaults to settings.CLUSTER_EPS; 'auto' tunes it for the day
+    before the clusters go to the labeling LLM.
+    """
+    if isinstance(analysis_date, str):
+        analysis_date = datetime.date.fromisoformat(analysis_date)
+    date_str = analysis_date.strftime('%Y-%m-%d')
+
+    # 1. FETCH the whole day from the database in one query
+    with stage('fetch articles (orm)'):
+        articles = list(
+            NewsArticle.objects
+            .filter(article_date=analysis_date)
+            .select_related('analysis', 'script_blob')
+            .order_by('article_company', 'article_order')
+        )
+    if not articles:
+        print(f"No articles found for {date_str}. Skipping.")
+        return ChangeReport(stage="analysis")
+
+    dirty, report = split_by_change(articles, "analysis")
+    if not dirty:
+        print(f"All analyses for {date_str} are up to date ({report}). Skipping.")
+        return report
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # 2. ANALYZE only the new or changed scripts, a few at a time
+        if stream:
+            futures = [
+                pool.submit(profile_thread(closing_db_connections(stream_article_analysis)), a) for a in dirty
+            ]
+        else:
+            futures = [pool.submit(profile_thread(analyze_article_script), a.article_script) for a in dirty]
+
+        # 3. EMBED and CLUSTER the day once
+        with stage('embed (ingest)'):
+            collection = create_cluster(date_str)
+            ingest(articles, collection, date_str)
+        # Near-duplicate segments (marked after scraping) are clustered as one
+        # seed and sent to the labeling prompt once
+        stable_ids = {a.pk: stable_id(a, date_str) for a in articles}
+        duplicate_of = {
+            stable_ids[a.pk]: stable_ids[a.duplicate_of_id]
+            for a in articles if a.duplicate_of_id in stable_ids
+        }
+        seeds = collections.defaultdict(list)
+        for item_id, canonical in duplicate_of.items():
+            seeds[canonical].append(item_id)
+        seeds = [[canonical] + members for canonical, members in seeds.items()]
+
+        with stage('cluster'):
+            item_clusters = cluster_collection(
+                collection, eps=settings.CLUSTER_EPS if eps is None else eps, where=day_filter(date_str),
+                store=compact_store or embedding_store, seeds=seeds,
+            )
+        if not item_clusters:
+            print("Clustering found no topics; saving analyses without cluster membership.")
+
+        # 4. LABEL the clusters and COMPARE the companies once
+        with stage('label topics (llm)'):
+            labeled_data = label_topic_clusters(item_clusters, duplicate_of=duplicate_of)
+        with stage('comparative analysis (llm)'):
+            comparative = generate_comparative_analysis(labeled_data, date_str)
+
+        with stage('wait for article analyses'):
+            analyses = [f.result() for f in futures]
+
+    # Topic rows for the day's clusters, with one membership per article
+    article_by_item = {item_id: pk for pk, item_id in stable_ids.items()}
+    companies = {a.pk: a.article_company for a in articles}
+    topics, topic_articles = [], []
+    for position, topic in enumerate(labeled_data):
+        article_ids = list(dict.fromkeys(
+            article_by_item[item['id']] for item in topic['items'] if item['id'] in article_by_item
+        ))
+        topics.append(Topic(
+            topic_date=analysis_date,
+            label=topic['topic_label'][:255],
+            position=position,
+            item_count=topic['total_items'],
+            company_count=len({companies[pk] for pk in article_ids}),
+        ))
+        topic_articles.append(article_ids)
+
+    # 5. SAVE the day's results in a single transaction. Streamed analyses
+    # already created their rows, so look the existing rows up again.
+    now = timezone.now()
+    existing = {
+        r.article_id: r
+        for r in AnalysisResult.objects.filter(article__article_date=analysis_date)
+    }
+    to_create, to_update = [], []
+
+    for article, final_analysis in zip(dirty, analyses):
+        if not final_analysis:
+            report.processed.remove(article.pk)
+            report.failed.append(article.pk)
+            continue
+        fields = dict(
+            status=AnalysisResult.STATUS_COMPLETE,
+            headline_analysis=final_analysis.get('headline_analysis', {}),
+            key_agenda_items=final_analysis.get('key_agenda_items', []),
+            editorial_critique=final_analysis.get('editorial_critique', 'Critique failed.'),
+            notable_elements=final_analysis.get('notable_elements', {}),
+            content_hash=article.content_hash,
+            updated_at=now,
+        )
+
+        result = existing.get(article.pk)
+        if result is None:
+            to_create.append(AnalysisResult(article=article, **fields))
+            continue
+        for name, value in fields.items():
+            setattr(result, name, value)
+        to_update.append(result)
+
+    with stage('save results (orm)'), transaction.atomic():
+        DailyAnalysis.objects.update_or_create(
+            analysis_date=analysis_date,
+            defaults=dict(comparative_analysis=comparative),
+        )
+        # The day's clustering replaces its previous topics wholesale
+        Topic.objects.filter(topic_date=analysis_date).delete()
+        topics = Topic.objects.bulk_create(topics)
+        TopicMembership.objects.bulk_create(
+            TopicMembership(
+                topic=topic, article_id=pk, topic_date=analysis_date, article_company=companies[pk],
+            )
+            for topic, article_ids in zip(topics, topic_articles)
+            for pk in article_ids
+        )
+        AnalysisResult.objects.bulk_create(to_create)
+        AnalysisResult.objects.bulk_update(
+            to_update,
+            ['status', 'headline_analysis', 'key_agenda_items', 'editorial_critique',
+             'notable_elements', 'content_hash', 'updated_at'],
+        )
+
+    # The day's topics changed, so its materialized dashboard rows did too
+    with stage('daily stats'):
+        refresh_daily_stats(analysis_date)
+
+    print(f"Saved analysis for {date_str}: {report}")
+    return report
+
+
+# ==============================================================================
+#  NEAR-REAL-TIME
+#  Watch mode (scrape_news --watch) pushes each poll's new segments through
+#  here: embed them, attach them to the day's topics and analyze them, all
+#  without touching the segments that were already processed. The nightly
+#  batch pipeline later re-clusters, labels and compares the full day, and
+#  skips the analyses done here since their content hash still matches.
+# ==============================================================================
+def _vectors_for(articles, collection, date_str: str) -> np.ndarray:
+    ids = [stable_id(a, date_str) for a in articles]
+    known = [i for i in ids if i in embedding_store]
+    vectors = dict(zip(known, embedding_store.get(known))) if known else {}
+
+    missing = [i for i in ids if i not in vectors]
+    if missing:
+        data = collection.get(ids=missing, include=["embeddings"])
+        vectors.update(zip(data["ids"], data["embeddings"]))
+
+    # An item that was never embedded gets a zero vector, which links to nothing
+    dim = len(next(iter(vectors.values()))) if vectors else 1
+    zero = np.zeros(dim, dtype=np.float32)
+    return np.array([vectors.get(i, zero) for i in ids], dtype=np.float32)
+
+
+def _tuned_eps(collection, date_str: str) -> float:
+    # The whole day embedded so far, the new segments included
+    data = collection.get(where=day_filter(date_str), include=["embeddings", "metadatas"])
+    eps, sweep = eps_tuning.tune_eps(
+        data["embeddings"], [(meta or {}).get("company") for meta in data["metadatas"]],
+        coverage_weight=settings.CLUSTER_EPS_COVERAGE_WEIGHT, max_cluster_share=settings.CLUSTER_EPS_MAX_SHARE,
+    )
+    print(f"Auto-tuned eps={eps:.3f} from {len(sweep)} candidates over {len(data['ids'])} segments.")
+    return eps
 
+
+def process_new_segments(articles: list[NewsArticle], max_workers: int = 4,
+                         eps: float | str = None) -> ChangeReport:
+    """
+    Embed, cluster and analyze one day's newly scraped `articles`.
+
+    `eps` defaults to settings.CLUSTER_EPS, so the provisional topics use the
+    nightly pipeline's threshold. 'auto' tunes it on each poll over every
+    segment of the day embedded so far (see api.eps_tuning); the nightly run
+    tunes again on the complete day.
+    """
+    if not articles:
+        return ChangeReport(stage="analysis")
+    analysis_date = _as_date(articles[0].article_date)
     date_str = analysis_date.strftime('%Y-%m-%d')
 
-    # 1. FETCH data from the database
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(profile_thread(analyze_article_script), a.article_script) for a in articles]
+
+        with stage('embed (ingest)'):
+            collection = create_cluster(date_str)
+            ingest(articles, collection, date_str)
+        with stage('cluster'):
+            eps = settings.CLUSTER_EPS if eps is None else eps
+            if eps == 'auto':
+                eps = _tuned_eps(collection, date_str)
+            topics = assign_new_articles(
+                analysis_date, articles, lambda items: _vectors_for(items, collection, date_str), eps=eps,
+            )
+        print(f"Attached {len(articles)} new segments to {len(topics)} topics for {date_str}.")
+
+        analyses = [f.result() for f in futures]
+
+    report = ChangeReport(stage="analysis")
+    for article, final_analysis in zip(articles, analyses):
+        if not final_analysis:
+            report.failed.append(article.pk)
+            continue
+        AnalysisResult.objects.update_or_create(
+            article=article,
+            defaults=dict(
+                status=AnalysisResult.STATUS_COMPLETE,
+                headline_analysis=final_analysis.get('headline_analysis', {}),
+                key_agenda_items=final_analysis.get('key_agenda_items', []),
+                editorial_critique=final_analysis.get('editorial_critique', 'Critique failed.'),
+                notable_elements=final_analysis.get('notable_elements', {}),
+                content_hash=article.content_hash,
+            ),
+        )
+        report.processed.append(article.pk)
+
+    refresh_daily_stats(analysis_date)
+    print(f"Processed new segments for {date_str}: {report}")
+    return report
+
+
+def run_full_analysis_pipeline(article_id: int):
+    """
+    Analyze a single article. Clustering and comparison are day-level work,
+    so this runs the batch pipeline for the article's date; articles of that
+    day whose scripts are unchanged are skipped.
+    """
     try:
         article = NewsArticle.objects.get(pk=article_id)
     except NewsArticle.DoesNotExist:
         print(f"Error: Article with ID {article_id} not found.")
         return
 
-    # Prevent re-running an expensive analysis
-    if hasattr(article, 'analysis'):
-        print(f"Analysis for Article {article_id} already exists. Skipping.")
-        return
-        
-    # 2. EXTRACT the list of items
-    items_to_process = article.items_list
-    if not items_to_process:
-        print(f"Article {article_id} has no items to analyze. Skipping.")
-        return
-
-    # 3. PROCESS the data through the pipeline
-    # Step 1A
-    item_clusters = create_chroma_clusters(items_to_process, threshold=0.6)
-    if not item_clusters:
-        print("Clustering failed. Aborting pipeline.")
-        return
-        
-    # Step 1B
-    labeled_data = label_clusters(item_clusters)
-    if not labeled_data:
-        print("Labeling failed. Aborting pipeline.")
-        return
-        
-    # Step 2
-    final_analysis = analyze_broadcast_structure(labeled_data)
-    if not final_analysis:
-        print("Final analysis failed. Aborting pipeline.")
-        return
-
-    # 4. SAVE the results back to the database
-    try:
-        AnalysisResult.objects.create(
-            article=article,
-            clustered_topics=labeled_data, # Save result of step 1
-            headline_analysis=final_analysis.get('headline_analysis', {}),
-            editorial_critique=final_analysis.get('editorial_critique', 'Critique failed.')
-        )
-        print(f"Successfully saved analysis for Article ID: {article_id}")
-    except Exception as e:
-        print(f"Error saving analysis result for Article {article_id}: {e}")
\ No newline at end of file
+    return run_daily_analysis_pipeline(article.article_date)
@@ -0,0 +1,39 @@
+# api/signals.py
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import fulltext
+from .models import NewsArticle, ScriptBlob
+
+
+@receiver(post_save, sender=NewsArticle)
+def index_article_text(sender, instance, update_fields=None, **kwargs):
+    # Saves that touch neither the title nor the script don't need re-indexing
+    if update_fields is not None and not {'article_title', 'script_blob'} & set(update_fields):
+        return
+    if fulltext.is_supported():
+        fulltext.index_article(instance.pk, instance.article_title, instance.article_script)
+
+
+@receiver(post_delete, sender=NewsArticle)
+def unindex_article_text(sender, instance, **kwargs):
+    if fulltext.is_supported():
+        fulltext.remove_article(instance.pk)
+
+
+@receiver(post_delete, sender=NewsArticle)
+def prune_script_blob(sender, instance, **kwargs):
+    # Scripts are shared by hash; drop the blob once no article uses it
+    ScriptBlob.objects.filter(pk=instance.script_blob_id).unreferenced().delete()
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
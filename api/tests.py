@@ -1,3 +1,1343 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import hashlib
+import io
+import json
+import pstats
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import chromadb
+import numpy as np
+import requests
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api import archive
+from api.compaction import CompactEmbeddingStore, Compactor, refined_cosine_distances, search
+from api.broadcasters import BROADCASTERS, SBS, get_broadcasters, get_news_date
+from api.daily_stats import refresh_daily_stats
+from api.embedding_store import EmbeddingStore
+from api.eps_tuning import cosine_distances, labels_at, silhouette, tune_eps
+from api.fulltext import fulltext_search
+from api.jobs import run_analysis_job
+from api.models import (
+    AnalysisJob, AnalysisResult, DailyAnalysis, DailyCompanyStats, NewsArticle, QuarantinedFetch, ScriptBlob,
+    Topic, TopicMembership, stable_id,
+)
+from api import profiling
+from api.profiling import collapsed_stacks, stage
+from api.near_duplicates import find_near_duplicates, mark_near_duplicates
+from api.watch import AdaptiveInterval, assign_new_articles, extend_clusters
+from api.http_cache import CachedSession, CacheMiss
+from api.llm_schemas import (
+    ARTICLE_ANALYSIS_SCHEMA, IncrementalObjectParser, SchemaStats, parse_and_validate,
+)
+
+try:
+    from api import services
+except Exception:  # api.services configures the Gemini client on import and needs GEMINI_API_KEY
+    services = None
+
+
+class StubEmbedder(chromadb.EmbeddingFunction):
+    """Hashed bag of words standing in for the Gemini embedder: scripts sharing words sit close."""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in str(text).split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+            vectors.append(vector)
+        return vectors
+
+
+@unittest.skipUnless(services, "api.services could not be imported (GEMINI_API_KEY / Gemini client)")
+@override_settings(LLM_BACKEND='fake', FAKE_LLM_LATENCY=0, CHROMA_LAYOUT='daily')
+class ServicesTestCase(TestCase):
+    """
+    Runs api.services against an in-memory Chroma client, the stub embedder
+    and a temporary embedding store, with the fake LLM backend.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.chroma = chromadb.EphemeralClient()
+        for c in self.chroma.list_collections():
+            self.chroma.delete_collection(getattr(c, 'name', c))
+        self.store = EmbeddingStore(tmp.name)
+        for name, value in [('chroma_client', self.chroma), ('gemini_ef', StubEmbedder()),
+                            ('embedding_store', self.store), ('compact_store', None)]:
+            self.enterContext(mock.patch.object(services, name, value))
+        self.enterContext(mock.patch.dict(services._collection_handles, clear=True))
+        services.embed_query.cache_clear()
+
+
+class OfflineParserTests(TestCase):
+    """Parsers run against pages replayed from the raw page cache."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session = CachedSession(cache_dir=self.tmp.name, offline=True)
+
+    def tearDown(self):
+        self.session.close()
+        self.tmp.cleanup()
+
+    def test_kbs_page_from_cache(self):
+        url = "https://news.kbs.co.kr/news/pc/view/view.do?ncd=1"
+        self.session.cache.put_text(url, """
+            <html><script>var messageText = "<p>첫 문장</p><p>둘째 문장</p><p>KBS 뉴스 홍길동입니다.</p>";</script></html>
+        """)
+        self.assertEqual(BROADCASTERS['kbs'].fetch_body(url, self.session).body, "첫 문장\n둘째 문장")
+
+    def test_sbs_page_from_cache(self):
+        url = "https://news.sbs.co.kr/news/endPage.do?news_id=N1"
+        self.session.cache.put_text(url, """
+            <html><script type="application/ld+json">{"articleBody": "본문"}</script></html>
+        """)
+        self.assertEqual(BROADCASTERS['sbs'].fetch_body(url, self.session).body, "본문")
+
+    def test_kbs_listing_keeps_segments_between_opening_and_sports(self):
+        source = "".join(
+            f'<a class="box-content" href="/news/{i}"><p class="title">{title}</p></a>'
+            for i, title in enumerate(['예고', '오프닝', '첫 뉴스', '둘째 뉴스', '[스포츠9 헤드라인]', '야구'])
+        )
+        segments = BROADCASTERS['kbs'].parse_listing(source)
+        self.assertEqual([s['title'] for s in segments], ['첫 뉴스', '둘째 뉴스'])
+        self.assertEqual(segments[0]['url'], "https://news.kbs.co.kr/news/2")
+
+    def test_listing_urls_follow_the_date(self):
+        self.assertEqual(BROADCASTERS['mbc'].listing_url(datetime.date(2026, 1, 5)),
+                         "https://imnews.imbc.com/replay/2026/nwdesk/")
+        self.assertIn("broad_date=20260105", BROADCASTERS['sbs'].listing_url(datetime.date(2026, 1, 5)))
+
+    def test_news_day_changes_at_ten_pm(self):
+        self.assertEqual(get_news_date(datetime.datetime(2025, 9, 30, 21, 59)), datetime.date(2025, 9, 29))
+        self.assertEqual(get_news_date(datetime.datetime(2025, 9, 30, 22, 0)), datetime.date(2025, 9, 30))
+
+    def test_scrape_news_offline_for_a_subset_of_broadcasters(self):
+        sbs = BROADCASTERS['sbs']
+        self.session.cache.put_text(sbs.listing_url(get_news_date()), """
+            <li itemprop="itemListElement"><a href="/news/endPage.do?news_id=N1"><img alt="첫 뉴스"></a></li>
+            <li itemprop="itemListElement"><em class="cate">스포츠</em><a href="/s"><img alt="야구"></a></li>
+            <li itemprop="itemListElement"><a href="/news/endPage.do?news_id=N2"><img alt="[날씨] 맑음"></a></li>
+        """)
+        self.session.cache.put_text("https://news.sbs.co.kr/news/endPage.do?news_id=N1",
+                                    '<script type="application/ld+json">{"articleBody": "본문"}</script>')
+
+        call_command('scrape_news', '--offline', '--cache-dir', self.tmp.name, '--broadcasters', 'sbs',
+                     stdout=io.StringIO())
+        article = NewsArticle.objects.get()
+        self.assertEqual((article.article_company, article.article_order, article.article_script), ('sbs', 1, '본문'))
+
+        with self.assertRaises(CommandError):
+            get_broadcasters(['sbs', 'tvchosun'])
+
+    def test_offline_miss_raises(self):
+        with self.assertRaises(CacheMiss):
+            self.session.get("https://imnews.imbc.com/missing.html")
+
+
+class ChangeDetectionTests(TestCase):
+    def setUp(self):
+        self.article = NewsArticle.objects.create(
+            article_company='kbs',
+            article_date=datetime.date(2025, 9, 29),
+            article_url='https://news.kbs.co.kr/1',
+            article_script='첫 문장\n둘째 문장',
+        )
+
+    def test_whitespace_only_change_keeps_fingerprint(self):
+        before = self.article.content_hash
+        self.article.article_script = '첫 문장   둘째 문장 '
+        self.article.save()
+        self.assertEqual(self.article.content_hash, before)
+
+    def test_embedding_dirty_until_hash_recorded(self):
+        self.assertTrue(NewsArticle.objects.needs_embedding().exists())
+        NewsArticle.objects.update(embedded_hash=self.article.content_hash)
+        self.assertFalse(NewsArticle.objects.needs_embedding().exists())
+
+        self.article.article_script = '바뀐 문장'
+        self.article.save()
+        self.assertTrue(NewsArticle.objects.needs_embedding().exists())
+
+    def test_analysis_dirty_when_script_changes(self):
+        AnalysisResult.objects.create(
+            article=self.article,
+            headline_analysis={},
+            editorial_critique='',
+            notable_elements={},
+            content_hash=self.article.content_hash,
+        )
+        self.assertFalse(NewsArticle.objects.needs_analysis().exists())
+
+        self.article.article_script = '바뀐 문장'
+        self.article.save()
+        self.assertTrue(NewsArticle.objects.needs_analysis().exists())
+
+
+class StructuredOutputTests(TestCase):
+    valid = {
+        "headline_analysis": {"topic": "t", "framing": "f", "downplayed_stories": []},
+        "key_agenda_items": [{"topic": "t", "placement": "1", "comment": "c"}],
+        "editorial_critique": "critique",
+        "notable_elements": {"exclusives_claimed": [], "potential_omissions": ["x"]},
+    }
+
+    def test_fenced_reply_is_accepted(self):
+        text = "```json\n" + json.dumps(self.valid) + "\n```"
+        data, errors = parse_and_validate(text, ARTICLE_ANALYSIS_SCHEMA)
+        self.assertEqual(errors, [])
+        self.assertEqual(data, self.valid)
+
+    def test_errors_point_at_the_broken_field(self):
+        broken = dict(self.valid, notable_elements={"exclusives_claimed": "none"})
+        _, errors = parse_and_validate(json.dumps(broken), ARTICLE_ANALYSIS_SCHEMA)
+        self.assertIn("$.notable_elements: missing required field 'potential_omissions'", errors)
+        self.assertIn("$.notable_elements.exclusives_claimed: expected array, got str", errors)
+
+    def test_truncated_reply_is_a_parse_error(self):
+        _, errors = parse_and_validate('{"headline_analysis": {', ARTICLE_ANALYSIS_SCHEMA)
+        self.assertTrue(errors[0].startswith("$: invalid JSON"))
+
+    def test_failure_rate(self):
+        stats = SchemaStats()
+        for outcome in ("ok", "ok", "repaired", "failed"):
+            stats.record("article_analysis", outcome)
+        self.assertEqual(stats.failure_rate("article_analysis"), 0.25)
+        self.assertEqual(stats.repair_rate("article_analysis"), 0.25)
+
+    def test_incremental_parser_yields_fields_as_they_complete(self):
+        text = json.dumps(self.valid, ensure_ascii=False)
+        parser = IncrementalObjectParser()
+        seen = []
+        for i in range(0, len(text), 7):
+            for key, value in parser.feed(text[i:i + 7]):
+                seen.append((key, i))
+        self.assertEqual([key for key, _ in seen], list(self.valid))
+        # the first field is available well before the reply has finished
+        self.assertLess(seen[0][1], len(text) // 2)
+        self.assertEqual(parser.fields, self.valid)
+        self.assertTrue(parser.done)
+
+    def test_incremental_parser_waits_for_trailing_number(self):
+        parser = IncrementalObjectParser()
+        self.assertEqual(parser.feed('{"count": 12'), [])
+        self.assertEqual(parser.feed('3}'), [("count", 123)])
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        def make(company, day, script):
+            return NewsArticle.objects.create(
+                article_company=company,
+                article_date=datetime.date(2025, 9, day),
+                article_url=f'https://example.com/{company}/{day}',
+                article_title=f'{company} 뉴스',
+                article_script=script,
+            )
+        self.kbs = make('kbs', 28, '오늘 국회에서 내년도 예산안이 통과되었습니다.')
+        self.mbc = make('mbc', 29, '국회는 예산 심사를 이어갔습니다.')
+        self.sbs = make('sbs', 29, '태풍이 북상하고 있습니다.')
+
+    def ids(self, q, **filters):
+        return {r['id'] for r in fulltext_search(q, **filters)}
+
+    def test_two_syllable_term_matches_inside_words(self):
+        self.assertEqual(self.ids('국회'), {self.kbs.pk, self.mbc.pk})
+
+    def test_terms_are_anded(self):
+        self.assertEqual(self.ids('국회 예산안'), {self.kbs.pk})
+
+    def test_phrase_query(self):
+        self.assertEqual(self.ids('"국회에서 내년도"'), {self.kbs.pk})
+        self.assertEqual(self.ids('"국회에서 예산"'), set())
+
+    def test_company_and_date_filters(self):
+        self.assertEqual(self.ids('국회', company='mbc'), {self.mbc.pk})
+        self.assertEqual(self.ids('국회', date_to=datetime.date(2025, 9, 28)), {self.kbs.pk})
+
+    def test_index_follows_updates_and_deletes(self):
+        self.sbs.article_script = '국회 앞 집회 소식입니다.'
+        self.sbs.save()
+        self.assertIn(self.sbs.pk, self.ids('국회'))
+        self.kbs.delete()
+        self.assertNotIn(self.kbs.pk, self.ids('국회'))
+
+    def test_highlight(self):
+        result = fulltext_search('예산안')[0]
+        self.assertIn('<mark>예산안</mark>', result['highlight'])
+
+
+class EmbeddingStoreTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = EmbeddingStore(self.tmp.name, dtype='float16')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_upsert_appends_and_overwrites(self):
+        self.store.upsert(['a', 'b'], [[1, 0], [0, 1]], [20250929, 20250930])
+        self.store.upsert(['b', 'c'], [[1, 1], [2, 2]], [20250930, 20251001])
+
+        self.assertEqual(len(self.store), 3)
+        np.testing.assert_array_equal(self.store.get(['c', 'b', 'a']), [[2, 2], [1, 1], [1, 0]])
+        self.assertEqual(self.store.shards(), ['2025_09', '2025_10'])
+
+    def test_vectors_by_date_range(self):
+        self.store.upsert(['a', 'b', 'c'], [[1, 0], [0, 1], [2, 2]], [20250929, 20250930, 20251001])
+
+        ids, dates, vectors = self.store.vectors(date_from=20250930, date_to=20250930)
+        self.assertEqual(ids, ['b'])
+        np.testing.assert_array_equal(vectors, [[0, 1]])
+
+        # A whole shard comes back as a read-only memmap, without copying
+        ids, _, vectors = self.store.vectors(date_from=20251001)
+        self.assertEqual(ids, ['c'])
+        self.assertIsInstance(vectors, np.memmap)
+
+    def test_index_survives_reopen(self):
+        self.store.upsert(['a'], [[1, 0]], [20250929])
+        reopened = EmbeddingStore(self.tmp.name, dtype='float16')
+        self.assertIn('a', reopened)
+        self.assertNotIn('b', reopened)
+
+    def test_rename_rekeys_rows_in_place(self):
+        self.store.upsert(['a', 'b', 'c'], [[1, 0], [0, 1], [2, 2]], [20250929, 20250930, 20251001])
+        self.assertEqual(self.store.rename({'a': 'x', 'b': 'c'}), 1)  # 'c' is taken, so 'b' keeps its id
+
+        reopened = EmbeddingStore(self.tmp.name, dtype='float16')
+        self.assertEqual(sorted(reopened.index), ['b', 'c', 'x'])
+        np.testing.assert_array_equal(reopened.get(['x', 'c']), [[1, 0], [2, 2]])
+
+    def test_stable_id_ignores_running_order(self):
+        article = NewsArticle(article_company='KBS', article_url='https://example.com/1', article_order=1)
+        before = stable_id(article, '2025-09-30')
+        article.article_order = 7
+        self.assertEqual(stable_id(article, '2025-09-30'), before)
+        self.assertNotEqual(stable_id(article, '2025-10-01'), before)
+
+
+class NearDuplicateTests(TestCase):
+    wire = (
+        "정부는 오늘 내년도 예산안을 국무회의에서 의결했습니다. 총지출은 올해보다 3.2% 늘어난 "
+        "677조 원 규모로, 복지와 연구개발 예산이 크게 늘었습니다. 야당은 건전재정 기조가 "
+        "무너졌다며 국회 심사 과정에서 대폭 삭감하겠다고 밝혔습니다."
+    )
+
+    def test_groups_reworded_wire_copy(self):
+        groups = find_near_duplicates([
+            ('kbs', self.wire),
+            ('mbc', self.wire.replace("정부는", "정부가").replace("밝혔습니다", "말했습니다")),
+            ('sbs', "태풍 힌남노가 북상하면서 남해안 지역에 많은 비가 내리고 있습니다."),
+        ])
+        self.assertEqual(groups, [['kbs', 'mbc']])
+
+    def test_blank_scripts_are_not_duplicates(self):
+        self.assertEqual(find_near_duplicates([('kbs', ''), ('mbc', '   '), ('sbs', '속보')]), [])
+
+    def test_mark_points_members_at_canonical(self):
+        def make(company, script):
+            return NewsArticle.objects.create(
+                article_company=company,
+                article_date=datetime.date(2025, 9, 29),
+                article_url=f'https://example.com/{company}',
+                article_script=script,
+            )
+        kbs, mbc = make('kbs', self.wire), make('mbc', self.wire + " 이상 보도국입니다.")
+        sbs = make('sbs', "태풍 힌남노가 북상하면서 남해안 지역에 많은 비가 내리고 있습니다.")
+
+        mark_near_duplicates(NewsArticle.objects.all())
+        self.assertEqual(
+            dict(NewsArticle.objects.values_list('article_company', 'duplicate_of')),
+            {'kbs': None, 'mbc': kbs.pk, 'sbs': None},
+        )
+
+        mbc.article_script = "전혀 다른 기사입니다. 오늘 서울의 낮 기온은 30도까지 오르겠습니다."
+        mbc.save()
+        mark_near_duplicates(NewsArticle.objects.all())
+        self.assertIsNone(NewsArticle.objects.get(pk=mbc.pk).duplicate_of_id)
+
+
+@override_settings(LLM_BACKEND='fake', FAKE_LLM_LATENCY=0, ANALYSIS_API_TOKEN='secret')
+class AsyncApiTests(TestCase):
+    auth = {'Authorization': 'Bearer secret'}
+
+    def setUp(self):
+        self.article = NewsArticle.objects.create(
+            article_company='kbs',
+            article_date=datetime.date(2025, 9, 29),
+            article_url='https://news.kbs.co.kr/1',
+            article_title='국회 소식',
+            article_script='오늘 국회에서 예산안이 통과되었습니다.',
+        )
+        self.url = f'/api/articles/{self.article.pk}/analysis/'
+
+    async def test_analysis_job_awaited(self):
+        response = await self.async_client.post(self.url + '?wait=1', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], AnalysisJob.STATUS_DONE)
+
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.json()['status'], AnalysisResult.STATUS_COMPLETE)
+        self.assertEqual(response.json()['editorial_critique'], 'placeholder')
+
+    async def test_background_job_can_be_polled(self):
+        response = await self.async_client.post(self.url, headers=self.auth)
+        self.assertEqual(response.status_code, 202)
+        job_url = f"/api/jobs/{response.json()['id']}/"
+
+        for _ in range(50):
+            status = (await self.async_client.get(job_url)).json()['status']
+            if status == AnalysisJob.STATUS_DONE:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(status, AnalysisJob.STATUS_DONE)
+
+    async def test_analysis_job_needs_the_token(self):
+        for headers in [{}, {'Authorization': 'Bearer wrong'}]:
+            response = await self.async_client.post(self.url + '?wait=1', headers=headers)
+            self.assertEqual(response.status_code, 401, headers)
+        with override_settings(ANALYSIS_API_TOKEN=''):
+            response = await self.async_client.post(self.url + '?wait=1', headers={'Authorization': 'Bearer '})
+            self.assertEqual(response.status_code, 401)
+        self.assertFalse(await AnalysisJob.objects.aexists())
+
+    async def test_extra_keys_in_the_model_reply_are_ignored(self):
+        job = await AnalysisJob.objects.acreate(article=self.article)
+        reply = {'headline_analysis': {'topic': '예산'}, 'key_agenda_items': [], 'editorial_critique': 'ok',
+                 'notable_elements': {}, 'confidence': 0.9}
+        with mock.patch('api.jobs.analyze_article_script_async', return_value=reply):
+            job = await run_analysis_job(job)
+        self.assertEqual(job.status, AnalysisJob.STATUS_DONE)
+        self.assertEqual((await AnalysisResult.objects.aget(article=self.article)).editorial_critique, 'ok')
+
+    async def test_job_that_raises_is_marked_failed(self):
+        job = await AnalysisJob.objects.acreate(article=self.article)
+        with mock.patch('api.jobs.analyze_article_script_async', side_effect=RuntimeError('quota exceeded')):
+            await run_analysis_job(job)
+
+        job = await AnalysisJob.objects.aget(pk=job.pk)
+        self.assertEqual(job.status, AnalysisJob.STATUS_FAILED)
+        self.assertEqual(job.error, 'RuntimeError: quota exceeded')
+        self.assertIsNotNone(job.finished_at)
+
+    async def test_missing_article_and_analysis(self):
+        self.assertEqual(
+            (await self.async_client.post('/api/articles/999/analysis/', headers=self.auth)).status_code, 404
+        )
+        self.assertEqual((await self.async_client.get(self.url)).status_code, 404)
+
+    async def test_semantic_search_rejects_bad_queries(self):
+        for params in [{}, {'q': '예산', 'k': 0}, {'q': '예산', 'date_from': '2025-10-01', 'date_to': '2025-09-29'},
+                       {'q': '예산', 'date_from': '2025-13-01'}]:
+            response = await self.async_client.get('/api/search/', params)
+            self.assertEqual(response.status_code, 400, params)
+
+    async def test_fulltext_search_view(self):
+        response = await self.async_client.get('/api/search/text/', {'q': '예산안'})
+        self.assertEqual(response.json()['results'][0]['id'], self.article.pk)
+        self.assertEqual((await self.async_client.get('/api/search/text/')).status_code, 400)
+
+
+class ArticleApiTests(TestCase):
+    def setUp(self):
+        day = datetime.date(2025, 9, 29)
+        topic = Topic.objects.create(topic_date=day, label='예산안 국회 통과', item_count=2, company_count=2)
+        for i, company in enumerate(['kbs', 'mbc', 'sbs', 'jtbc']):
+            article = NewsArticle.objects.create(
+                article_company=company,
+                article_date=day,
+                article_url=f'https://example.com/{company}',
+                article_script='긴 대본 ' * 200,
+            )
+            if i < 3:
+                AnalysisResult.objects.create(article=article, headline_analysis={'topic': '예산안'})
+                if company != 'sbs':
+                    topic.articles.add(article, through_defaults={'topic_date': day, 'article_company': company})
+        DailyAnalysis.objects.create(analysis_date=day, comparative_analysis={'primary_narrative': '예산'})
+
+    def test_list_with_analysis_is_constant_queries(self):
+        # one for the articles joined with their analysis, one for their topics
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/articles/', {'date': '2025-09-29'})
+        articles = response.json()
+        self.assertEqual(len(articles), 4)
+        by_company = {a['article_company']: a for a in articles}
+        self.assertIsNone(by_company['jtbc']['analysis'])
+        self.assertEqual([t['label'] for t in by_company['kbs']['topics']], ['예산안 국회 통과'])
+        self.assertEqual(by_company['sbs']['topics'], [])
+
+    def test_malformed_or_impossible_date_is_rejected(self):
+        for date in ('29-09-2025', '2025-02-30'):
+            response = self.client.get('/api/articles/', {'date': date})
+            self.assertEqual(response.status_code, 400, date)
+            self.assertIn('date', response.json())
+
+    def test_field_selection_skips_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/articles/', {'fields': 'id,article_company,analysis.status'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('script', queries[0]['sql'])
+        self.assertNotIn('headline_analysis', queries[0]['sql'])
+        kbs = next(a for a in response.json() if a['article_company'] == 'kbs')
+        self.assertEqual(kbs, {'id': kbs['id'], 'article_company': 'kbs', 'analysis': {'status': 'complete'}})
+
+    def test_omit_without_analysis_skips_the_join(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/articles/', {'omit': 'analysis,article_script,topics'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        self.assertNotIn('article_script', response.json()[0])
+
+    def test_detail_and_daily(self):
+        pk = NewsArticle.objects.get(article_company='kbs').pk
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/articles/{pk}/', {'omit': 'article_script,topics'})
+        self.assertEqual(response.json()['analysis']['headline_analysis'], {'topic': '예산안'})
+
+        response = self.client.get('/api/daily/2025-09-29/', {'fields': 'comparative_analysis'})
+        self.assertEqual(response.json(), {'comparative_analysis': {'primary_narrative': '예산'}})
+        topics = self.client.get('/api/daily/2025-09-29/').json()['topics']
+        self.assertEqual(topics[0]['coverage'], {'kbs': 1, 'mbc': 1})
+        self.assertEqual(self.client.get('/api/daily/2025-09-30/').status_code, 404)
+
+
+class TopicAggregateTests(TestCase):
+    def setUp(self):
+        def article(company, day):
+            return NewsArticle.objects.create(
+                article_company=company, article_date=day,
+                article_url=f'https://example.com/{company}/{day}', article_script=f'{company} {day}',
+            )
+
+        def topic(day, position, *companies):
+            topic = Topic.objects.create(
+                topic_date=day, label=f'topic {position}', position=position,
+                item_count=len(companies), company_count=len(set(companies)),
+            )
+            TopicMembership.objects.bulk_create(
+                TopicMembership(topic=topic, article=article(c, day), topic_date=day, article_company=c)
+                for c in companies
+            )
+            return topic
+
+        sep, oct = datetime.date(2025, 9, 29), datetime.date(2025, 10, 1)
+        self.shared = topic(sep, 0, 'kbs', 'mbc', 'mbc', 'sbs')
+        self.mbc_only = topic(sep, 1, 'mbc')
+        self.kbs_only = topic(oct, 0, 'kbs')
+
+    def test_covered_only_by(self):
+        self.assertEqual(list(Topic.objects.covered_only_by('mbc')), [self.mbc_only])
+        self.assertEqual(list(Topic.objects.between(date_from=datetime.date(2025, 10, 1)).covered_only_by('kbs')),
+                         [self.kbs_only])
+
+    def test_coverage_share_per_month(self):
+        rows = list(TopicMembership.objects.coverage_share('month'))
+        september = {r['company']: (r['items'], r['topics'], round(r['share'], 2))
+                     for r in rows if r['period'] == datetime.date(2025, 9, 1)}
+        self.assertEqual(september, {'kbs': (1, 1, 0.2), 'mbc': (3, 2, 0.6), 'sbs': (1, 1, 0.2)})
+        self.assertEqual([(r['company'], r['share']) for r in rows if r['period'].month == 10], [('kbs', 1.0)])
+
+
+class DailyStatsTests(TestCase):
+    day = datetime.date(2025, 9, 29)
+
+    def setUp(self):
+        def article(company, order, script):
+            return NewsArticle.objects.create(
+                article_company=company, article_date=self.day, article_order=order,
+                article_url=f'https://example.com/{company}/{order}', article_script=script,
+            )
+
+        def topic(position, label, *articles):
+            topic = Topic.objects.create(
+                topic_date=self.day, label=label, position=position, item_count=len(articles),
+                company_count=len({a.article_company for a in articles}),
+            )
+            for a in articles:
+                topic.articles.add(a, through_defaults={'topic_date': self.day, 'article_company': a.article_company})
+
+        kbs_1, kbs_2 = article('kbs', 1, '가' * 100), article('kbs', 2, '나' * 300)
+        self.mbc_1 = article('mbc', 1, '다' * 50)
+        topic(0, '예산안', kbs_2, self.mbc_1)
+        topic(1, '태풍', kbs_1)
+
+    def stats(self):
+        return {s.article_company: s for s in DailyCompanyStats.objects.filter(stats_date=self.day)}
+
+    def test_refresh_materializes_per_company_rows(self):
+        refresh_daily_stats(self.day)
+        kbs, mbc = self.stats()['kbs'], self.stats()['mbc']
+
+        self.assertEqual((kbs.item_count, kbs.avg_segment_length, kbs.topic_count), (2, 200.0, 2))
+        self.assertEqual(kbs.unique_topic_labels, ['태풍'])
+        self.assertEqual((kbs.lead_topic_label, kbs.top_topic_label, kbs.top_topic_rank), ('태풍', '예산안', 2))
+        self.assertEqual((mbc.lead_topic_label, mbc.top_topic_rank, mbc.unique_topic_count), ('예산안', 1, 0))
+
+    def test_refresh_is_incremental_per_day(self):
+        refresh_daily_stats(self.day)
+        self.mbc_1.delete()
+        Topic.objects.filter(label='예산안').update(company_count=1, item_count=1)
+        refresh_daily_stats(self.day)
+
+        self.assertEqual(set(self.stats()), {'kbs'})
+        self.assertEqual(self.stats()['kbs'].unique_topic_count, 2)
+
+    def test_trends_endpoint_reads_only_the_materialized_rows(self):
+        refresh_daily_stats(self.day)
+        DailyCompanyStats.objects.create(stats_date=datetime.date(2025, 9, 30), article_company='kbs',
+                                         item_count=2, avg_segment_length=50.0, top_topic_rank=1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/trends/', {'company': 'kbs', 'period': 'month'})
+        [september] = response.json()['results']
+        self.assertEqual((september['days'], september['items']), (2, 4))
+        self.assertEqual(september['avg_segment_length'], 125.0)
+        self.assertEqual(september['avg_top_topic_rank'], 1.5)
+        self.assertEqual(self.client.get('/api/trends/', {'period': 'decade'}).status_code, 400)
+
+
+class SqlitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_new_connections_get_the_configured_pragmas(self):
+        # The in-memory test database reports 'memory' for journal_mode, so
+        # check the PRAGMAs that apply to every SQLite connection
+        if not settings.SQLITE_PRAGMAS:
+            self.skipTest("SQLITE_PERFORMANCE_MODE is off")
+        expected = {'synchronous': 1, 'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout']}
+        self.assertEqual({name: self.pragma(name) for name in expected}, expected)
+
+
+class WatchModeTests(TestCase):
+    day = datetime.date(2025, 9, 30)
+
+    def article(self, company, order, title):
+        return NewsArticle.objects.create(
+            article_company=company, article_date=self.day, article_order=order,
+            article_title=title, article_url=f"https://{company}.example/{order}", article_script=title,
+        )
+
+    def test_interval_backs_off_until_new_segments_appear(self):
+        interval = AdaptiveInterval(minimum=60, maximum=600)
+        self.assertEqual([interval.next(False) for _ in range(5)], [120, 240, 480, 600, 600])
+        self.assertEqual(interval.next(True), 60)
+
+    def test_new_points_join_link_and_merge_topics(self):
+        members = np.array([[1, 0, 0], [0, 1, 0]], dtype=np.float32)
+        new = np.array([[1, 0.01, 0], [0.7, 0.7, 0], [0, 0, 1]], dtype=np.float32)
+        groups = sorted(extend_clusters(members, [10, 20], new, eps=0.35))
+        # The diagonal point bridges both topics; the last one starts its own
+        self.assertEqual(groups, [([], [2]), ([10, 20], [0, 1])])
+
+    def test_assign_new_articles_extends_the_stored_topics(self):
+        budget_kbs, storm_mbc = self.article('kbs', 1, '예산안'), self.article('mbc', 1, '태풍')
+        topic = Topic.objects.create(topic_date=self.day, label='예산안', position=0, item_count=1, company_count=1)
+        TopicMembership.objects.create(topic=topic, article=budget_kbs, topic_date=self.day, article_company='kbs')
+        vectors = {'예산안': [1, 0], '태풍': [0, 1]}
+
+        budget_sbs = self.article('sbs', 1, '예산안')
+        changed = assign_new_articles(self.day, [budget_sbs, storm_mbc],
+                                      lambda articles: [vectors[a.article_title] for a in articles])
+
+        self.assertEqual({t.label: (t.item_count, t.company_count) for t in changed},
+                         {'예산안': (2, 2), '태풍': (1, 1)})
+        self.assertEqual(Topic.objects.get(label='태풍').position, 1)
+
+    def test_watch_fetches_only_unseen_segments(self):
+        self.day = datetime.date.today()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = CachedSession(cache_dir=tmp.name, offline=True).cache
+        cache.put_text(BROADCASTERS['sbs'].listing_url(self.day), """
+            <li itemprop="itemListElement"><a href="/news/endPage.do?news_id=N1"><img alt="첫 뉴스"></a></li>
+            <li itemprop="itemListElement"><a href="/news/endPage.do?news_id=N2"><img alt="둘째 뉴스"></a></li>
+        """)
+        # N1 is already stored, so only N2 has to be in the cache
+        NewsArticle.objects.create(article_company='sbs', article_date=self.day, article_order=1,
+                                   article_url="https://news.sbs.co.kr/news/endPage.do?news_id=N1")
+        cache.put_text("https://news.sbs.co.kr/news/endPage.do?news_id=N2",
+                       '<script type="application/ld+json">{"articleBody": "둘째 본문"}</script>')
+
+        # A watch-until time before the broadcasts means the next morning, so
+        # the deadline is always ahead and --max-polls ends the run
+        out = io.StringIO()
+        call_command('scrape_news', '--offline', '--cache-dir', tmp.name, '--broadcasters', 'sbs', '--watch',
+                     '--date', self.day.isoformat(), '--watch-until', '04:00', '--poll-min', '0', '--poll-max', '0', '--max-polls', '2', stdout=out)
+
+        self.assertEqual(NewsArticle.objects.get(article_order=2).article_script, '둘째 본문')
+        self.assertIn("Poll 1: 1 new segments", out.getvalue())
+        self.assertIn("Poll 2: 0 new segments", out.getvalue())
+
+
+class ScriptedSession:
+    """Answers GETs with a scripted sequence of responses or exceptions."""
+
+    offline = False
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        response = requests.Response()
+        response.status_code, response._content, response.encoding = reply[0], reply[1].encode(), 'utf-8'
+        return response
+
+
+class FetchIsolationTests(TestCase):
+    page = '<script type="application/ld+json">{"articleBody": "본문"}</script>'
+
+    def setUp(self):
+        self.sbs = SBS()
+        self.sbs.backoff = self.sbs.request_interval = 0
+
+    def test_transient_errors_are_retried(self):
+        session = ScriptedSession(requests.Timeout("read timed out"), (503, ''), (200, self.page))
+        result = self.sbs.fetch_body("https://news.sbs.co.kr/n1", session)
+        self.assertEqual((result.ok, result.body, result.attempts), (True, '본문', 3))
+
+    def test_permanent_errors_and_bad_pages_fail_without_raising(self):
+        session = ScriptedSession((404, ''), (200, '<html>no metadata</html>'), (500, ''), (500, ''), (500, ''))
+        self.assertEqual(self.sbs.fetch_body("https://news.sbs.co.kr/n1", session).error, "HTTP 404")
+        self.assertIn("ParseError", self.sbs.fetch_body("https://news.sbs.co.kr/n2", session).error)
+        exhausted = self.sbs.fetch_body("https://news.sbs.co.kr/n3", session)
+        self.assertEqual((exhausted.ok, exhausted.attempts, session.calls), (False, 3, 5))
+        self.assertIn("ParseError", BROADCASTERS['kbs'].fetch_body("https://kbs", ScriptedSession((200, ''))).error)
+
+    def test_failed_segments_are_quarantined_and_retried_first(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = CachedSession(cache_dir=tmp.name, offline=True).cache
+        day = datetime.date(2025, 9, 30)
+        cache.put_text(BROADCASTERS['sbs'].listing_url(day), """
+            <li itemprop="itemListElement"><a href="/news/endPage.do?news_id=N1"><img alt="첫 뉴스"></a></li>
+            <li itemprop="itemListElement"><a href="/news/endPage.do?news_id=N2"><img alt="둘째 뉴스"></a></li>
+        """)
+        cache.put_text("https://news.sbs.co.kr/news/endPage.do?news_id=N1", self.page)
+        scrape = ['scrape_news', '--offline', '--cache-dir', tmp.name, '--broadcasters', 'sbs', '--date', '2025-09-30']
+
+        call_command(*scrape, stdout=io.StringIO())
+        quarantined = QuarantinedFetch.objects.get()
+        self.assertEqual((quarantined.article_order, quarantined.article_title), (2, '둘째 뉴스'))
+        self.assertEqual(list(NewsArticle.objects.values_list('article_order', flat=True)), [1])
+
+        cache.put_text("https://news.sbs.co.kr/news/endPage.do?news_id=N2", self.page)
+        out = io.StringIO()
+        call_command(*scrape, stdout=out)
+        self.assertIn("Retrying 1 quarantined segments first", out.getvalue())
+        self.assertFalse(QuarantinedFetch.objects.exists())
+        self.assertEqual(NewsArticle.objects.get(article_order=2).article_title, '둘째 뉴스')
+
+
+class ScriptBlobTests(TestCase):
+    script = "오늘 국회에서 내년도 예산안이 통과되었습니다. " * 50
+
+    def article(self, company, script):
+        return NewsArticle.objects.create(article_company=company, article_date=datetime.date(2025, 9, 30),
+                                          article_url=f"https://{company}.example/1", article_script=script)
+
+    def test_identical_scripts_are_stored_once_and_compressed(self):
+        kbs, mbc = self.article('kbs', self.script), self.article('mbc', self.script)
+        blob = ScriptBlob.objects.get()
+        self.assertEqual(kbs.script_blob_id, mbc.script_blob_id)
+        self.assertEqual(blob.size, len(self.script))
+        self.assertLess(len(blob.data), len(self.script.encode()) // 10)
+        self.assertEqual(NewsArticle.objects.get(pk=kbs.pk).article_script, self.script)
+
+    def test_replaced_and_deleted_scripts_are_pruned(self):
+        kbs = self.article('kbs', self.script)
+        kbs.article_script = "바뀐 대본"
+        kbs.save()
+        self.assertEqual(list(ScriptBlob.objects.values_list('size', flat=True)), [5])
+        kbs.delete()
+        self.assertFalse(ScriptBlob.objects.exists())
+
+    def test_bulk_create_stores_the_scripts(self):
+        NewsArticle.objects.bulk_create(
+            NewsArticle(article_company=c, article_date=datetime.date(2025, 9, 30), article_script=self.script)
+            for c in ('kbs', 'mbc')
+        )
+        self.assertEqual(ScriptBlob.objects.count(), 1)
+        self.assertEqual(len(set(NewsArticle.objects.values_list('content_hash', flat=True))), 1)
+
+    def test_article_list_joins_scripts_only_when_requested(self):
+        self.article('kbs', self.script)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/articles/', {'fields': 'id,article_script'})
+        self.assertEqual(response.json()[0]['article_script'], self.script)
+
+
+@unittest.skipUnless(archive.pa, "pyarrow is not installed")
+class ExportArchiveTests(TestCase):
+    day = datetime.date(2025, 9, 29)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = f"{self.tmp.name}/archive"
+        self.store_dir = f"{self.tmp.name}/store"
+        for company in ('kbs', 'mbc'):
+            for order in (1, 2):
+                NewsArticle.objects.create(
+                    article_company=company, article_date=self.day, article_order=order,
+                    article_url=f"https://example.com/{company}/{order}",
+                    article_title=f"{company} {order}", article_script=f"{company} 대본 {order}",
+                )
+        kbs = NewsArticle.objects.get(article_company='kbs', article_order=1)
+        AnalysisResult.objects.create(article=kbs, headline_analysis={'topic': '예산'}, editorial_critique="평")
+        store = EmbeddingStore(self.store_dir)
+        articles = list(NewsArticle.objects.order_by('pk'))
+        store.upsert([stable_id(a, self.day.isoformat()) for a in articles],
+                     np.eye(4, 8, dtype=np.float32), [20250929] * 4)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def export(self, *args):
+        out = io.StringIO()
+        with override_settings(EMBEDDING_STORE_DIR=self.store_dir):
+            call_command('export_archive', '--output', self.output, *args, stdout=out)
+        return out.getvalue()
+
+    def test_exports_partitioned_tables(self):
+        self.export()
+        pq = archive.pq
+        articles = pq.read_table(f"{self.output}/articles").to_pylist()
+        self.assertEqual(len(articles), 4)
+        self.assertEqual({(a['article_company'], a['article_script']) for a in articles if a['article_order'] == 2},
+                         {('kbs', "kbs 대본 2"), ('mbc', "mbc 대본 2")})
+
+        mbc = pq.read_table(f"{self.output}/articles/article_month=2025-09/article_company=mbc/part-0.parquet")
+        self.assertEqual(mbc.num_rows, 2)
+        self.assertNotIn('article_company', mbc.column_names)
+        self.assertEqual(set(mbc.column('article_date').to_pylist()), {self.day})
+
+        analyses = pq.read_table(f"{self.output}/analyses").to_pylist()
+        self.assertEqual(json.loads(analyses[0]['headline_analysis']), {'topic': '예산'})
+
+        embeddings = pq.read_table(f"{self.output}/embeddings")
+        self.assertEqual(embeddings.schema.field('embedding').type, archive.pa.list_(archive.pa.float32(), 8))
+        vectors = embeddings.column('embedding').combine_chunks().flatten().to_numpy().reshape(-1, 8)
+        self.assertEqual(sorted(vectors.argmax(axis=1)), [0, 1, 2, 3])
+
+    def test_incremental_export_rewrites_only_changed_months(self):
+        self.export()
+        self.assertIn("up to date", self.export())
+
+        for day in (datetime.date(2025, 9, 30), datetime.date(2025, 10, 1)):
+            NewsArticle.objects.create(article_company='kbs', article_date=day, article_order=1, article_script="다음 날")
+        self.assertIn("Exported 2 months (2 new or changed days)", self.export())
+        self.assertEqual(sorted(archive.ArchiveWriter(self.output).load_state()),
+                         ['2025-09-29', '2025-09-30', '2025-10-01'])
+
+        # A new analysis changes the first day; deleting the October article empties its month
+        AnalysisResult.objects.create(article=NewsArticle.objects.get(article_company='mbc', article_order=2))
+        NewsArticle.objects.filter(article_date__month=10).delete()
+        self.assertIn("Exported 2 months (2 new or changed days)", self.export())
+        self.assertEqual(archive.pq.read_table(f"{self.output}/analyses").num_rows, 2)
+        self.assertEqual(archive.pq.read_table(f"{self.output}/articles").num_rows, 5)
+        self.assertEqual(len(archive.ArchiveWriter(self.output).load_state()), 2)
+
+        self.assertIn("Exported 1 months", self.export('--full'))
+
+    def test_rescraped_script_or_title_rewrites_its_month(self):
+        self.export()
+        article = NewsArticle.objects.get(article_company='mbc', article_order=1)
+        article.article_script = "mbc 대본 1, 정정된 내용"
+        article.save()
+        self.assertIn("Exported 1 months (1 new or changed days)", self.export())
+        rows = archive.pq.read_table(f"{self.output}/articles").to_pylist()
+        scripts = {a['article_title']: a['article_script'] for a in rows}
+        self.assertEqual(scripts['mbc 1'], "mbc 대본 1, 정정된 내용")
+
+        NewsArticle.objects.filter(pk=article.pk).update(article_title="mbc 1 (수정)", article_order=5)
+        self.assertIn("Exported 1 months (1 new or changed days)", self.export())
+        self.assertIn("up to date", self.export())
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = f"{self.tmp.name}/cache"
+        self.profile_dir = f"{self.tmp.name}/profiles"
+        session = CachedSession(cache_dir=self.cache_dir, offline=True)
+        session.cache.put_text(BROADCASTERS['sbs'].listing_url(get_news_date()), """
+            <li itemprop="itemListElement"><a href="/news/endPage.do?news_id=N1"><img alt="첫 뉴스"></a></li>
+        """)
+        session.cache.put_text("https://news.sbs.co.kr/news/endPage.do?news_id=N1",
+                               '<script type="application/ld+json">{"articleBody": "본문"}</script>')
+        session.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def scrape(self, *profile):
+        out = io.StringIO()
+        call_command('scrape_news', '--offline', '--cache-dir', self.cache_dir, '--broadcasters', 'sbs',
+                     '--profile', *profile, '--profile-dir', self.profile_dir, stdout=out)
+        return out.getvalue()
+
+    def test_profiled_scrape_writes_every_report(self):
+        out = self.scrape()
+        self.assertIn("article parse", out)
+        self.assertIn("save (orm)", out)
+        self.assertIn("Top 20 allocators", out)
+
+        files = {path.name.split('.', 1)[1]: path for path in Path(self.profile_dir).iterdir()}
+        self.assertEqual(set(files), {'stages.txt', 'pstats', 'cpu.txt', 'collapsed', 'tracemalloc', 'memory.txt'})
+        # The worker thread's profile is merged into the command's
+        functions = {name for _, _, name in pstats.Stats(str(files['pstats'])).stats}
+        self.assertIn('extract_body', functions)
+        self.assertIn('extract_body (broadcasters.py:', files['collapsed'].read_text())
+
+    def test_modes_can_be_chosen(self):
+        self.scrape('stages')
+        self.assertEqual([path.suffix for path in Path(self.profile_dir).iterdir()], ['.txt'])
+
+    def test_stage_is_a_no_op_outside_profiled_runs(self):
+        profiler = profiling.Profiler('idle', ['stages'], self.profile_dir)  # created, never started
+        with stage('anything'):
+            pass
+        self.assertIsNone(profiling._active)
+        self.assertEqual(profiler.timings, {})
+
+    def test_collapsed_stacks_split_time_between_callers(self):
+        # main -> once -> leaf, main -> twice -> leaf (x2), main -> len; in seconds.
+        # Entries are (primitive calls, calls, own time, cumulative time, callers).
+        main, once, twice, leaf = [('app.py', line, name) for line, name in
+                                   [(1, 'main'), (10, 'once'), (20, 'twice'), (30, 'leaf')]]
+        builtin = ('~', 0, '<built-in method builtins.len>')
+        stats = SimpleNamespace(stats={
+            main: (1, 1, 0.001, 0.0115, {}),
+            once: (1, 1, 0.0, 0.003, {main: (1, 1, 0.0, 0.003)}),
+            twice: (1, 1, 0.001, 0.007, {main: (1, 1, 0.001, 0.007)}),
+            leaf: (3, 3, 0.009, 0.009, {once: (1, 1, 0.003, 0.003), twice: (2, 2, 0.006, 0.006)}),
+            builtin: (1, 1, 0.0005, 0.0005, {main: (1, 1, 0.0005, 0.0005)}),
+        })
+        self.assertEqual(collapsed_stacks(stats), [
+            "main (app.py:1) 1000",
+            "main (app.py:1);<built-in method builtins.len> 500",
+            "main (app.py:1);once (app.py:10);leaf (app.py:30) 3000",
+            "main (app.py:1);twice (app.py:20) 1000",
+            "main (app.py:1);twice (app.py:20);leaf (app.py:30) 6000",
+        ])
+
+
+class CompactionTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        basis = rng.standard_normal((8, 64))
+        self.full = EmbeddingStore(f"{self.tmp.name}/full", dtype='float32')
+        for day in range(1, 4):
+            topics = rng.standard_normal((10, 8)) @ basis
+            vectors = topics[rng.integers(0, 10, 30)] + 0.4 * rng.standard_normal((30, 64))
+            self.full.upsert([f"{day}-{i}" for i in range(30)], vectors, [20250900 + day] * 30)
+        self.compact = CompactEmbeddingStore.build(self.full, f"{self.tmp.name}/compact", dim=16, dtype='int8')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_store_holds_int8_codes_and_reopens(self):
+        self.assertEqual(len(self.compact), 90)
+        self.assertEqual(self.compact.codes()[2].dtype, np.int8)
+        self.assertLess(self.compact.nbytes(), 90 * 64 * 4 // 8)
+
+        reopened = CompactEmbeddingStore.open(f"{self.tmp.name}/compact", full=self.full)
+        np.testing.assert_allclose(reopened.get(['2-3']), self.compact.get(['2-3']))
+        self.assertIsNone(CompactEmbeddingStore.open(f"{self.tmp.name}/missing"))
+
+    def test_reranked_search_matches_exact_top_k(self):
+        ids, _, vectors = self.full.vectors()
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        query = vectors[17] + 0.1
+        exact = [ids[i] for i in np.argsort(-(unit @ (query / np.linalg.norm(query))))[:5]]
+        self.assertEqual([item_id for item_id, _, _ in search(query, self.compact, k=5, rerank=4)], exact)
+
+        found = search(query, self.compact, k=5, date_from=20250902, date_to=20250902)
+        self.assertEqual({key for _, key, _ in found}, {20250902})
+
+    def test_refined_distances_give_the_full_precision_clustering(self):
+        from sklearn.cluster import DBSCAN
+
+        ids, _, vectors = self.full.vectors(20250901, 20250901)
+        expected = DBSCAN(eps=0.12, min_samples=1, metric='cosine').fit(vectors).labels_
+        D = refined_cosine_distances(self.compact.get(ids), ids, self.compact.compactor, self.full, eps=0.12)
+        labels = DBSCAN(eps=0.12, min_samples=1, metric='precomputed').fit(D).labels_
+        self.assertLess(len(set(expected)), len(ids))
+        self.assertEqual(len(set(zip(expected, labels))), len(set(expected)))
+        self.assertEqual(len(set(labels)), len(set(expected)))
+
+    def test_unknown_projection_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Compactor.fit(np.ones((4, 8)), dim=2, method='umap')
+
+
+def synthetic_day(noise, seed=0):
+    """12 stories, each aired by one to three broadcasters: (vectors, companies, story of each)."""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((12, 256))
+    truth = [t for t in range(12) for _ in range(1 + t % 3)]
+    vectors = topics[truth] + noise * rng.standard_normal((len(truth), 256))
+    companies = [['KBS', 'MBC', 'SBS'][i % 3] for i in range(len(truth))]
+    return vectors, companies, truth
+
+
+class EpsTuningTests(TestCase):
+    def test_silhouette_matches_sklearn(self):
+        from sklearn.metrics import silhouette_score
+
+        vectors, _, _ = synthetic_day(noise=0.5)
+        D = cosine_distances(vectors)
+        for eps in (0.3, 0.5, 0.7):
+            labels = labels_at(D, eps)
+            self.assertAlmostEqual(silhouette(D, labels), silhouette_score(D, labels, metric='precomputed'), places=4)
+
+    def test_auto_eps_recovers_the_stories_a_fixed_eps_splits(self):
+        from sklearn.cluster import DBSCAN
+        from sklearn.metrics import adjusted_rand_score
+
+        vectors, companies, truth = synthetic_day(noise=0.5)
+        fixed = DBSCAN(eps=0.12, min_samples=1, metric='cosine').fit(vectors).labels_
+        eps, sweep = tune_eps(vectors, companies)
+        tuned = DBSCAN(eps=eps, min_samples=1, metric='cosine').fit(vectors).labels_
+
+        self.assertLess(adjusted_rand_score(truth, fixed), 0.5)
+        self.assertEqual(adjusted_rand_score(truth, tuned), 1.0)
+        self.assertGreater(eps, 0.12)
+        self.assertGreater(len(sweep), 20)
+
+    def test_chaining_eps_values_are_ruled_out(self):
+        vectors, companies, _ = synthetic_day(noise=0.5)
+        eps, sweep = tune_eps(vectors, companies, eps_values=[0.3, 0.95], max_cluster_share=0.3)
+        self.assertEqual(eps, 0.3)
+        self.assertEqual(sweep[1].score, float('-inf'))
+
+    def test_too_few_segments_keep_the_default(self):
+        self.assertEqual(tune_eps(np.eye(2), ['KBS', 'MBC'], default=0.12), (0.12, []))
+
+
+class DailyPipelineTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.day = datetime.date(2025, 9, 29)
+        scripts = {
+            'kbs': '국회 예산안 통과 여야 합의 본회의 표결',
+            'mbc': '국회 예산안 통과 여야 합의 본회의 표결',
+            'sbs': '태풍 북상 남해안 강풍 호우 특보',
+            'jtbc': '증시 코스피 반등 외국인 매수',
+        }
+        self.articles = {
+            company: NewsArticle.objects.create(
+                article_company=company, article_date=self.day, article_url=f'https://example.com/{company}',
+                article_title=f'{company} 뉴스', article_script=script,
+            )
+            for company, script in scripts.items()
+        }
+        clean = self.articles['jtbc']
+        AnalysisResult.objects.create(article=clean, content_hash=clean.content_hash, editorial_critique='kept')
+
+    def test_pipeline_analyzes_the_dirty_articles_once(self):
+        report = services.run_daily_analysis_pipeline(self.day, max_workers=2)
+
+        self.assertEqual(report.skipped, [self.articles['jtbc'].pk])
+        self.assertCountEqual(report.processed, [self.articles[c].pk for c in ('kbs', 'mbc', 'sbs')])
+        self.assertTrue(DailyAnalysis.objects.get(analysis_date=self.day).comparative_analysis)
+        results = {r.article.article_company: r for r in AnalysisResult.objects.select_related('article')}
+        self.assertEqual(results['jtbc'].editorial_critique, 'kept')
+        for company in ('kbs', 'mbc', 'sbs'):
+            self.assertEqual(results[company].status, AnalysisResult.STATUS_COMPLETE)
+            self.assertEqual(results[company].content_hash, self.articles[company].content_hash)
+
+        # Identical scripts share a topic; every article is in exactly one
+        memberships = dict(TopicMembership.objects.values_list('article__article_company', 'topic_id'))
+        self.assertEqual(memberships['kbs'], memberships['mbc'])
+        self.assertEqual(len(memberships), 4)
+
+        # A second run finds nothing to do
+        again = services.run_daily_analysis_pipeline(self.day)
+        self.assertEqual(again.processed, [])
+        self.assertEqual(len(again.skipped), 4)
+
+    def test_analyze_news_command(self):
+        out = io.StringIO()
+        call_command('analyze_news', date='2025-09-29', eps='auto', stdout=out)
+        self.assertIn('3 new/changed, 1 unchanged', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('analyze_news', date='2025-09-29', eps='wide')
+
+
+class WatchEpsTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        day = datetime.date(2025, 9, 29)
+        self.articles = [
+            NewsArticle.objects.create(
+                article_company=company, article_date=day, article_url=f'https://example.com/{company}',
+                article_title=f'{company} 뉴스', article_script=script,
+            )
+            for company, script in [('kbs', '국회 예산안 통과'), ('mbc', '국회 예산안 통과'), ('sbs', '태풍 북상')]
+        ]
+
+    def eps_used(self, **kwargs):
+        with mock.patch.object(services, 'assign_new_articles', return_value=[]) as assign:
+            services.process_new_segments(self.articles, max_workers=1, **kwargs)
+        return assign.call_args.kwargs['eps']
+
+    def test_watch_mode_clusters_at_the_configured_eps(self):
+        with self.settings(CLUSTER_EPS=0.3):
+            self.assertEqual(self.eps_used(), 0.3)
+        self.assertEqual(self.eps_used(eps=0.2), 0.2)
+
+    def test_auto_eps_is_tuned_over_the_day_so_far(self):
+        tune = self.enterContext(mock.patch.object(services.eps_tuning, 'tune_eps', return_value=(0.17, [])))
+        with self.settings(CLUSTER_EPS='auto'):
+            self.assertEqual(self.eps_used(), 0.17)
+        vectors, companies = tune.call_args.args
+        self.assertEqual(len(vectors), 3)
+        self.assertCountEqual(companies, ['kbs', 'mbc', 'sbs'])
+
+
+class StreamingAnalysisTests(ServicesTestCase):
+    def test_fields_are_saved_as_they_stream_in(self):
+        from api.llm import FakeModel
+
+        article = NewsArticle.objects.create(
+            article_company='kbs', article_date=datetime.date(2025, 9, 29), article_url='https://example.com/1',
+            article_script='오늘 국회에서 예산안이 통과되었습니다.',
+        )
+        rows = []
+
+        class ObservedModel(FakeModel):
+            # Snapshot the article's row before each chunk is handed over
+            def generate_content(self, prompt, stream=False):
+                for chunk in super().generate_content(prompt, stream=True):
+                    rows.append(AnalysisResult.objects.values(
+                        'status', 'headline_analysis', 'editorial_critique', 'content_hash',
+                    ).get(article=article))
+                    yield chunk
+
+        def observed_model(model_name, schema_name):
+            return ObservedModel(model_name, {"response_schema": services.LLM_SCHEMAS[schema_name]})
+
+        with mock.patch.object(services, 'structured_model', observed_model):
+            analysis = services.stream_article_analysis(article)
+
+        self.assertEqual(analysis['editorial_critique'], 'placeholder')
+        self.assertGreater(len(rows), 2)
+        self.assertEqual(rows[0], {'status': AnalysisResult.STATUS_PARTIAL, 'headline_analysis': {},
+                                   'editorial_critique': '', 'content_hash': ''})
+        # The headline arrives first and is saved while the rest still streams
+        partial = [r for r in rows if r['headline_analysis'] and not r['editorial_critique']]
+        self.assertTrue(partial)
+        self.assertTrue(all(r['status'] == AnalysisResult.STATUS_PARTIAL for r in rows))
+
+        result = AnalysisResult.objects.get(article=article)
+        self.assertEqual(result.status, AnalysisResult.STATUS_COMPLETE)
+        self.assertEqual(result.content_hash, article.content_hash)
+        self.assertEqual(result.editorial_critique, 'placeholder')
+
+
+class SemanticSearchTests(ServicesTestCase):
+    days = [datetime.date(2025, 9, 29), datetime.date(2025, 9, 30), datetime.date(2025, 10, 1)]
+    scripts = [
+        (0, 'kbs', '예산안 국회 통과'), (0, 'mbc', '태풍 북상 남해안'),
+        (1, 'kbs', '예산안 국회 표결 연기'), (1, 'sbs', '예산안 국회 통과'),
+        (2, 'mbc', '예산안 국회 통과 환영'), (2, 'sbs', '증시 코스피 반등'),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.articles = [
+            NewsArticle.objects.create(
+                article_company=company, article_date=self.days[day], article_url=f'https://example.com/{day}/{company}',
+                article_title=script, article_script=script,
+            )
+            for day, company, script in self.scripts
+        ]
+
+    def ingest(self):
+        # Re-embed everything into the current layout's collections
+        NewsArticle.objects.update(embedded_hash='')
+        for day in self.days:
+            articles = list(NewsArticle.objects.filter(article_date=day))
+            services.ingest(articles, services.create_cluster(day.isoformat()), day.isoformat())
+
+    def ranked(self, query, articles):
+        embed = StubEmbedder()
+        q = embed([query])[0]
+
+        def distance(a):
+            v = embed([a.article_script])[0]
+            return 1 - q @ v / (np.linalg.norm(q) * np.linalg.norm(v))
+        return [(a, distance(a)) for a in sorted(articles, key=distance)]
+
+    def test_hits_from_every_collection_are_merged_by_distance(self):
+        for layout in ('daily', 'monthly'):
+            with self.subTest(layout=layout), self.settings(CHROMA_LAYOUT=layout):
+                self.ingest()
+                hits = services.semantic_search('예산안 국회 통과 환영', k=3)
+                expected = self.ranked('예산안 국회 통과 환영', self.articles)[:3]
+
+                self.assertEqual({h['date'] for h in hits}, {d.isoformat() for d in self.days})
+                self.assertEqual({h['article_id'] for h in hits}, {a.pk for a, _ in expected})
+                self.assertEqual(hits[0]['article_id'], expected[0][0].pk)
+                np.testing.assert_allclose([h['distance'] for h in hits], [d for _, d in expected], atol=1e-5)
+                self.assertEqual(hits[0]['snippet'], '예산안 국회 통과 환영')
+
+    def test_company_filter_and_date_range_across_collections(self):
+        for layout in ('daily', 'monthly'):
+            with self.subTest(layout=layout), self.settings(CHROMA_LAYOUT=layout):
+                self.ingest()
+                hits = services.semantic_search('예산안 국회 통과', company='sbs', k=5)
+                self.assertEqual({h['company'] for h in hits}, {'sbs'})
+                self.assertEqual(hits[0]['date'], '2025-09-30')
+
+                hits = services.semantic_search('예산안 국회 통과', date_from=self.days[1], date_to=self.days[2], k=10)
+                self.assertEqual({h['date'] for h in hits}, {'2025-09-30', '2025-10-01'})
+                self.assertEqual(len(hits), 4)
+
+    def test_search_view_reads_snippets_outside_the_search_thread(self):
+        self.ingest()
+        with self.assertNumQueries(0):
+            hits = services.semantic_search('예산안 국회 통과 환영', k=2, snippets=False)
+        self.assertIsNone(hits[0]['snippet'])
+
+        response = self.client.get('/api/search/', {'q': '예산안 국회 통과 환영', 'k': 2})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(results[0]['snippet'], '예산안 국회 통과 환영')
+        self.assertNotIn('meta', results[0])
+
+    def test_sync_backfills_missing_article_ids(self):
+        from api.management.commands import sync_embedding_store
+
+        self.ingest()
+        collection = self.chroma.get_collection(services.collection_name(self.days[0]))
+        old = collection.get(include=['embeddings', 'metadatas'])
+        # As written by ingests from before article_id was recorded
+        collection.delete(ids=old['ids'])
+        collection.add(ids=old['ids'], embeddings=old['embeddings'],
+                       metadatas=[{k: v for k, v in m.items() if k != 'article_id'} for m in old['metadatas']])
+        self.assertIsNone(services.semantic_search('태풍 북상 남해안', date_to=self.days[0], k=1)[0]['article_id'])
+
+        with mock.patch.multiple(sync_embedding_store, chroma_client=self.chroma, embedding_store=self.store):
+            out = io.StringIO()
+            call_command('sync_embedding_store', stdout=out)
+        self.assertIn('added article_id to 2 items', out.getvalue())
+        hit = services.semantic_search('태풍 북상 남해안', date_to=self.days[0], k=1)[0]
+        self.assertEqual(hit['article_id'], self.articles[1].pk)
+
+
+class ChromaLayoutTests(ServicesTestCase):
+    def make(self, *names):
+        for name in names:
+            self.chroma.get_or_create_collection(name)
+
+    def test_day_filter_and_typed_metadata(self):
+        day = datetime.date(2025, 9, 29)
+        self.assertIsNone(services.day_filter(day, layout='daily'))
+        self.assertEqual(services.day_filter('2025-09-29', layout='monthly'), {'date': 20250929})
+        self.assertEqual(services.day_filter(day, layout='single'), {'date': 20250929})
+
+        # Older daily ingests wrote the date as a string and order as text
+        meta = services.typed_metadata({'company': 'kbs', 'date': '2025-09-29', 'order': '3', 'title': None}, day)
+        self.assertEqual(meta, {'company': 'kbs', 'date': 20250929, 'order': 3})
+        self.assertEqual(services.typed_metadata({'order': 'x'}, day)['order'], 0)
+
+    def test_collection_names_per_layout(self):
+        self.make('broadcasts_2025_09_29', 'broadcasts_2025_09_30', 'broadcasts_2025_10_01',
+                  'broadcasts_2024_02', 'broadcasts_2025_01', 'broadcasts_2025_02', 'broadcasts_2025_04',
+                  'broadcasts_all', 'other_2025_09')
+        d = datetime.date
+
+        self.assertEqual(services.collection_names(d(2025, 9, 30), d(2025, 10, 1), layout='daily'),
+                         ['broadcasts_2025_09_30', 'broadcasts_2025_10_01'])
+        self.assertEqual(services.collection_names(layout='single'), ['broadcasts_all'])
+        self.assertEqual(services.collection_names(layout='monthly'),
+                         ['broadcasts_2024_02', 'broadcasts_2025_01', 'broadcasts_2025_02', 'broadcasts_2025_04'])
+        # A month is in range up to and including its last day
+        for last_day, name in [(d(2024, 2, 29), 'broadcasts_2024_02'), (d(2025, 1, 31), 'broadcasts_2025_01'),
+                               (d(2025, 2, 28), 'broadcasts_2025_02'), (d(2025, 4, 30), 'broadcasts_2025_04')]:
+            self.assertIn(name, services.collection_names(date_from=last_day, layout='monthly'))
+            self.assertNotIn(name, services.collection_names(date_from=last_day + datetime.timedelta(days=1),
+                                                             layout='monthly'))
+        self.assertEqual(services.collection_names(date_from=d(2025, 1, 31), date_to=d(2025, 2, 1), layout='monthly'),
+                         ['broadcasts_2025_01', 'broadcasts_2025_02'])
+
+    def test_migrate_daily_collections_to_monthly(self):
+        from api.management.commands import migrate_chroma_layout
+
+        for day, ids in [('2025_09_29', ['a', 'b']), ('2025_09_30', ['c'])]:
+            self.chroma.create_collection(f'broadcasts_{day}').add(
+                ids=ids, embeddings=[[1.0, float(i)] for i in range(len(ids))],
+                metadatas=[{'company': 'kbs', 'date': day.replace('_', '-'), 'order': str(i)} for i in range(len(ids))],
+            )
+
+        with mock.patch.object(migrate_chroma_layout, 'chroma_client', self.chroma):
+            call_command('migrate_chroma_layout', '--to', 'monthly', '--delete-source', stdout=io.StringIO())
+
+        self.assertEqual(services.collection_names(layout='daily'), [])
+        monthly = self.chroma.get_collection('broadcasts_2025_09')
+        data = monthly.get(where=services.day_filter('2025-09-29', layout='monthly'), include=['metadatas'])
+        self.assertCountEqual(data['ids'], ['a', 'b'])
+        self.assertEqual(sorted(m['order'] for m in data['metadatas']), [0, 1])
+        self.assertEqual(monthly.count(), 3)
+
+
+class AutoEpsClusteringTests(ServicesTestCase):
+    def setUp(self):
+        super().setUp()
+        # A few synthetic days: enough vectors to fit the projection
+        days = [synthetic_day(noise=0.5, seed=seed) for seed in range(4)]
+        for key, (vectors, _, _) in enumerate(days, start=20250901):
+            self.store.upsert([f"{key}-{i}" for i in range(len(vectors))], vectors, [key] * len(vectors))
+        self.compact = CompactEmbeddingStore.build(self.store, f"{self.store.root}-compact", dim=32, dtype='int8')
+
+        vectors, companies, self.truth = days[0]
+        self.ids = [f"20250901-{i}" for i in range(len(vectors))]
+        self.collection = self.chroma.create_collection('broadcasts_2025_09_01')
+        self.collection.add(ids=self.ids, embeddings=vectors.tolist(),
+                            metadatas=[{'company': company, 'date': 20250901} for company in companies])
+
+    def groups(self, clusters):
+        return sorted(sorted(self.ids.index(item['id']) for item in cluster) for cluster in clusters)
+
+    def test_compact_store_is_tuned_on_its_own_distances(self):
+        from sklearn.metrics import adjusted_rand_score
+
+        expected = sorted(sorted(i for i, t in enumerate(self.truth) if t == topic) for topic in set(self.truth))
+        full = services.cluster_collection(self.collection, eps='auto', store=self.store)
+        self.assertEqual(self.groups(full), expected)
+
+        # The calibrated compact distances, not re-normalized projections, are what gets tuned
+        D = self.compact.compactor.distances(self.compact.get(self.ids))
+        eps, _ = tune_eps(None, ['KBS', 'MBC', 'SBS'] * 8, D=D)
+        self.assertEqual(adjusted_rand_score(self.truth, labels_at(D, eps)), 1.0)
+
+        compact = services.cluster_collection(self.collection, eps='auto', store=self.compact)
+        self.assertEqual(self.groups(compact), expected)
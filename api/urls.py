@@ -1,6 +1,16 @@
-from django.urls import path
-from .views import NewsArticleListView
+from django.urls import path, re_path
+from .views import (
+    AnalysisJobView, ArticleAnalysisView, DailyAnalysisView, FullTextSearchView, NewsArticleDetailView,
+    NewsArticleListView, SemanticSearchView, TrendsView,
+)
 
 urlpatterns = [
     path('articles/', NewsArticleListView.as_view(), name='newsarticle-list'),
-]
\ No newline at end of file
+    path('articles/<int:pk>/', NewsArticleDetailView.as_view(), name='newsarticle-detail'),
+    path('articles/<int:pk>/analysis/', ArticleAnalysisView.as_view(), name='article-analysis'),
+    re_path(r'^daily/(?P<analysis_date>\d{4}-\d{2}-\d{2})/$', DailyAnalysisView.as_view(), name='daily-analysis'),
+    path('jobs/<int:pk>/', AnalysisJobView.as_view(), name='analysis-job'),
+    path('search/', SemanticSearchView.as_view(), name='semantic-search'),
+    path('search/text/', FullTextSearchView.as_view(), name='fulltext-search'),
+    path('trends/', TrendsView.as_view(), name='trends'),
+]
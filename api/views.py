@@ -1,14 +1,230 @@
-from django.shortcuts import render
-from rest_framework import generics
-from .models import NewsArticle
-from .serializers import NewsArticleSerializer
+import hmac
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.dateparse import parse_date
+from rest_framework import generics, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .fulltext import fulltext_search
+from .jobs import run_analysis_job, start_analysis_job
+from .models import AnalysisJob, AnalysisResult, DailyAnalysis, DailyCompanyStats, NewsArticle
+from .serializers import (
+    AnalysisJobSerializer, AnalysisResultSerializer, ArticleWithAnalysisSerializer, DailyAnalysisSerializer,
+    SearchQuerySerializer, TrendsQuerySerializer, loaded_columns, parse_field_list, select_fields,
+)
 
 # Create your views here.
 
-class NewsArticleListView(generics.ListAPIView):
+# The analysis, job and search views are async Django views: under an ASGI
+# server a request that is waiting on the LLM, Chroma or the database does
+# not hold a worker thread. They return plain JsonResponses in the same
+# shape the DRF views used.
+
+NOT_FOUND = {'detail': 'Not found.'}
+NOT_AUTHENTICATED = {'detail': 'Authentication credentials were not provided or are invalid.'}
+
+
+def json_response(data, status: int = 200) -> JsonResponse:
+    # Keep Korean text readable, as DRF's JSONRenderer does
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+class FieldSelectionMixin:
+    """
+    Applies `?fields=` / `?omit=` (see serializers.select_fields) to the
+    serializer, and loads only the columns and relations the remaining
+    fields need, so the query count does not grow with the number of rows.
+    """
+
+    def field_selection(self):
+        params = self.request.query_params
+        return {
+            'fields': parse_field_list(params.get('fields')),
+            'omit': parse_field_list(params.get('omit')),
+        }
+
+    def get_queryset(self):
+        template = self.get_serializer_class()(context=self.get_serializer_context())
+        only, related, prefetch = loaded_columns(select_fields(template, **self.field_selection()))
+        queryset = super().get_queryset()
+        if related:
+            # select_related() without arguments would follow every non-null FK
+            queryset = queryset.select_related(*related)
+        return queryset.prefetch_related(*prefetch).only(*only)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        select_fields(getattr(serializer, 'child', serializer), **self.field_selection())
+        return serializer
+
+
+class NewsArticleListView(FieldSelectionMixin, generics.ListAPIView):
+    """
+    Scraped news articles with their analysis and cluster membership,
+    newest first. Query params: date (YYYY-MM-DD), company, fields, omit.
+    """
+    queryset = NewsArticle.objects.order_by('-article_date', 'article_company', 'article_order')
+    serializer_class = ArticleWithAnalysisSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        if params.get('date'):
+            try:
+                day = parse_date(params['date'])
+            except ValueError:  # well formed but impossible, e.g. 2025-02-30
+                day = None
+            if day is None:
+                raise serializers.ValidationError({'date': 'Expected YYYY-MM-DD.'})
+            queryset = queryset.filter(article_date=day)
+        if params.get('company'):
+            queryset = queryset.filter(article_company=params['company'])
+        return queryset
+
+
+class NewsArticleDetailView(FieldSelectionMixin, generics.RetrieveAPIView):
+    """One article with its analysis and cluster membership. Query params: fields, omit."""
+    queryset = NewsArticle.objects.all()
+    serializer_class = ArticleWithAnalysisSerializer
+
+
+class DailyAnalysisView(FieldSelectionMixin, generics.RetrieveAPIView):
+    """
+    The day's labeled topic clusters and comparative analysis. The day's
+    articles are at /api/articles/?date=YYYY-MM-DD. Query params: fields, omit.
+    """
+    queryset = DailyAnalysis.objects.all()
+    serializer_class = DailyAnalysisSerializer
+    lookup_field = 'analysis_date'
+
+
+class TrendsView(APIView):
+    """
+    Per-company coverage trends over time, read from the materialized
+    DailyCompanyStats rows. Query params: date_from, date_to, company and
+    period (day, week, month or year; default month).
+    """
+
+    def get(self, request):
+        params = TrendsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        stats = DailyCompanyStats.objects.between(
+            params.validated_data.get('date_from'), params.validated_data.get('date_to'),
+        )
+        if params.validated_data.get('company'):
+            stats = stats.filter(article_company=params.validated_data['company'])
+        results = stats.trends(params.validated_data['period'])
+        return Response({'period': params.validated_data['period'], 'count': len(results), 'results': results})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ArticleAnalysisView(View):
     """
-    This view provides a list of all scraped news articles.
+    GET returns the article's stored analysis.
+    POST starts a fresh analysis job and returns it with 202; the job runs in
+    the background on the server's event loop. With `?wait=1` (and always
+    under WSGI, where there is no long-lived loop) the job is awaited and
+    returned finished, with 200. POST calls the LLM, so it needs the
+    settings.ANALYSIS_API_TOKEN bearer token; it is csrf-exempt because the
+    token, not a session cookie, authenticates it.
     """
-    queryset = NewsArticle.objects.all().order_by('-article_date')
-    serializer_class = NewsArticleSerializer
 
+    @staticmethod
+    def authorized(request) -> bool:
+        token = settings.ANALYSIS_API_TOKEN
+        if not token:
+            return False
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+    async def get(self, request, pk):
+        try:
+            result = await AnalysisResult.objects.aget(article_id=pk)
+        except AnalysisResult.DoesNotExist:
+            return json_response(NOT_FOUND, status=404)
+        return json_response(AnalysisResultSerializer(result).data)
+
+    async def post(self, request, pk):
+        if not self.authorized(request):
+            return json_response(NOT_AUTHENTICATED, status=401)
+        if not await NewsArticle.objects.filter(pk=pk).aexists():
+            return json_response(NOT_FOUND, status=404)
+        job = await AnalysisJob.objects.acreate(article_id=pk)
+
+        if request.GET.get('wait') in ('1', 'true') or not isinstance(request, ASGIRequest):
+            job = await run_analysis_job(job)
+            return json_response(AnalysisJobSerializer(job).data)
+
+        start_analysis_job(job)
+        return json_response(AnalysisJobSerializer(job).data, status=202)
+
+
+class AnalysisJobView(View):
+    """Status of one analysis job."""
+
+    async def get(self, request, pk):
+        try:
+            job = await AnalysisJob.objects.aget(pk=pk)
+        except AnalysisJob.DoesNotExist:
+            return json_response(NOT_FOUND, status=404)
+        return json_response(AnalysisJobSerializer(job).data)
+
+
+class SemanticSearchView(View):
+    """
+    Free-text semantic search over the embedded archive.
+    Query params: q, and optionally date_from, date_to, company, k.
+    """
+
+    async def get(self, request):
+        params = SearchQuerySerializer(data=request.GET)
+        if not params.is_valid():
+            return json_response(params.errors, status=400)
+
+        # Imported here so the rest of the API works without the Gemini and
+        # Chroma clients being configured.
+        from .services import attach_snippets, semantic_search
+
+        # Chroma and the embedding call are blocking and hold no Django DB
+        # connection, so they can run on any thread of the default executor
+        hits = await sync_to_async(semantic_search, thread_sensitive=False)(
+            params.validated_data['q'],
+            date_from=params.validated_data.get('date_from'),
+            date_to=params.validated_data.get('date_to'),
+            company=params.validated_data.get('company'),
+            k=params.validated_data['k'],
+            snippets=False,
+        )
+        # The snippets need the ORM, so they are read on the thread whose
+        # connection Django closes at the end of the request
+        results = await sync_to_async(attach_snippets)(hits)
+        return json_response({'count': len(results), 'results': results})
+
+
+class FullTextSearchView(View):
+    """
+    Exact-text search over article titles and scripts, with highlighted
+    snippets. Terms are ANDed; wrap a phrase in double quotes to match it
+    as a whole. Query params: q, and optionally date_from, date_to, company, k.
+    """
+
+    async def get(self, request):
+        params = SearchQuerySerializer(data=request.GET)
+        if not params.is_valid():
+            return json_response(params.errors, status=400)
+
+        # The FTS5 query goes through a raw cursor, which the async ORM does not cover
+        results = await sync_to_async(fulltext_search)(
+            params.validated_data['q'],
+            company=params.validated_data.get('company'),
+            date_from=params.validated_data.get('date_from'),
+            date_to=params.validated_data.get('date_to'),
+            k=params.validated_data['k'],
+        )
+        return json_response({'count': len(results), 'results': results})
@@ -0,0 +1,130 @@
+# api/watch.py
+
+import collections
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+
+from .models import NewsArticle, Topic, TopicMembership
+
+
+# ==============================================================================
+#  POLLING
+#  Watch mode re-reads the listing pages while the evening broadcasts are
+#  being published. It polls quickly while new segments keep appearing and
+#  backs off geometrically once a poll comes back empty.
+# ==============================================================================
+class AdaptiveInterval:
+    def __init__(self, minimum: float = 60, maximum: float = 600, factor: float = 2.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.current = minimum
+
+    def next(self, found_new: bool) -> float:
+        """Seconds to wait before the next poll."""
+        if found_new:
+            self.current = self.minimum
+        else:
+            self.current = min(self.maximum, max(self.current, 1) * self.factor)
+        return self.current
+
+
+# ==============================================================================
+#  INCREMENTAL CLUSTERING
+#  The batch pipeline clusters a day with DBSCAN(min_samples=1), i.e. single
+#  linkage at cosine distance `eps`. A new segment therefore joins every
+#  existing topic it has a member within `eps` of, and topics it links
+#  together merge, which is exactly what re-running DBSCAN on the grown day
+#  would produce. Only the new rows are compared, so each poll costs
+#  O(new x day) distances instead of a full re-cluster.
+# ==============================================================================
+def _normalized(vectors) -> np.ndarray:
+    X = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.where(norms == 0, 1, norms)
+
+
+def extend_clusters(member_vectors, member_topics: list, new_vectors, eps: float = 0.12) -> list[tuple]:
+    """
+    Link `new_vectors` into the existing clustering. Returns one
+    (topic_ids, new_indices) pair per connected group containing new points:
+    `topic_ids` are the existing topics the group touches (to be merged,
+    empty for a brand-new topic) and `new_indices` the new points joining it.
+    """
+    new = _normalized(new_vectors)
+    parent = list(range(len(new)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # New points linked to each other
+    if len(new) > 1:
+        close = np.argwhere(np.triu(1 - new @ new.T <= eps, k=1))
+        for i, j in close:
+            parent[find(int(i))] = find(int(j))
+
+    # New points linked to existing topics
+    touched = collections.defaultdict(set)
+    if len(member_topics):
+        within = (1 - new @ _normalized(member_vectors).T) <= eps
+        for i, j in np.argwhere(within):
+            touched[int(i)].add(member_topics[j])
+
+    groups = collections.defaultdict(lambda: (set(), []))
+    for i in range(len(new)):
+        topic_ids, indices = groups[find(i)]
+        topic_ids.update(touched[i])
+        indices.append(i)
+    return [(sorted(topic_ids), indices) for topic_ids, indices in groups.values()]
+
+
+def assign_new_articles(day, articles: list[NewsArticle], vectors_for, eps: float = 0.12) -> list[Topic]:
+    """
+    Attach newly scraped `articles` of `day` to the day's stored topics.
+    `vectors_for(articles)` returns their embeddings in order. Segments that
+    match no topic start a new one, provisionally labeled with their title
+    until the nightly pipeline re-clusters and labels the day.
+    Returns the topics that were created or grew.
+    """
+    if not articles:
+        return []
+    memberships = list(TopicMembership.objects.filter(topic_date=day).values_list('article_id', 'topic_id'))
+    member_articles = NewsArticle.objects.in_bulk([article_id for article_id, _ in memberships])
+    members = [(member_articles[article_id], topic_id) for article_id, topic_id in memberships]
+
+    member_vectors = vectors_for([article for article, _ in members]) if members else []
+    groups = extend_clusters(member_vectors, [topic_id for _, topic_id in members], vectors_for(articles), eps)
+
+    changed = []
+    with transaction.atomic():
+        last = Topic.objects.filter(topic_date=day).aggregate(last=Max('position'))['last']
+        next_position = 0 if last is None else last + 1
+        for topic_ids, indices in groups:
+            joining = [articles[i] for i in indices]
+            if topic_ids:
+                # Merge every touched topic into the earliest one
+                topic = Topic.objects.get(pk=topic_ids[0])
+                TopicMembership.objects.filter(topic_id__in=topic_ids[1:]).update(topic=topic)
+                Topic.objects.filter(pk__in=topic_ids[1:]).delete()
+            else:
+                topic = Topic.objects.create(
+                    topic_date=day, label=(joining[0].article_title or "Untitled")[:255], position=next_position,
+                )
+                next_position += 1
+
+            TopicMembership.objects.bulk_create(
+                [TopicMembership(topic=topic, article=a, topic_date=day, article_company=a.article_company)
+                 for a in joining],
+                ignore_conflicts=True,
+            )
+            companies = list(topic.memberships.values_list('article_company', flat=True))
+            topic.item_count = len(companies)
+            topic.company_count = len(set(companies))
+            topic.save(update_fields=['item_count', 'company_count'])
+            changed.append(topic)
+    return changed
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Load-test the async analysis endpoint (POST /api/articles/<id>/analysis/?wait=1)
+under an ASGI server (uvicorn, one process) and a WSGI server (gunicorn, one
+process with a fixed thread pool), using the fake LLM backend so every
+request spends FAKE_LLM_LATENCY seconds waiting on the "model".
+
+Under WSGI each waiting request holds a thread, so throughput levels off at
+threads / latency. Under ASGI waiting requests are just suspended coroutines
+and throughput keeps growing with concurrency.
+
+    python benchmarks/asgi_load.py --latency 0.5 --concurrency 1 8 32 64
+
+Uses the configured database (it runs `migrate` and creates one throwaway
+article, deleted afterwards). Requires uvicorn, gunicorn and httpx.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+os.environ['LLM_BACKEND'] = 'fake'
+
+import django  # noqa: E402
+
+
+def start_server(kind, port, threads):
+    if kind == "asgi":
+        cmd = [sys.executable, "-m", "uvicorn", "conf.asgi:application",
+               "--port", str(port), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "conf.wsgi:application", "-b", f"127.0.0.1:{port}",
+               "--workers", "1", "--threads", str(threads), "--log-level", "warning"]
+    server = subprocess.Popen(cmd, cwd=ROOT, env=os.environ.copy())
+
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{base}/api/jobs/0/", timeout=1)
+            return server, base
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"{kind} server did not start on port {port}")
+
+
+async def run_level(url, concurrency, total):
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post(url)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or response.json()["status"] != "done":
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--rounds", type=int, default=3, help="requests per client at each level")
+    parser.add_argument("--wsgi-threads", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    os.environ['FAKE_LLM_LATENCY'] = str(args.latency)
+
+    django.setup()
+    from django.core.management import call_command
+    from api.models import NewsArticle
+
+    call_command("migrate", verbosity=0)
+    article = NewsArticle.objects.create(
+        article_company="loadtest",
+        article_date=datetime.date.today(),
+        article_url="loadtest://article",
+        article_script="오늘 국회에서 내년도 예산안이 통과되었습니다. " * 20,
+    )
+
+    print(f"fake model latency {args.latency}s, WSGI = gunicorn 1 worker x {args.wsgi_threads} threads, "
+          f"ASGI = uvicorn 1 worker")
+    print(f"{'server':<6} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    try:
+        for kind in ("wsgi", "asgi"):
+            server, base = start_server(kind, args.port, args.wsgi_threads)
+            try:
+                url = f"{base}/api/articles/{article.pk}/analysis/?wait=1"
+                for concurrency in args.concurrency:
+                    r = asyncio.run(run_level(url, concurrency, concurrency * args.rounds))
+                    print(f"{kind:<6} {concurrency:>7} {r['rps']:>8.1f} {r['p50'] * 1000:>8.0f} "
+                          f"{r['p95'] * 1000:>8.0f} {r['errors']:>7}")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        article.delete()
+
+
+if __name__ == "__main__":
+    main()
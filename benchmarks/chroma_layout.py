@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Compare the Chroma storage layouts (see CHROMA_LAYOUT in conf/settings.py):
+one collection per day, monthly shards, and a single collection, on
+synthetic unit vectors with the same typed metadata `ingest` writes.
+
+Reports the cost of opening the store cold (new client, open every
+collection, first query) and of top-10 queries over 30 days and the whole
+range.
+
+    python benchmarks/chroma_layout.py --days 365 --per-day 40
+"""
+import argparse
+import datetime
+import heapq
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import chromadb
+import numpy as np
+
+PREFIX = "broadcasts_"
+COMPANIES = ["kbs", "mbc", "sbs"]
+
+
+def name_for(day, layout):
+    if layout == "daily":
+        return f"{PREFIX}{day:%Y_%m_%d}"
+    if layout == "monthly":
+        return f"{PREFIX}{day:%Y_%m}"
+    return f"{PREFIX}all"
+
+
+def date_key(day):
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def build(path, layout, days, vectors):
+    client = chromadb.PersistentClient(path=path)
+    per_day = len(vectors) // len(days)
+    for i, day in enumerate(days):
+        collection = client.get_or_create_collection(name_for(day, layout), metadata={"hnsw:space": "cosine"})
+        rows = range(i * per_day, (i + 1) * per_day)
+        collection.add(
+            ids=[f"{day}-{j}" for j in rows],
+            embeddings=vectors[rows.start:rows.stop],
+            documents=["" for _ in rows],
+            metadatas=[{"company": COMPANIES[j % 3], "date": date_key(day), "order": j % 15} for j in rows],
+        )
+
+
+def search(client, layout, days, query, k=10, pool=None):
+    names = sorted({name_for(day, layout) for day in days})
+    where = None
+    if layout != "daily":
+        where = {"$and": [{"date": {"$gte": date_key(days[0])}}, {"date": {"$lte": date_key(days[-1])}}]}
+
+    def one(name):
+        res = client.get_collection(name).query(query_embeddings=[query], n_results=k, where=where)
+        return list(zip(res["distances"][0], res["ids"][0]))
+
+    parts = pool.map(one, names) if pool else map(one, names)
+    return heapq.nsmallest(k, (hit for part in parts for hit in part))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=40)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.days * args.per_day, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(len(vectors), args.queries)] + 0.05 * rng.standard_normal((args.queries, args.dim))
+    start_day = datetime.date(2025, 1, 1)
+    days = [start_day + datetime.timedelta(days=i) for i in range(args.days)]
+
+    print(f"{args.days} days x {args.per_day} items, dim {args.dim}")
+    print(f"{'layout':<10}{'collections':>12}{'build':>9}{'open':>10}{'30 days':>11}{'all days':>11}{'all (pool)':>12}")
+    with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(8) as pool:
+        for layout in ("daily", "monthly", "single"):
+            path = f"{tmp}/{layout}"
+            t0 = time.perf_counter()
+            build(path, layout, days, vectors)
+            build_time = time.perf_counter() - t0
+
+            # Cold open: fresh client, every collection opened and queried once
+            chromadb.api.client.SharedSystemClient.clear_system_cache()
+            t0 = time.perf_counter()
+            client = chromadb.PersistentClient(path=path)
+            names = [getattr(c, "name", c) for c in client.list_collections()]
+            for name in names:
+                client.get_collection(name).query(query_embeddings=[queries[0]], n_results=1)
+            open_time = time.perf_counter() - t0
+
+            timings = {}
+            for label, span, use_pool in (("30", days[-30:], False), ("all", days, False), ("pool", days, True)):
+                t0 = time.perf_counter()
+                for q in queries:
+                    search(client, layout, span, q, pool=pool if use_pool else None)
+                timings[label] = (time.perf_counter() - t0) / len(queries)
+
+            print(f"{layout:<10}{len(names):>12}{build_time:>8.1f}s{open_time * 1000:>8.0f}ms"
+                  f"{timings['30'] * 1000:>9.1f}ms{timings['all'] * 1000:>9.1f}ms{timings['pool'] * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
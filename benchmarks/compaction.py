@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Memory, search recall and clustering agreement of the compact embedding
+store (api.compaction) against the full float32 store, for several
+projection/dtype settings, plus the time of one archive-wide search.
+
+The archive is synthetic: each day has topics covered by a few segments
+each, whose 768-dim vectors are a topic direction plus per-segment noise,
+and topic directions share a low-rank structure as real text embeddings
+do. Noise is set so that same-topic pairs sit around DBSCAN's eps=0.12.
+
+    python benchmarks/compaction.py --days 365 --per-day 45
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+
+from api.compaction import CompactEmbeddingStore, _unit, evaluate, format_report, search  # noqa: E402
+from api.embedding_store import EmbeddingStore  # noqa: E402
+
+DIM = 768
+CONFIGS = [('pca', 256, 'float16'), ('pca', 128, 'int8'), ('pca', 64, 'int8'), ('random', 128, 'int8')]
+
+
+def build(store, days, per_day, seed=0):
+    rng = np.random.default_rng(seed)
+    basis = _unit(rng.standard_normal((96, DIM)))
+    for d in range(days):
+        key = 20250101 + (d // 28) * 100 + d % 28  # 28-day months keep the keys valid
+        n_topics = per_day // 2
+        topics = _unit(_unit(rng.standard_normal((n_topics, 96)) @ basis)
+                       + 0.3 * _unit(rng.standard_normal((n_topics, DIM))))
+        picks = rng.integers(0, len(topics), per_day)
+        noise = rng.uniform(0.25, 0.5, (per_day, 1)) * _unit(rng.standard_normal((per_day, DIM)))
+        vectors = _unit(topics[picks] + noise)
+        store.upsert([f"{key}-{i}" for i in range(per_day)], vectors, [key] * per_day)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=45)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full = EmbeddingStore(Path(tmp) / "full", dtype="float32")
+        build(full, args.days, args.per_day)
+        query = full.vectors()[2][123] + 0.01
+
+        def full_scan():
+            ids, _, vectors = full.vectors()
+            scores = np.asarray(vectors) @ _unit(query)[0]
+            return np.argpartition(-scores, 9)[:10]
+
+        start = time.perf_counter()
+        full_scan()
+        full_time = time.perf_counter() - start
+        print(f"full store: {len(full)} vectors, exact scan {full_time * 1000:.1f}ms")
+
+        for method, dim, dtype in CONFIGS:
+            compact = CompactEmbeddingStore.build(full, Path(tmp) / f"{method}-{dim}-{dtype}", dim=dim,
+                                                  method=method, dtype=dtype)
+            start = time.perf_counter()
+            search(query, compact, k=10)
+            search_time = time.perf_counter() - start
+            print(format_report(evaluate(full, compact)))
+            print(f"  one archive-wide search with re-ranking: {search_time * 1000:.1f}ms; "
+                  f"shard files {compact.nbytes() / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Time the trends query over the materialized DailyCompanyStats rows against
+deriving the same numbers from articles and topics on every request, and the
+cost of refreshing one day, on a synthetic year in an in-memory test database.
+
+    python benchmarks/daily_stats.py --days 365 --topics-per-day 30
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+
+from topic_aggregates import best_of, build  # noqa: E402  (sets up Django)
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--topics-per-day", type=int, default=30)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    from api.daily_stats import compute_daily_stats, refresh_daily_stats
+    from api.models import DailyCompanyStats, NewsArticle
+
+    build(args.days, args.topics_per_day, seed=0)
+    days = list(NewsArticle.objects.values_list('article_date', flat=True).distinct().order_by('article_date'))
+
+    start = time.perf_counter()
+    for day in days:
+        refresh_daily_stats(day)
+    full = time.perf_counter() - start
+    one_day, _ = best_of(lambda: refresh_daily_stats(days[-1]))
+
+    def from_scratch():
+        # What a trends request would cost without the materialized rows
+        rows = [row for day in days for row in compute_daily_stats(day)]
+        return {(row.stats_date.replace(day=1), row.article_company) for row in rows}
+
+    scan_time, scanned = best_of(from_scratch, repeat=2)
+    table_time, trends = best_of(lambda: DailyCompanyStats.objects.trends('month'))
+    assert len(scanned) == len(trends)
+
+    print(f"{DailyCompanyStats.objects.count()} stats rows for {len(days)} days")
+    print(f"refresh one day: {one_day * 1000:.1f}ms   (whole year: {full:.1f}s)")
+    print(f"monthly trends, full year: from articles+topics {scan_time * 1000:.0f}ms, "
+          f"from materialized rows {table_time * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Time loading a month of vectors for clustering from Chroma
+(`collection.get(include=["embeddings", "documents", "metadatas"])`, as
+cluster_collection used to) versus the memory-mapped EmbeddingStore.
+
+    python benchmarks/embedding_store.py --items 1200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from api.embedding_store import EmbeddingStore  # noqa: E402
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--script-chars", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.items, args.dim)).astype(np.float32)
+    ids = [f"id-{i}" for i in range(args.items)]
+    keys = [20250901 + i % 28 for i in range(args.items)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collection = chromadb.PersistentClient(path=f"{tmp}/chroma").create_collection("bench")
+        for start in range(0, args.items, 500):
+            collection.add(
+                ids=ids[start:start + 500],
+                embeddings=vectors[start:start + 500],
+                documents=["가" * args.script_chars] * len(ids[start:start + 500]),
+                metadatas=[{"date": k} for k in keys[start:start + 500]],
+            )
+
+        def from_chroma():
+            data = collection.get(include=["embeddings", "documents", "metadatas"])
+            return np.array(data["embeddings"], dtype=np.float32)
+
+        print(f"{args.items} vectors x {args.dim} dims")
+        print(f"{'source':<28}{'load':>10}{'on disk':>12}")
+        print(f"{'chroma get(...)':<28}{best_of(from_chroma, args.repeat) * 1000:>8.1f}ms{'':>12}")
+
+        for dtype in ("float32", "float16"):
+            store = EmbeddingStore(f"{tmp}/store_{dtype}", dtype=dtype)
+            store.upsert(ids, vectors, keys)
+            size = sum(p.stat().st_size for p in store.root.iterdir())
+
+            def from_store():
+                _, _, X = EmbeddingStore(store.root, dtype=dtype).vectors()
+                return np.asarray(X, dtype=np.float32)
+
+            print(f"{'store ' + dtype + ' (cold open)':<28}{best_of(from_store, args.repeat) * 1000:>8.1f}ms"
+                  f"{size / 1e6:>10.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Clustering quality of the fixed eps=0.12 against eps='auto' (api.eps_tuning)
+on synthetic days, and the cost of the automatic sweep against clustering
+the day once per candidate eps with DBSCAN, as tuning by hand does.
+
+Each day has topics aired by one to five broadcasters; a segment is its
+topic's 768-dim direction plus noise. The noise level sets how far apart
+same-story segments sit, so the right eps differs between levels.
+
+    python benchmarks/eps_tuning.py --days 20 --topics 30
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+from sklearn.cluster import DBSCAN  # noqa: E402
+from sklearn.metrics import adjusted_rand_score  # noqa: E402
+
+from api.eps_tuning import candidate_eps, cosine_distances, tune_eps  # noqa: E402
+
+DIM = 768
+COMPANIES = ["kbs", "mbc", "sbs", "jtbc", "ytn"]
+NOISE_LEVELS = (0.25, 0.35, 0.45, 0.55)
+
+
+def synthetic_day(rng, n_topics, noise):
+    basis = rng.standard_normal((96, DIM))
+    topics = rng.standard_normal((n_topics, 96)) @ basis
+    topics /= np.linalg.norm(topics, axis=1, keepdims=True)
+    vectors, truth, companies = [], [], []
+    for t in range(n_topics):
+        for j in range(rng.choice([1, 1, 2, 3, 3, 4, 5])):
+            direction = rng.standard_normal(DIM)
+            vectors.append(topics[t] + noise * rng.uniform(0.7, 1.2) * direction / np.linalg.norm(direction))
+            truth.append(t)
+            companies.append(COMPANIES[j])
+    return np.array(vectors, dtype=np.float32), truth, companies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--topics", type=int, default=30, help="stories per day")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for noise in NOISE_LEVELS:
+        fixed, auto, chosen, sweep_time, dbscan_time = [], [], [], 0.0, 0.0
+        for _ in range(args.days):
+            X, truth, companies = synthetic_day(rng, args.topics, noise)
+
+            start = time.perf_counter()
+            eps, _ = tune_eps(X, companies)
+            sweep_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            for candidate in candidate_eps(cosine_distances(X)):
+                DBSCAN(eps=candidate, min_samples=1, metric="cosine").fit(X)
+            dbscan_time += time.perf_counter() - start
+
+            fixed.append(adjusted_rand_score(truth, DBSCAN(eps=0.12, min_samples=1, metric="cosine").fit(X).labels_))
+            auto.append(adjusted_rand_score(truth, DBSCAN(eps=eps, min_samples=1, metric="cosine").fit(X).labels_))
+            chosen.append(eps)
+
+        print(f"noise {noise:.2f}: ARI fixed 0.12 {np.mean(fixed):.3f}, auto {np.mean(auto):.3f} "
+              f"(eps {min(chosen):.3f}-{max(chosen):.3f}); per day: sweep {sweep_time / args.days * 1000:.1f}ms, "
+              f"DBSCAN per candidate {dbscan_time / args.days * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
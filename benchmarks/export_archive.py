@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Time loading the whole archive (articles, scripts, analyses, embeddings)
+for analysis through /api/articles/, through the ORM, and from the Parquet
+export, plus the cost of the export itself: a full run, an incremental run
+after one new day, and a run with nothing to do. Runs on a synthetic
+archive in an in-memory test database and a temporary embedding store.
+
+    python benchmarks/export_archive.py --days 90 --per-day 45
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+
+from script_blobs import synthetic_script  # noqa: E402
+from topic_aggregates import COMPANIES, best_of  # noqa: E402  (sets up Django)
+
+import numpy as np  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+DIM = 768
+
+
+def build_day(day, per_day, rng, store):
+    from api.models import AnalysisResult, NewsArticle, stable_id
+
+    articles = NewsArticle.objects.bulk_create(
+        NewsArticle(article_company=COMPANIES[i % len(COMPANIES)], article_date=day, article_order=i,
+                    article_title=f"제목 {i}", article_url=f"https://example.com/{day}/{i}",
+                    article_script=synthetic_script(rng), embedded_hash="x")
+        for i in range(per_day)
+    )
+    AnalysisResult.objects.bulk_create(
+        AnalysisResult(article=a, headline_analysis={"topic": a.article_title, "framing": "중립"},
+                       key_agenda_items=[{"topic": "예산", "placement": "top", "comment": "..."}],
+                       editorial_critique=synthetic_script(rng, 3), notable_elements={"exclusives_claimed": []})
+        for a in articles
+    )
+    key = day.year * 10000 + day.month * 100 + day.day
+    vectors = np.random.default_rng(key).standard_normal((len(articles), DIM)).astype(np.float32)
+    store.upsert([stable_id(a, day.isoformat()) for a in articles], vectors, [key] * len(articles))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--per-day", type=int, default=45, help="segments per day across all broadcasters")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    from api.archive import ArchiveWriter, pq
+    from api.embedding_store import EmbeddingStore
+    from api.models import NewsArticle
+
+    rng = random.Random(0)
+    start = datetime.date(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmbeddingStore(Path(tmp) / "store")
+        for d in range(args.days):
+            build_day(start + datetime.timedelta(days=d), args.per_day, rng, store)
+        count = NewsArticle.objects.count()
+        writer = ArchiveWriter(Path(tmp) / "archive", store=store)
+
+        t0 = time.perf_counter()
+        writer.export()
+        full = time.perf_counter() - t0
+        build_day(start + datetime.timedelta(days=args.days), args.per_day, rng, store)
+        t0 = time.perf_counter()
+        writer.export()
+        incremental = time.perf_counter() - t0
+        noop, _ = best_of(writer.export)
+
+        size = sum(f.stat().st_size for f in writer.root.rglob("*.parquet"))
+        print(f"{NewsArticle.objects.count()} articles over {args.days + 1} days, {DIM}-dim embeddings")
+        print(f"export: full {full:.1f}s, one new day {incremental * 1000:.0f}ms, nothing new {noop * 1000:.0f}ms; "
+              f"{size / 2**20:.1f} MiB of Parquet")
+
+        client = Client()
+
+        def via_api():
+            return client.get('/api/articles/').json()
+
+        def via_orm():
+            rows = [
+                (a.pk, a.article_company, a.article_date, a.article_script, a.analysis.headline_analysis)
+                for a in NewsArticle.objects.with_script().select_related('analysis')
+            ]
+            vectors = store.vectors()[2]
+            return rows, np.asarray(vectors, dtype=np.float32)
+
+        def via_parquet():
+            articles = pq.read_table(writer.root / "articles")
+            analyses = pq.read_table(writer.root / "analyses")
+            embeddings = pq.read_table(writer.root / "embeddings", columns=["article_id", "embedding"])
+            vectors = embeddings.column("embedding").combine_chunks().flatten().to_numpy().reshape(-1, DIM)
+            return articles, analyses, vectors
+
+        api_time, _ = best_of(via_api, repeat=2)
+        orm_time, _ = best_of(via_orm, repeat=3)
+        parquet_time, (articles, _, vectors) = best_of(via_parquet)
+        assert articles.num_rows == len(vectors) == NewsArticle.objects.count() > count
+        print(f"load everything: /api/articles/ {api_time * 1000:.0f}ms (no embeddings), "
+              f"ORM + embedding store {orm_time * 1000:.0f}ms, Parquet {parquet_time * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
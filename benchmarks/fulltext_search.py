@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Benchmark the FTS5 bigram index (api/fulltext.py) against the icontains scan
+it replaces, on synthetic Korean scripts in a throwaway SQLite file.
+
+    python benchmarks/fulltext_search.py --rows 300000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from api.fulltext import CREATE_FTS_SQL, FTS_TABLE, build_match, ngrams  # noqa: E402
+
+WORDS = (
+    "국회 정부 대통령 예산안 여당 야당 법안 경제 물가 금리 부동산 태풍 폭우 "
+    "수출 반도체 북한 미국 중국 일본 검찰 법원 수사 재판 교육 의료 병원 "
+    "선거 후보 지지율 사고 화재 경찰 시민 주민 기업 노동 임금 환율"
+).split()
+PARTICLES = ["", "은", "는", "이", "가", "을", "를", "에서", "의", "와", "도"]
+# Names mentioned in roughly 0.05%, 0.5% and 5% of scripts
+NAMES = {"황보세영": 0.0005, "남궁민수": 0.005, "이도윤": 0.05}
+COMPANIES = ["kbs", "mbc", "sbs"]
+QUERIES = ["황보세영", "남궁민수", "이도윤", "남궁민수 반도체", '"남궁민수 의원"', "국회"]
+
+
+def synthetic_script(rng, words=120):
+    tokens = [rng.choice(WORDS) + rng.choice(PARTICLES) for _ in range(words)]
+    for name, share in NAMES.items():
+        if rng.random() < share:
+            tokens.insert(rng.randrange(len(tokens)), f"{name} 의원{rng.choice(PARTICLES)}")
+    return " ".join(tokens) + "."
+
+
+def build(path, rows, seed):
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE article (id INTEGER PRIMARY KEY, company TEXT, date TEXT, script TEXT)"
+    )
+    db.execute("CREATE INDEX article_date ON article (date)")
+    db.execute(CREATE_FTS_SQL)
+
+    batch = []
+    for i in range(1, rows + 1):
+        script = synthetic_script(rng)
+        day = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        batch.append((i, rng.choice(COMPANIES), day, script))
+        if len(batch) == 5000 or i == rows:
+            db.executemany("INSERT INTO article VALUES (?, ?, ?, ?)", batch)
+            db.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, grams) VALUES (?, ?)",
+                [(row[0], ngrams(row[3])) for row in batch],
+            )
+            batch = []
+    db.commit()
+    return db
+
+
+def timed(db, sql, params, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n = len(db.execute(sql, params).fetchall())
+        best = min(best, time.perf_counter() - start)
+    return best, n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        db = build(os.path.join(tmp, "bench.sqlite3"), args.rows, args.seed)
+        print(f"built {args.rows} rows + index in {time.perf_counter() - start:.1f}s")
+
+        # "Every broadcast that mentioned X": all matching ids, as icontains
+        # (LIKE '%x%' on SQLite) versus the index. The last column is the
+        # ranked top 20 the search endpoint actually returns.
+        print(f"{'query':<22}{'hits':>8}{'icontains':>12}{'fts5':>12}{'speedup':>10}{'fts5 top20':>13}")
+        for q in QUERIES:
+            terms = [q.strip('"')] if q.startswith('"') else q.split()
+            like_sql = "SELECT id FROM article WHERE " + " AND ".join(
+                "script LIKE ? ESCAPE '\\'" for _ in terms
+            )
+            like_time, like_hits = timed(db, like_sql, [f"%{t}%" for t in terms], args.repeat)
+
+            fts_sql = (
+                f"SELECT a.id FROM {FTS_TABLE} f JOIN article a ON a.id = f.rowid "
+                f"WHERE {FTS_TABLE} MATCH ?"
+            )
+            fts_time, hits = timed(db, fts_sql, [build_match(q)], args.repeat)
+            top_time, _ = timed(db, fts_sql + " ORDER BY f.rank LIMIT 20", [build_match(q)], args.repeat)
+
+            print(f"{q:<22}{hits:>8}{like_time * 1000:>10.1f}ms{fts_time * 1000:>10.1f}ms"
+                  f"{like_time / fts_time:>9.1f}x{top_time * 1000:>11.1f}ms")
+            assert hits >= like_hits - like_hits // 100, "index missed matches"
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Time MinHash/LSH near-duplicate grouping (api/near_duplicates.py) on a
+synthetic year of broadcasts in which a share of segments are reworded
+copies of another broadcaster's segment.
+
+    python benchmarks/near_duplicates.py --days 365 --per-day 40
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from api.near_duplicates import MinHasher, find_near_duplicates  # noqa: E402
+
+SYLLABLES = "가나다라마바사아자차카타파하국회정부예산경제물가금리수출반도체선거후보검찰법원태풍".strip()
+
+
+def synthetic_script(rng, chars):
+    words = ("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(chars // 3))
+    return " ".join(words)[:chars]
+
+
+def reword(rng, text, edits):
+    chars = list(text)
+    for _ in range(edits):
+        chars[rng.randrange(len(chars))] = rng.choice(SYLLABLES)
+    return "".join(chars)
+
+
+def pairs(groups):
+    return {frozenset((a, b)) for group in groups for a in group for b in group if a < b}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=40)
+    parser.add_argument("--chars", type=int, default=1200)
+    parser.add_argument("--dup-share", type=float, default=0.15)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts, family = {}, {}
+    for day in range(args.days):
+        for i in range(args.per_day):
+            key = (day, i)
+            if i and rng.random() < args.dup_share:
+                # ~1% of characters changed, like a lightly rewritten wire story;
+                # a copy of a copy still belongs to the original's family
+                source = (day, rng.randrange(i))
+                texts[key] = reword(rng, texts[source], edits=args.chars // 100)
+                family[key] = family[source]
+            else:
+                texts[key] = synthetic_script(rng, args.chars)
+                family[key] = key
+    items = list(texts.items())
+
+    members = {}
+    for key, root in family.items():
+        members.setdefault(root, []).append(key)
+    expected = pairs(members.values())
+
+    start = time.perf_counter()
+    hasher = MinHasher()
+    signatures = hasher.signatures([text for _, text in items])
+    sig_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    groups = find_near_duplicates(items, hasher=hasher)
+    total_time = time.perf_counter() - start
+
+    found = pairs(groups)
+    recall = len(expected & found) / len(expected) if expected else 1.0
+
+    print(f"{len(items)} scripts x {args.chars} chars, {len(expected)} duplicate pairs planted")
+    print(f"signatures only: {sig_time:.2f}s   full grouping: {total_time:.2f}s")
+    print(f"groups: {len(groups)}   pair recall: {recall:.1%}   false pairs: {len(found - expected)}")
+    assert signatures.shape == (len(items), hasher.num_perm)
+
+
+if __name__ == "__main__":
+    main()
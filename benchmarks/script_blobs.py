@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Size and list-query cost of storing article scripts inline (the schema up
+to migration 0013) versus in compressed, content-addressed ScriptBlob rows
+(0014), on a synthetic archive, plus the Chroma store with and without a
+copy of every script as the document.
+
+The inline database is built at 0013 and a copy of it is migrated to 0014,
+so both hold exactly the same articles. Both are VACUUMed before measuring.
+
+    python benchmarks/script_blobs.py --days 365 --per-day 75 --chroma-days 30
+"""
+import argparse
+import datetime
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORDS = (
+    "정부 국회 예산안 대통령 여당 야당 의원 장관 발표 오늘 어제 내일 서울 부산 경제 물가 금리 "
+    "태풍 피해 주민 경찰 수사 검찰 법원 판결 병원 의료 학생 교육 기업 수출 반도체 시장 투자 "
+    "일자리 청년 지역 사고 화재 소방 현장 취재 기자 전해드립니다 밝혔습니다 예정입니다 "
+    "있습니다 했습니다 보입니다 전망입니다 가운데 이번 관련 대책 논란 회의 결과 계획"
+).split()
+
+
+def synthetic_script(rng, sentences=30):
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))) + "." for _ in range(sentences)
+    )
+
+
+def manage(db, *args):
+    env = dict(os.environ, DB_ENGINE="sqlite", DB_NAME=str(db))
+    subprocess.run([sys.executable, "manage.py", *args], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def build_inline(db, days, per_day, rng):
+    manage(db, "migrate", "api", "0013", "-v", "0")
+    start = datetime.date(2025, 1, 1)
+    rows = []
+    for d in range(days):
+        day = (start + datetime.timedelta(days=d)).isoformat()
+        scripts = [synthetic_script(rng) for _ in range(per_day)]
+        # Wire copies and re-broadcasts: some segments air with the exact same script
+        for i in rng.sample(range(1, per_day), per_day // 20):
+            scripts[i] = scripts[i - 1]
+        for i, script in enumerate(scripts):
+            rows.append(("kbs mbc sbs".split()[i % 3], day, i, f"제목 {i}", f"https://example.com/{day}/{i}",
+                         script, day, "", ""))
+    with sqlite3.connect(db) as conn:
+        conn.executemany(
+            "INSERT INTO api_newsarticle (article_company, article_date, article_order, article_title, "
+            "article_url, article_script, scraped_at, content_hash, embedded_hash) VALUES (?,?,?,?,?,?,?,?,?)",
+            rows,
+        )
+    return len(rows)
+
+
+def vacuumed_size(db):
+    with sqlite3.connect(db) as conn:
+        conn.execute("VACUUM")
+    return os.path.getsize(db)
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def list_query(db, with_script):
+    # The article list of one month, as /api/articles/ runs it
+    columns = "a.id, a.article_company, a.article_date, a.article_order, a.article_title, a.article_url"
+    with sqlite3.connect(db) as conn:
+        inline = "script_hash" not in {row[1] for row in conn.execute("PRAGMA table_info(api_newsarticle)")}
+    if with_script:
+        columns += ", a.article_script" if inline else ", b.codec, b.data"
+    join = "" if inline or not with_script else "JOIN api_scriptblob b ON b.hash = a.script_hash"
+    sql = (f"SELECT {columns} FROM api_newsarticle a {join} WHERE a.article_date BETWEEN '2025-06-01' AND "
+           f"'2025-06-30' ORDER BY a.article_date DESC, a.article_company, a.article_order")
+
+    def run():
+        with sqlite3.connect(db) as conn:
+            rows = conn.execute(sql).fetchall()
+        if with_script and not inline:
+            from api.blobs import decompress
+            for row in rows:
+                decompress(row[-1], row[-2])
+    return run
+
+
+def chroma_size(path, items, with_documents):
+    import chromadb
+    import numpy as np
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.get_or_create_collection("broadcasts_bench", metadata={"hnsw:space": "cosine"})
+    for start in range(0, len(items), 500):
+        batch = items[start:start + 500]
+        kwargs = {"documents": [script for _, script in batch]} if with_documents else {}
+        collection.upsert(
+            ids=[item_id for item_id, _ in batch],
+            embeddings=np.random.default_rng(start).standard_normal((len(batch), 768)).astype(np.float32).tolist(),
+            metadatas=[{"script_hash": item_id} for item_id, _ in batch],
+            **kwargs,
+        )
+    del client
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=75, help="segments per day across all broadcasters")
+    parser.add_argument("--chroma-days", type=int, default=30, help="days written to each Chroma store")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    from api.blobs import DEFAULT_CODEC
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        inline_db, blob_db = Path(tmp) / "inline.sqlite3", Path(tmp) / "blobs.sqlite3"
+        count = build_inline(inline_db, args.days, args.per_day, rng)
+        shutil.copy(inline_db, blob_db)
+        start = time.perf_counter()
+        manage(blob_db, "migrate", "api", "0014", "-v", "0")
+        migrate_time = time.perf_counter() - start
+
+        inline_size, blob_size = vacuumed_size(inline_db), vacuumed_size(blob_db)
+        blobs = sqlite3.connect(blob_db).execute("SELECT count(*) FROM api_scriptblob").fetchone()[0]
+        print(f"{count} articles over {args.days} days, {blobs} distinct scripts, codec {DEFAULT_CODEC} "
+              f"(migration took {migrate_time:.1f}s)")
+        print(f"db.sqlite3: inline {inline_size / 2**20:.1f} MiB -> blobs {blob_size / 2**20:.1f} MiB "
+              f"({1 - blob_size / inline_size:.0%} smaller)")
+
+        for with_script in (False, True):
+            before = best_of(list_query(inline_db, with_script))
+            after = best_of(list_query(blob_db, with_script))
+            label = "with scripts   " if with_script else "without scripts"
+            print(f"month list {label}: inline {before * 1000:6.1f}ms -> blobs {after * 1000:6.1f}ms")
+
+        with sqlite3.connect(inline_db) as conn:
+            items = conn.execute(
+                "SELECT id, article_script FROM api_newsarticle ORDER BY id LIMIT ?",
+                (args.chroma_days * args.per_day,),
+            ).fetchall()
+        items = [(str(item_id), script) for item_id, script in items]
+        with_docs = chroma_size(Path(tmp) / "chroma_docs", items, True)
+        without_docs = chroma_size(Path(tmp) / "chroma_hash", items, False)
+        print(f"chroma_db ({len(items)} items, 768-dim): with documents {with_docs / 2**20:.1f} MiB -> "
+              f"hash only {without_docs / 2**20:.1f} MiB ({1 - without_docs / with_docs:.0%} smaller)")
+
+
+if __name__ == "__main__":
+    main()
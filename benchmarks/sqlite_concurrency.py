@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Concurrent read/write load on a file-backed SQLite database, with SQLite's
+defaults (rollback journal, synchronous=FULL) and with the performance-mode
+PRAGMAs from settings.SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap).
+
+Writer threads insert articles one transaction at a time, like the scraper
+and the pipeline do, while reader threads run the API's list query. Each
+mode runs in its own process against a fresh temporary database.
+
+    python benchmarks/sqlite_concurrency.py --writers 2 --readers 4 --seconds 5
+"""
+import argparse
+import datetime
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+
+
+def run_load(writers, readers, seconds):
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import OperationalError, connection, transaction
+    from api.models import NewsArticle
+
+    call_command("migrate", verbosity=0)
+    day = datetime.date(2025, 1, 1)
+    NewsArticle.objects.bulk_create(
+        NewsArticle(article_company="kbs", article_date=day, article_order=i,
+                    article_url=f"seed://{i}", article_script="오늘의 주요 뉴스입니다. " * 40)
+        for i in range(2000)
+    )
+    connection.close()
+
+    stop = threading.Event()
+    results = {"write": [], "read": [], "errors": 0}
+    lock = threading.Lock()
+
+    def writer(n):
+        from django.db import connection
+        i = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    NewsArticle.objects.create(
+                        article_company=f"writer{n}", article_date=day, article_order=i,
+                        article_url=f"load://{n}/{i}", article_script="새로 수집한 기사 본문입니다. " * 40,
+                    )
+            except OperationalError:
+                with lock:
+                    results["errors"] += 1
+                continue
+            with lock:
+                results["write"].append(time.perf_counter() - start)
+            i += 1
+        connection.close()
+
+    def reader():
+        from django.db import connection
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                list(NewsArticle.objects.filter(article_date=day)
+                     .order_by('-id').values('id', 'article_title', 'article_company')[:50])
+                NewsArticle.objects.filter(article_date=day).count()
+            except OperationalError:
+                with lock:
+                    results["errors"] += 1
+                continue
+            with lock:
+                results["read"].append(time.perf_counter() - start)
+        connection.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    for kind in ("write", "read"):
+        latencies = sorted(results[kind])
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else float("nan")
+        print(f"{kind:<6} {len(latencies) / seconds:>9.0f}/s  p50 {statistics.median(latencies) * 1000:>7.2f}ms"
+              f"  p95 {p95 * 1000:>7.2f}ms")
+    print(f"errors {results['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_load(args.writers, args.readers, args.seconds)
+        return
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g}s per mode")
+    for label, mode in (("defaults (rollback journal, synchronous=FULL)", "0"),
+                        ("performance mode (WAL, synchronous=NORMAL, mmap)", "1")):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DB_ENGINE="sqlite", DB_NAME=str(Path(tmp) / "bench.sqlite3"),
+                       SQLITE_PERFORMANCE_MODE=mode)
+            print(f"\n{label}")
+            sys.stdout.flush()
+            subprocess.run([sys.executable, __file__, "--child", "--writers", str(args.writers),
+                            "--readers", str(args.readers), "--seconds", str(args.seconds)],
+                           env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
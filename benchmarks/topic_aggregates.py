@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Time topic questions against the normalized Topic / TopicMembership tables
+versus loading and parsing the per-day `clustered_topics` JSON blobs they
+replaced, on a synthetic year in a throwaway in-memory test database.
+
+    python benchmarks/topic_aggregates.py --days 365 --topics-per-day 30
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'conf.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+COMPANIES = ["kbs", "mbc", "sbs", "jtbc", "ytn"]
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def build(days, topics_per_day, seed):
+    from api.models import NewsArticle, Topic, TopicMembership
+
+    rng = random.Random(seed)
+    start = datetime.date(2025, 1, 1)
+    blobs = []
+    for d in range(days):
+        day = start + datetime.timedelta(days=d)
+        articles = NewsArticle.objects.bulk_create(
+            NewsArticle(article_company=c, article_date=day, article_order=i,
+                        article_url=f"{c}/{day}/{i}", article_script="script")
+            for c in COMPANIES for i in range(topics_per_day // 2)
+        )
+        topics, members, blob = [], [], []
+        for position in range(topics_per_day):
+            covered = rng.sample(articles, rng.choice([1, 1, 2, 3, 4, 6]))
+            companies = {a.article_company for a in covered}
+            topics.append(Topic(topic_date=day, label=f"topic {d}-{position}", position=position,
+                                item_count=len(covered), company_count=len(companies)))
+            members.append(covered)
+            blob.append({
+                "topic_label": f"topic {d}-{position}",
+                "total_items": len(covered),
+                "source_contribution": {c: sum(a.article_company == c for a in covered) for c in companies},
+                "items": [{"id": str(a.pk), "text": "script " * 150,
+                           "meta": {"article_id": a.pk, "company": a.article_company}} for a in covered],
+            })
+        topics = Topic.objects.bulk_create(topics)
+        TopicMembership.objects.bulk_create(
+            TopicMembership(topic=t, article=a, topic_date=day, article_company=a.article_company)
+            for t, covered in zip(topics, members) for a in covered
+        )
+        blobs.append((day.isoformat(), json.dumps(blob, ensure_ascii=False)))
+
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE TABLE legacy_daily (analysis_date TEXT PRIMARY KEY, clustered_topics TEXT)")
+        cursor.executemany("INSERT INTO legacy_daily VALUES (%s, %s)", blobs)
+
+
+def legacy_days(date_from, date_to):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT analysis_date, clustered_topics FROM legacy_daily WHERE analysis_date BETWEEN %s AND %s",
+            [date_from.isoformat(), date_to.isoformat()],
+        )
+        return [(day, json.loads(blob)) for day, blob in cursor.fetchall()]
+
+
+def legacy_only_by(company, date_from, date_to):
+    return [t["topic_label"] for _, topics in legacy_days(date_from, date_to) for t in topics
+            if set(t["source_contribution"]) == {company}]
+
+
+def legacy_share(date_from, date_to):
+    counts = {}
+    for day, topics in legacy_days(date_from, date_to):
+        month = day[:7]
+        for t in topics:
+            for company, n in t["source_contribution"].items():
+                counts[(month, company)] = counts.get((month, company), 0) + n
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--topics-per-day", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    from api.models import Topic, TopicMembership
+
+    start = time.perf_counter()
+    build(args.days, args.topics_per_day, args.seed)
+    print(f"built {Topic.objects.count()} topics / {TopicMembership.objects.count()} memberships "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    last_month = (datetime.date(2025, 12, 1), datetime.date(2025, 12, 31))
+    year = (datetime.date(2025, 1, 1), datetime.date(2025, 12, 31))
+    cases = [
+        ("topics only MBC covered, last month",
+         lambda: legacy_only_by("mbc", *last_month),
+         lambda: list(Topic.objects.between(*last_month).covered_only_by("mbc").values_list("label", flat=True))),
+        ("coverage share per company per month, year",
+         lambda: legacy_share(*year),
+         lambda: TopicMembership.objects.between(*year).coverage_share("month")),
+    ]
+    print(f"{'query':<45} {'JSON blobs':>12} {'tables':>10} {'rows':>6}")
+    for name, legacy, relational in cases:
+        legacy_time, legacy_result = best_of(legacy)
+        table_time, table_result = best_of(relational)
+        assert len(legacy_result) == len(table_result), (len(legacy_result), len(table_result))
+        print(f"{name:<45} {legacy_time * 1000:>10.1f}ms {table_time * 1000:>8.1f}ms {len(table_result):>6}")
+
+
+if __name__ == "__main__":
+    main()
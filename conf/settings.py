@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -76,12 +77,58 @@ WSGI_APPLICATION = 'conf.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE picks the backend: 'sqlite' (default, a single file for local runs
+# and small deployments) or 'postgresql' for deployments where the scraper,
+# the analysis pipeline and the API write concurrently at scale.
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'news_analyzer'),
+            'USER': os.getenv('DB_USER', ''),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', ''),
+            'PORT': os.getenv('DB_PORT', ''),
+            # Persistent connections: a WSGI thread or a command reuses its
+            # connection for DB_CONN_MAX_AGE seconds instead of reconnecting per
+            # request. Under ASGI set it to 0 and pool outside Django (pgbouncer).
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            # API requests write analysis jobs concurrently. IMMEDIATE takes the
+            # write lock at BEGIN, so a transaction waits up to `timeout` seconds
+            # for it instead of failing with "database is locked" when it later
+            # tries to upgrade a read lock.
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+        }
+    }
+
+
+# SQLite performance mode
+# PRAGMAs applied to every new SQLite connection (see api/signals.py). WAL lets
+# readers run alongside the single writer instead of being blocked by it, and
+# synchronous=NORMAL only fsyncs at checkpoints, which is safe under WAL (a
+# power loss can drop the last commits but never corrupts the file).
+# SQLITE_PERFORMANCE_MODE=0 falls back to SQLite's defaults.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '20000')),
+} if os.getenv('SQLITE_PERFORMANCE_MODE', '1') == '1' else {}
 
 
 # Password validation
@@ -124,3 +171,78 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Scraper page cache
+# Raw article and listing pages, gzip-compressed and keyed by URL.
+
+SCRAPE_CACHE_DIR = BASE_DIR / 'scrape_cache'
+
+
+# Chroma storage layout
+# 'daily' (one collection per date), 'monthly' (one per month) or 'single'.
+# Move an existing store between layouts with `manage.py migrate_chroma_layout`.
+
+CHROMA_LAYOUT = 'daily'
+
+
+# Local embedding store
+# Memory-mapped .npy copies of the Chroma embeddings for clustering and
+# analytics. float16 halves the size at a negligible cost in cosine accuracy.
+
+EMBEDDING_STORE_DIR = BASE_DIR / 'embedding_store'
+EMBEDDING_STORE_DTYPE = 'float32'
+
+
+# Compact embeddings
+# An optional projected (PCA or random projection) and int8/float16 copy of
+# the embedding store, built with `manage.py compact_embeddings`. When
+# EMBEDDING_COMPACT is on and the copy exists, clustering and search read
+# it: search re-scores its best k * EMBEDDING_COMPACT_RERANK candidates with
+# the full vectors, and clustering re-measures the pairs whose compact
+# distance is too close to eps to decide (the margin is calibrated by the fit).
+
+EMBEDDING_COMPACT = os.getenv('EMBEDDING_COMPACT') == '1'
+EMBEDDING_COMPACT_DIR = BASE_DIR / 'embedding_store_compact'
+EMBEDDING_COMPACT_DIM = 128
+EMBEDDING_COMPACT_DTYPE = 'int8'
+EMBEDDING_COMPACT_RERANK = 4
+
+
+# Clustering
+# DBSCAN eps (cosine distance) for the daily pipeline and watch mode. 'auto'
+# picks it per day from a sweep scored by silhouette plus CLUSTER_EPS_COVERAGE_WEIGHT
+# times the share of segments in multi-broadcaster clusters, skipping any eps
+# whose largest cluster holds more than CLUSTER_EPS_MAX_SHARE of the day.
+
+CLUSTER_EPS = 'auto' if os.getenv('CLUSTER_EPS') == 'auto' else float(os.getenv('CLUSTER_EPS', '0.12'))
+CLUSTER_EPS_COVERAGE_WEIGHT = 0.5
+CLUSTER_EPS_MAX_SHARE = 0.3
+
+
+# Parquet archive
+# `manage.py export_archive` writes articles, analyses and embeddings here,
+# partitioned by date and company, for notebooks and bulk analytics.
+
+ARCHIVE_EXPORT_DIR = BASE_DIR / 'archive'
+
+
+# Profiling
+# `--profile` on the management commands writes its cProfile, tracemalloc
+# and stage-timing files here, one `<command>-<timestamp>.*` set per run.
+
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+
+# LLM backend
+# 'gemini' calls the Gemini API. 'fake' answers every prompt with schema-valid
+# placeholder JSON after FAKE_LLM_LATENCY seconds, for tests and load tests.
+
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+FAKE_LLM_LATENCY = float(os.getenv('FAKE_LLM_LATENCY', '0.5'))
+
+# POST /api/articles/<pk>/analysis/ starts a paid LLM call, so unlike the
+# read-only endpoints it needs `Authorization: Bearer <ANALYSIS_API_TOKEN>`.
+# Left empty, the endpoint only serves stored analyses.
+
+ANALYSIS_API_TOKEN = os.getenv('ANALYSIS_API_TOKEN', '')